@@ -1,29 +1,21 @@
 from sqlalchemy.orm import Session
-import math
+from sqlalchemy import select, insert, update, func, or_, tuple_, case
+from sqlalchemy.ext.asyncio import AsyncSession
 import models, schemas, security
 import uuid
 from uuid import UUID
 import datetime
 from fastapi import HTTPException
-from utils import tracking
+from utils import tracking, pagination, geo
 
 # --- Events ---
-def create_event(db: Session, event: schemas.EventCreate, host_id: UUID):
-    # 1. Moderation Check (Küfür/Sorunlu içerik kontrolü)
-    is_safe_title, reason_title = moderation.check_message(event.title, 100) # Host her zaman yetkili sayılır ama başlık temiz olmalı
-    is_safe_desc, reason_desc = moderation.check_message(event.description, 100)
-    
-    if not is_safe_title or not is_safe_desc:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"İçerik kurallara aykırı: {reason_title if not is_safe_title else reason_desc}"
-        )
-
+def _event_row(event: schemas.EventCreate, host_id: UUID) -> dict:
+    """EventCreate şemasını Event kolon sözlüğüne çevirir (tekli ve toplu oluşturma ortak kullanır)."""
     # Location conversion from lat/lon to WKT
     # PostGIS expects 'POINT(longitude latitude)'
     location_wkt = f"POINT({event.longitude} {event.latitude})"
-    
-    db_event = models.Event(
+
+    return dict(
         title=event.title,
         description=event.description,
         date=event.date,
@@ -36,6 +28,7 @@ def create_event(db: Session, event: schemas.EventCreate, host_id: UUID):
         # Coordinates (For SQLite compatibility)
         latitude=event.latitude,
         longitude=event.longitude,
+        geo_cell=geo.cell_id(event.latitude, event.longitude),
         
         city=event.city,
         campus=event.campus,
@@ -51,6 +44,19 @@ def create_event(db: Session, event: schemas.EventCreate, host_id: UUID):
         session_token=str(uuid.uuid4()), # QR Kod için oturum anahtarı
         host_id=host_id
     )
+
+def create_event(db: Session, event: schemas.EventCreate, host_id: UUID):
+    # 1. Moderation Check (Küfür/Sorunlu içerik kontrolü)
+    is_safe_title, reason_title = moderation.check_message(event.title, 100) # Host her zaman yetkili sayılır ama başlık temiz olmalı
+    is_safe_desc, reason_desc = moderation.check_message(event.description, 100)
+    
+    if not is_safe_title or not is_safe_desc:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"İçerik kurallara aykırı: {reason_title if not is_safe_title else reason_desc}"
+        )
+
+    db_event = models.Event(**_event_row(event, host_id))
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
@@ -61,10 +67,93 @@ def create_event(db: Session, event: schemas.EventCreate, host_id: UUID):
         "title": db_event.title,
         "city": db_event.city
     }, host_id)
+
+    # Bu worker'ın bellek içi harita ve öneri indekslerine anında ekle
+    event_spatial_index.index.upsert(db_event)
+    suggest_index.index.upsert(suggest_index.EVENT, db_event.id, db_event.title, db_event.participant_count)
+    response_cache.bump(response_cache.EVENTS)
     
     return db_event
 
-def get_events(db: Session, city: str = None, category: str = None, skip: int = 0, limit: int = 100, show_past: bool = False):
+def get_existing_source_hashes(db: Session, source_hashes: list) -> set:
+    """Verilen parmak izlerinden veritabanında zaten bulunanları döner (parçalı IN sorgusu)."""
+    existing = set()
+    for start in range(0, len(source_hashes), 500):
+        rows = db.query(models.Event.source_hash).filter(models.Event.source_hash.in_(source_hashes[start:start + 500])).all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+def create_events(db: Session, events: list, host_id: UUID, source: str = "bulk", source_hashes: list = None):
+    """
+    Toplu etkinlik oluşturma (otomatik çekme, scraper ve içe aktarma için).
+    Tüm parti tek seferde moderasyondan geçer, uygun olanlar tek transaction içinde
+    executemany ile eklenir ve tek bir toplu takip kaydı yazılır.
+    source_hashes verilirse (scraper) her etkinliğin parmak izi aynı sırayla kaydedilir.
+    (oluşturulan_etkinlikler, reddedilenler) döner; reddedilenler [{"index": i, "reason": ...}] listesidir.
+    """
+    texts = []
+    for event in events:
+        texts.append(event.title)
+        texts.append(event.description)
+    # Host her zaman yetkili sayılır (create_event ile aynı güven puanı)
+    verdicts = moderation.check_messages(texts, 100)
+
+    rows = []
+    rejected = []
+    for index, event in enumerate(events):
+        (is_safe_title, reason_title), (is_safe_desc, reason_desc) = verdicts[2 * index], verdicts[2 * index + 1]
+        if not is_safe_title or not is_safe_desc:
+            rejected.append({"index": index, "reason": f"İçerik kurallara aykırı: {reason_title if not is_safe_title else reason_desc}"})
+            continue
+        row = _event_row(event, host_id)
+        row["id"] = uuid.uuid4()
+        if source_hashes is not None:
+            row["source_hash"] = source_hashes[index]
+        rows.append(row)
+
+    if not rows:
+        return [], rejected
+
+    try:
+        db.execute(insert(models.Event), rows)
+        # Core INSERT ORM flush olaylarını tetiklemez, arama indeksi aynı transaction'da elle güncellenir
+        search_index.index_documents(db.connection(), [
+            search_index.event_document(row) for row in rows
+            if getattr(row["status"], "value", row["status"]) != models.EventStatus.IPTAL.value
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Dönüş için nesneleri yükle (IN listesi büyümesin diye parçalı)
+    ids = [row["id"] for row in rows]
+    loaded = {}
+    for start in range(0, len(ids), 500):
+        for db_event in db.query(models.Event).filter(models.Event.id.in_(ids[start:start + 500])).all():
+            loaded[db_event.id] = db_event
+    created = [loaded[event_id] for event_id in ids if event_id in loaded]
+
+    # JSON Takibi (Etkinlik başına değil, parti başına tek kayıt)
+    cities = {}
+    for db_event in created:
+        cities[db_event.city] = cities.get(db_event.city, 0) + 1
+    tracking.log_event("CREATE_EVENTS_BULK", {
+        "source": source,
+        "count": len(created),
+        "rejected": len(rejected),
+        "cities": cities,
+        "event_ids": [str(event_id) for event_id in ids[:100]]
+    }, host_id)
+
+    for db_event in created:
+        event_spatial_index.index.upsert(db_event)
+        suggest_index.index.upsert(suggest_index.EVENT, db_event.id, db_event.title, db_event.participant_count)
+    response_cache.bump(response_cache.EVENTS)
+
+    return created, rejected
+
+def _events_query(db: Session, city: str = None, category: str = None, show_past: bool = False):
     query = db.query(models.Event)
     
     # İptal edilmiş etkinlikleri gizle
@@ -79,33 +168,154 @@ def get_events(db: Session, city: str = None, category: str = None, skip: int =
         query = query.filter(models.Event.city == city)
     if category:
         query = query.filter(models.Event.category == category)
-    return query.order_by(models.Event.date.asc()).offset(skip).limit(limit).all()
+    return query
+
+def get_events(db: Session, city: str = None, category: str = None, skip: int = 0, limit: int = 100, show_past: bool = False):
+    query = _events_query(db, city=city, category=category, show_past=show_past)
+    # id ikincil sıralama: aynı tarihli etkinlikler sayfalar arasında yer değiştirmesin
+    return query.order_by(models.Event.date.asc(), models.Event.id.asc()).offset(skip).limit(limit).all()
+
+def get_events_page(db: Session, city: str = None, category: str = None, cursor: str = None, limit: int = 100, show_past: bool = False):
+    """
+    Keyset sayfalama: (date, id) sırasında cursor'dan sonraki etkinlikler.
+    (events, next_cursor) döner. Derin sayfalarda da sabit maliyetlidir.
+    """
+    query = _events_query(db, city=city, category=category, show_past=show_past)
+    return pagination.paginate_keyset(query, models.Event.date, models.Event.id, cursor, limit)
 
 def get_nearby_events(db: Session, lat: float, lon: float, radius_km: float = 10.0, limit: int = 50):
     """
-    Belirli bir koordinata yakın etkinlikleri getirir (Bounding Box yöntemi).
-    1 derece enlem yaklaşık 111km'dir.
+    Belirli bir koordinata yakın, iptal edilmemiş ve geçmemiş etkinlikleri mesafeye göre sıralı getirir.
+    Önce kapsayan ızgara hücreleri indeksten taranır (geo_cell), sonra haversine ile kesin yarıçap filtresi uygulanır.
+    Her etkinliğe distance_km alanı eklenir.
     """
-    delta_lat = radius_km / 111.0
-    delta_lon = radius_km / (111.0 * abs(complex(math.cos(math.radians(lat)), 0).real))
-    
-    query = db.query(models.Event).filter(
-        models.Event.latitude >= lat - delta_lat,
-        models.Event.latitude <= lat + delta_lat,
-        models.Event.longitude >= lon - delta_lon,
-        models.Event.longitude <= lon + delta_lon
-    )
-    
-    return query.limit(limit).all()
+    radius_km = min(radius_km, geo.MAX_RADIUS_KM)
+    cell_filters = [
+        models.Event.geo_cell.between(first_cell, last_cell)
+        for first_cell, last_cell in geo.covering_cell_ranges(lat, lon, radius_km)
+    ]
+    cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(hours=24)
+
+    # Sadece mesafe hesabı için gereken kolonlar çekilir; tam satırlar yalnızca sonuçlar için yüklenir
+    candidates = db.query(models.Event.id, models.Event.latitude, models.Event.longitude).filter(
+        or_(*cell_filters),
+        models.Event.date >= cutoff_date,
+        models.Event.status != models.EventStatus.IPTAL
+    ).all()
+
+    nearest = []
+    for event_id, event_lat, event_lon in candidates:
+        distance = geo.haversine_km(lat, lon, float(event_lat), float(event_lon))
+        if distance <= radius_km:
+            nearest.append((distance, event_id))
+    nearest.sort(key=lambda item: item[0])
+    nearest = nearest[:limit]
+    if not nearest:
+        return []
+
+    events_by_id = {
+        event.id: event
+        for event in db.query(models.Event).filter(models.Event.id.in_([event_id for _, event_id in nearest])).all()
+    }
+    results = []
+    for distance, event_id in nearest:
+        event = events_by_id.get(event_id)
+        if event is not None:
+            event.distance_km = round(distance, 3)
+            results.append(event)
+    return results
 
 def get_event(db: Session, event_id: UUID):
     """Belirli bir etkinliği ID'sine göre getirir."""
     return db.query(models.Event).filter(models.Event.id == event_id).first()
 
+async def get_event_async(db: AsyncSession, event_id: UUID):
+    result = await db.execute(select(models.Event).filter(models.Event.id == event_id))
+    return result.scalars().first()
+
+# --- Participants (Kontenjan) ---
+def reserve_seat(db: Session, event_id: UUID) -> bool:
+    """
+    Kontenjandan atomik olarak bir yer ayırır (COUNT(*) atmadan).
+    Koşullu UPDATE satırı kilitlediği için eşzamanlı katılımlarda kapasite aşılamaz.
+    Yer kalmadıysa False döner; çağıran kullanıcıyı bekleme listesine almalıdır.
+    İşlem çağıranın transaction'ında kalır (commit çağırana aittir).
+    """
+    result = db.execute(
+        update(models.Event)
+        .where(
+            models.Event.id == event_id,
+            models.Event.status != models.EventStatus.IPTAL,
+            or_(models.Event.capacity.is_(None), models.Event.participant_count < models.Event.capacity)
+        )
+        .values(participant_count=models.Event.participant_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+
+    # Son yer dolduysa etkinliği DOLDU yap
+    db.execute(
+        update(models.Event)
+        .where(
+            models.Event.id == event_id,
+            models.Event.status == models.EventStatus.AKTIF,
+            models.Event.participant_count >= models.Event.capacity
+        )
+        .values(status=models.EventStatus.DOLDU)
+        .execution_options(synchronize_session=False)
+    )
+    return True
+
+def release_seat(db: Session, event_id: UUID):
+    """Ayrılan onaylı katılımcının yerini boşaltır; DOLDU etkinlik tekrar AKTIF olur."""
+    db.execute(
+        update(models.Event)
+        .where(models.Event.id == event_id, models.Event.participant_count > 0)
+        .values(participant_count=models.Event.participant_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(models.Event)
+        .where(
+            models.Event.id == event_id,
+            models.Event.status == models.EventStatus.DOLDU,
+            models.Event.participant_count < models.Event.capacity
+        )
+        .values(status=models.EventStatus.AKTIF)
+        .execution_options(synchronize_session=False)
+    )
+
+def get_waitlist_position(db: Session, participant: models.EventParticipant) -> int:
+    return db.query(func.count(models.EventParticipant.id)).filter(
+        models.EventParticipant.event_id == participant.event_id,
+        models.EventParticipant.status == models.ParticipantStatus.WAITLIST.value,
+        models.EventParticipant.id <= participant.id
+    ).scalar()
+
+def get_waitlist(db: Session, event_id: UUID, limit: int = 20):
+    """Bekleme listesindeki ilk kullanıcılar (katılım sırasına göre), terfi için kilitlenerek."""
+    query = db.query(models.EventParticipant).filter(
+        models.EventParticipant.event_id == event_id,
+        models.EventParticipant.status == models.ParticipantStatus.WAITLIST.value
+    ).order_by(models.EventParticipant.id.asc()).limit(limit)
+    if db.get_bind().dialect.name == "postgresql":
+        # Aynı anda ayrılan iki kişi aynı bekleyeni terfi ettirmesin
+        query = query.with_for_update(skip_locked=True)
+    return query.all()
+
 # --- Users ---
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def user_exists_async(db: AsyncSession, user_id: UUID) -> bool:
+    result = await db.execute(select(models.User.id).filter(models.User.id == user_id))
+    return result.scalar() is not None
+
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = security.get_password_hash(user.password)
     db_user = models.User(
@@ -135,6 +345,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     )
     db.add(welcome_notif)
     db.commit()
+    suggest_index.index.upsert(suggest_index.USER, db_user.id, db_user.full_name, db_user.artibir_points)
     
     # JSON Takibi
     tracking.log_event("USER_REGISTER", {
@@ -146,7 +357,66 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 # --- Messages ---
-from services import encryption, moderation
+from services import encryption, moderation, event_spatial_index, response_cache, search_index, suggest_index
+
+# Gelen kutusunda gösterilen önizleme uzunluğu (karakter)
+CHAT_PREVIEW_LENGTH = 80
+
+def _conversation_pair(user1_id: UUID, user2_id: UUID) -> tuple:
+    return (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
+
+def _conversation_upsert(db, messages: list):
+    """
+    Yeni mesajlar için sohbet özetlerini tek INSERT ... ON CONFLICT DO UPDATE ile günceller (yarışsız).
+    messages: (id, sender_id, receiver_id, content, timestamp) demetleri. Son mesaj alanları sadece
+    gelen mesaj mevcut olandan yeniyse değişir; okunmamış sayaçları artırılır.
+    PostgreSQL ve SQLite desteklenir.
+    """
+    summaries = {}
+    for message_id, sender_id, receiver_id, content, timestamp in messages:
+        user_a_id, user_b_id = _conversation_pair(sender_id, receiver_id)
+        summary = summaries.setdefault((user_a_id, user_b_id), {
+            "user_a_id": user_a_id, "user_b_id": user_b_id, "last_message_at": None,
+            "last_message_id": None, "unread_a": 0, "unread_b": 0
+        })
+        # Kendine gönderilen mesaj okunmamış sayılmaz
+        if sender_id != receiver_id:
+            summary["unread_a" if receiver_id == user_a_id else "unread_b"] += 1
+        if summary["last_message_at"] is None or (timestamp, message_id) > (summary["last_message_at"], summary["last_message_id"]):
+            summary.update(last_message_id=message_id, last_sender_id=sender_id, last_preview=content, last_message_at=timestamp)
+    if not summaries:
+        return None
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    conversation = models.Conversation
+    statement = upsert_insert(conversation).values(list(summaries.values()))
+    excluded = statement.excluded
+    is_newer = or_(
+        conversation.last_message_at.is_(None),
+        excluded.last_message_at > conversation.last_message_at,
+        (excluded.last_message_at == conversation.last_message_at) & (excluded.last_message_id > conversation.last_message_id)
+    )
+
+    def latest(column):
+        return case((is_newer, getattr(excluded, column.key)), else_=column)
+
+    return statement.on_conflict_do_update(
+        index_elements=[conversation.user_a_id, conversation.user_b_id],
+        set_={
+            "last_message_id": latest(conversation.last_message_id),
+            "last_sender_id": latest(conversation.last_sender_id),
+            "last_preview": latest(conversation.last_preview),
+            "last_message_at": latest(conversation.last_message_at),
+            "unread_a": conversation.unread_a + excluded.unread_a,
+            "unread_b": conversation.unread_b + excluded.unread_b
+        }
+    )
+
+def _message_summary(db_message: models.Message) -> tuple:
+    return (db_message.id, db_message.sender_id, db_message.receiver_id, db_message.content, db_message.timestamp)
 
 def create_message(db: Session, message: schemas.MessageCreate, sender_id: UUID):
     encrypted_content = encryption.encrypt_message(message.content)
@@ -155,22 +425,247 @@ def create_message(db: Session, message: schemas.MessageCreate, sender_id: UUID)
         sender_id=sender_id,
         receiver_id=message.receiver_id,
         content=encrypted_content,
+        timestamp=datetime.datetime.utcnow()
     )
     db.add(db_message)
+    db.flush()
+    # Gelen kutusu özeti aynı transaction'da güncellenir
+    db.execute(_conversation_upsert(db, [_message_summary(db_message)]))
     db.commit()
     db.refresh(db_message)
     return db_message
 
-def get_chat_history(db: Session, user1_id: UUID, user2_id: UUID):
-    messages = db.query(models.Message).filter(
-        ((models.Message.sender_id == user1_id) & (models.Message.receiver_id == user2_id)) |
-        ((models.Message.sender_id == user2_id) & (models.Message.receiver_id == user1_id))
-    ).order_by(models.Message.timestamp).all()
+async def create_message_async(db: AsyncSession, message: schemas.MessageCreate, sender_id: UUID):
+    encrypted_content = encryption.encrypt_message(message.content)
     
-    for msg in messages:
-        msg.content = encryption.decrypt_message(msg.content)
-        
-    return messages
+    db_message = models.Message(
+        sender_id=sender_id,
+        receiver_id=message.receiver_id,
+        content=encrypted_content,
+        timestamp=datetime.datetime.utcnow()
+    )
+    db.add(db_message)
+    await db.flush()
+    await db.execute(_conversation_upsert(db, [_message_summary(db_message)]))
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+async def create_messages_bulk_async(db: AsyncSession, rows: list) -> dict:
+    """
+    Şifrelenmiş mesajları tek transaction'da toplu yazar (services/message_writer).
+    rows: sender_id, receiver_id, content, timestamp, client_id alanlı sözlükler.
+    Aynı (sender_id, client_id) ile daha önce yazılmış mesajlar atlanır (tekrar gönderim / journal tekrarı).
+    Dönüş: {(sender_id, client_id): (message_id, yeni_mi)}
+    """
+    client_ids = list({row["client_id"] for row in rows})
+    result = await db.execute(
+        select(models.Message.sender_id, models.Message.client_id, models.Message.id)
+        .filter(models.Message.client_id.in_(client_ids))
+    )
+    saved = {(sender_id, client_id): (message_id, False) for sender_id, client_id, message_id in result.all()}
+
+    new_rows = []
+    for row in rows:
+        key = (row["sender_id"], row["client_id"])
+        if key in saved:
+            continue
+        # Aynı batch içindeki tekrarlar da tek satır olur
+        saved[key] = (None, True)
+        new_rows.append(row)
+
+    if new_rows:
+        inserted = await db.execute(
+            insert(models.Message).returning(models.Message.sender_id, models.Message.client_id, models.Message.id),
+            new_rows
+        )
+        for sender_id, client_id, message_id in inserted.all():
+            saved[(sender_id, client_id)] = (message_id, True)
+        await db.execute(_conversation_upsert(db, [
+            (saved[(row["sender_id"], row["client_id"])][0], row["sender_id"], row["receiver_id"], row["content"], row["timestamp"])
+            for row in new_rows
+        ]))
+    await db.commit()
+    return saved
+
+# Sohbet dışa aktarımında her seferinde okunan mesaj sayısı
+CHAT_EXPORT_BATCH = 500
+
+def _decrypted_message(message: models.Message) -> schemas.MessageOut:
+    # ORM nesnesinin content alanı değiştirilmez (sonraki bir commit şifresiz içeriği yazmasın)
+    return schemas.MessageOut(
+        id=message.id,
+        sender_id=message.sender_id,
+        receiver_id=message.receiver_id,
+        content=encryption.decrypt_message(message.content),
+        timestamp=message.timestamp,
+        is_read=message.is_read,
+        client_id=message.client_id
+    )
+
+def _conversation_filter(user1_id: UUID, user2_id: UUID):
+    return or_(
+        (models.Message.sender_id == user1_id) & (models.Message.receiver_id == user2_id),
+        (models.Message.sender_id == user2_id) & (models.Message.receiver_id == user1_id)
+    )
+
+def _history_queries(user1_id: UUID, user2_id: UUID, anchor, limit: int, descending: bool) -> list:
+    """
+    Sohbetin iki yönü için ayrı sorgular: her biri (sender_id, receiver_id, timestamp) indeksinde
+    tek bir aralık taramasıdır. OR'lu tek sorgu indeksi bu sırada okuyamaz, tüm sohbeti sıralar.
+    """
+    key = tuple_(models.Message.timestamp, models.Message.id)
+    if descending:
+        order = (models.Message.timestamp.desc(), models.Message.id.desc())
+    else:
+        order = (models.Message.timestamp.asc(), models.Message.id.asc())
+    directions = [(user1_id, user2_id)] if user1_id == user2_id else [(user1_id, user2_id), (user2_id, user1_id)]
+    queries = []
+    for sender_id, receiver_id in directions:
+        query = select(models.Message).where(
+            models.Message.sender_id == sender_id,
+            models.Message.receiver_id == receiver_id
+        )
+        if anchor is not None:
+            query = query.where(key < tuple_(*anchor) if descending else key > tuple_(*anchor))
+        queries.append(query.order_by(*order).limit(limit))
+    return queries
+
+def _merge_history(rows: list, limit: int, descending: bool):
+    rows.sort(key=lambda message: (message.timestamp, message.id), reverse=descending)
+    return rows[:limit], len(rows) > limit
+
+def _anchor_query(user1_id: UUID, user2_id: UUID, message_id: int):
+    return select(models.Message.timestamp, models.Message.id).where(
+        models.Message.id == message_id,
+        _conversation_filter(user1_id, user2_id)
+    )
+
+def _invalid_anchor():
+    return HTTPException(status_code=400, detail="Geçersiz before_id: mesaj bu sohbete ait değil.")
+
+async def get_chat_history_async(db: AsyncSession, user1_id: UUID, user2_id: UUID, before_id: int = None, limit: int = 50):
+    """
+    Sohbetin before_id'den önceki (verilmezse en yeni) limit mesajını eskiden yeniye döner.
+    Sadece dönen sayfa çözülür. (mesajlar, sonraki_before_id) döner; daha eski mesaj yoksa None.
+    """
+    anchor = None
+    if before_id is not None:
+        anchor = (await db.execute(_anchor_query(user1_id, user2_id, before_id))).first()
+        if anchor is None:
+            raise _invalid_anchor()
+    rows = []
+    for query in _history_queries(user1_id, user2_id, anchor, limit + 1, descending=True):
+        rows.extend((await db.execute(query)).scalars().all())
+    page, has_more = _merge_history(rows, limit, descending=True)
+    page.reverse()
+    return [_decrypted_message(message) for message in page], (page[0].id if has_more else None)
+
+async def stream_chat_history_async(db: AsyncSession, user1_id: UUID, user2_id: UUID):
+    """
+    Tüm sohbeti eskiden yeniye, CHAT_EXPORT_BATCH'lik keyset parçalarıyla okur ve
+    mesajları tek tek çözerek üretir. Bellek kullanımı sohbet uzunluğundan bağımsızdır.
+    """
+    anchor = None
+    while True:
+        rows = []
+        for query in _history_queries(user1_id, user2_id, anchor, CHAT_EXPORT_BATCH + 1, descending=False):
+            rows.extend((await db.execute(query)).scalars().all())
+        page, has_more = _merge_history(rows, CHAT_EXPORT_BATCH, descending=False)
+        for message in page:
+            yield _decrypted_message(message)
+        if not has_more:
+            return
+        anchor = (page[-1].timestamp, page[-1].id)
+        # Okunan parçayı identity map'ten bırak
+        db.expunge_all()
+
+def _inbox_queries(user_id: UUID, cursor, limit: int) -> list:
+    """
+    Kullanıcının A ve B tarafında olduğu sohbetler için iki ayrı keyset sorgusu (her biri kendi indeksinde
+    tek aralık taraması). Karşı tarafın adı ve fotoğrafı users tablosundan birincil anahtarla eklenir.
+    """
+    conversation = models.Conversation
+    key = tuple_(conversation.last_message_at, conversation.id)
+    queries = []
+    for own_column, other_column in ((conversation.user_a_id, conversation.user_b_id), (conversation.user_b_id, conversation.user_a_id)):
+        query = select(conversation, models.User.full_name, models.User.profile_image).join(
+            models.User, models.User.id == other_column
+        ).where(own_column == user_id)
+        if own_column is conversation.user_b_id:
+            # Kendine yazılan sohbet iki sorguda da dönmesin
+            query = query.where(conversation.user_a_id != user_id)
+        if cursor is not None:
+            query = query.where(key < tuple_(*cursor))
+        queries.append(query.order_by(conversation.last_message_at.desc(), conversation.id.desc()).limit(limit + 1))
+    return queries
+
+def _inbox_page(user_id: UUID, rows: list, limit: int):
+    rows.sort(key=lambda row: (row[0].last_message_at, row[0].id), reverse=True)
+    page = rows[:limit]
+    items = []
+    for conversation, full_name, profile_image in page:
+        is_a = conversation.user_a_id == user_id
+        preview = encryption.decrypt_message(conversation.last_preview) if conversation.last_preview else None
+        items.append(schemas.ConversationOut(
+            id=conversation.id,
+            other_user_id=conversation.user_b_id if is_a else conversation.user_a_id,
+            other_user_name=full_name,
+            other_user_image=profile_image,
+            last_message_id=conversation.last_message_id,
+            last_sender_id=conversation.last_sender_id,
+            preview=preview[:CHAT_PREVIEW_LENGTH] if preview else preview,
+            last_message_at=conversation.last_message_at,
+            unread_count=conversation.unread_a if is_a else conversation.unread_b
+        ))
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1][0]
+        next_cursor = pagination.encode_cursor(last.last_message_at, last.id)
+    return items, next_cursor
+
+async def get_conversations_async(db: AsyncSession, user_id: UUID, cursor: str = None, limit: int = 20):
+    """
+    Gelen kutusu: kullanıcının sohbetleri son mesaja göre en yeni önce, sadece conversations tablosundan.
+    Sadece dönen sayfanın önizlemeleri çözülür. (sohbetler, sonraki_cursor) döner.
+    """
+    anchor = None
+    if cursor:
+        anchor = pagination.decode_cursor(cursor, models.Conversation.last_message_at, models.Conversation.id)
+    rows = []
+    for query in _inbox_queries(user_id, anchor, limit):
+        rows.extend((await db.execute(query)).all())
+    return _inbox_page(user_id, rows, limit)
+
+async def mark_conversation_read_async(db: AsyncSession, user_id: UUID, other_user_id: UUID, up_to_id: int = None) -> int:
+    """
+    Karşı taraftan gelen okunmamış mesajları (up_to_id verilirse o id'ye kadar olanları) tek UPDATE ile
+    okundu yapar ve sohbet özetindeki sayacı düşürür. Okundu yapılan mesaj sayısını döner.
+    """
+    if user_id == other_user_id:
+        return 0
+    mark_messages = update(models.Message).where(
+        models.Message.sender_id == other_user_id,
+        models.Message.receiver_id == user_id,
+        models.Message.is_read == False
+    ).values(is_read=True)
+    if up_to_id is not None:
+        mark_messages = mark_messages.where(models.Message.id <= up_to_id)
+    marked = (await db.execute(mark_messages)).rowcount
+
+    user_a_id, user_b_id = _conversation_pair(user_id, other_user_id)
+    unread_column = models.Conversation.unread_a if user_id == user_a_id else models.Conversation.unread_b
+    if up_to_id is None:
+        new_unread = 0
+    else:
+        new_unread = case((unread_column > marked, unread_column - marked), else_=0)
+    if marked or up_to_id is None:
+        await db.execute(update(models.Conversation).where(
+            models.Conversation.user_a_id == user_a_id,
+            models.Conversation.user_b_id == user_b_id
+        ).values({unread_column.key: new_unread}))
+    await db.commit()
+    return marked
 
 # --- Background & Cleanup ---
 def cleanup_expired_moments(db: Session):
@@ -1,39 +1,241 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, Insert, Update, Delete, Select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
+import time
+import threading
 from dotenv import load_dotenv
+from utils import slow_query_log
 
 load_dotenv()
 
 # Veritabanı bağlantı ayarları
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./artibir.db")
+# Opsiyonel okuma replikası (GET ağırlıklı endpointler için). Boşsa tüm sorgular ana veritabanına gider.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
 
 # Render/Heroku gibi platformlarda DATABASE_URL "postgres://" ile başlayabilir, 
 # SQLAlchemy "postgresql://" bekler.
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+if SQLALCHEMY_READ_DATABASE_URL and SQLALCHEMY_READ_DATABASE_URL.startswith("postgres://"):
+    SQLALCHEMY_READ_DATABASE_URL = SQLALCHEMY_READ_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+# Bağlantı havuzu ayarları (PostgreSQL). Worker sayısı x (pool_size + max_overflow)
+# toplamı veritabanının max_connections değerini aşmamalıdır.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+# Tek bir sorgunun sunucuda çalışabileceği maksimum süre (ms). 0 = sınırsız
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+
+class PoolMetrics:
+    """Havuzdan bağlantı alırken geçen bekleme sürelerini ve zaman aşımlarını tutar."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3)
+            }
+
+def _timed_do_get(pool, do_get):
+    started = time.perf_counter()
+    try:
+        connection = do_get()
+    except PoolTimeoutError:
+        pool.metrics.record(0, timed_out=True)
+        raise
+    pool.metrics.record((time.perf_counter() - started) * 1000)
+    return connection
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        return _timed_do_get(self, super()._do_get)
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        return _timed_do_get(self, super()._do_get)
+
+def _pool_kwargs(pool_class) -> dict:
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
 
 # Engine oluşturma (SQLite için check_same_thread gerekli, PostgreSQL için değil)
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=3600
+def _create_sync_engine(url: str):
+    if url.startswith("sqlite"):
+        return create_engine(
+            url, connect_args={"check_same_thread": False}
+        )
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        **_pool_kwargs(InstrumentedQueuePool)
     )
 
+engine = _create_sync_engine(SQLALCHEMY_DATABASE_URL)
+read_engine = _create_sync_engine(SQLALCHEMY_READ_DATABASE_URL) if SQLALCHEMY_READ_DATABASE_URL else None
+
+# Opsiyonel yavaş sorgu kaydı (SLOW_QUERY_LOG_MS > 0 ise aktif)
+slow_query_log.install(engine)
+if read_engine is not None:
+    slow_query_log.install(read_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class RoutingSession(Session):
+    """
+    SELECT'leri replikaya, yazma işlemlerini ana veritabanına yönlendirir.
+    Session bir kez yazma yaptıktan sonra (replikasyon gecikmesinde kendi yazdığını
+    okuyabilmesi için) isteğin geri kalanında ana veritabanında kalır.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is None or self.info.get("use_primary"):
+            return engine
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["use_primary"] = True
+            return engine
+        # SELECT ... FOR UPDATE kilitleri sadece ana veritabanında anlamlıdır
+        if isinstance(clause, Select) and clause._for_update_arg is not None:
+            self.info["use_primary"] = True
+            return engine
+        return read_engine
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session.info["use_primary"] = True
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
 Base = declarative_base()
 
+# Async Engine (async route'lar ve WebSocket'ler event loop'u bloklamasın diye)
+# Aynı veritabanı, async sürücü ile: PostgreSQL -> asyncpg, SQLite -> aiosqlite
+def to_async_url(url: str) -> str:
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+SQLALCHEMY_ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+try:
+    if SQLALCHEMY_ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+    else:
+        async_connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        async_engine = create_async_engine(
+            SQLALCHEMY_ASYNC_DATABASE_URL,
+            connect_args=async_connect_args,
+            **_pool_kwargs(InstrumentedAsyncQueuePool)
+        )
+    # expire_on_commit=False: commit sonrası attribute erişimi lazy load (await'siz IO) tetiklemesin
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    slow_query_log.install(async_engine.sync_engine)
+except Exception as e:
+    print(f"Async Engine Error: {e}")
+    async_engine = None
+    AsyncSessionLocal = None
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Okuma ağırlıklı endpointler için replikaya yönlenen session (replika yoksa ana veritabanı)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async veritabanı sürücüsü bulunamadı (asyncpg / aiosqlite kurulu olmalı).")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _describe_pool(target_engine) -> dict:
+    pool = target_engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        checked_out = pool.checkedout()
+        status.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": checked_out,
+            "idle": pool.checkedin(),
+            # overflow() havuz boyutunun ne kadar aşıldığını gösterir (negatifse henüz açılmamış bağlantı var)
+            "overflow": max(pool.overflow(), 0),
+            "capacity_left": pool.size() + pool._max_overflow - checked_out
+        })
+    if hasattr(pool, "metrics"):
+        status["wait"] = pool.metrics.snapshot()
+    return status
+
+def get_pool_status() -> dict:
+    """Admin paneli için bu worker'daki havuzların anlık durumu."""
+    status = {
+        "settings": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS
+        },
+        "sync": _describe_pool(engine)
+    }
+    if read_engine is not None:
+        status["read_replica"] = _describe_pool(read_engine)
+    if async_engine is not None:
+        status["async"] = _describe_pool(async_engine.sync_engine)
+    return status
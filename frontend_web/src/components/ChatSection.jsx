@@ -34,46 +34,72 @@ const ChatSection = () => {
 
     // WebSocket Setup
     useEffect(() => {
-        const token = localStorage.getItem('token');
-        if (!token) return;
+        let reconnectTimer = null;
+        let closedByUnmount = false;
 
-        // WebSocket URL
-        const wsUrl = `ws://localhost:8000/ws/chat/${token}`;
-        ws.current = new WebSocket(wsUrl);
+        const connect = () => {
+            const token = localStorage.getItem('token');
+            if (!token) return;
 
-        ws.current.onopen = () => {
-            console.log("WebSocket connected");
-            setIsConnected(true);
-        };
+            // WebSocket URL
+            const wsUrl = `ws://localhost:8000/ws/chat/${token}`;
+            const socket = new WebSocket(wsUrl);
+            ws.current = socket;
 
-        ws.current.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-            
-            if (data.type === 'error') {
-                alert("Uyarı: " + data.message);
-                return;
-            }
+            socket.onopen = () => {
+                console.log("WebSocket connected");
+                setIsConnected(true);
+            };
 
-            // If message belongs to current chat or I am the sender
-            setMessages(prev => {
-                // Duplicate check
-                if (prev.find(m => m.id === data.id)) return prev;
-                return [...prev, data];
-            });
-        };
+            socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+
+                // Server heartbeat: answer so the connection is not reaped as idle
+                if (data.type === 'ping') {
+                    socket.send(JSON.stringify({ type: 'pong' }));
+                    return;
+                }
+
+                if (data.type === 'error') {
+                    alert("Uyarı: " + data.message);
+                    return;
+                }
 
-        ws.current.onclose = () => {
-            console.log("WebSocket disconnected");
-            setIsConnected(false);
-            // Reconnect after 3 seconds
-            setTimeout(() => {
-                if (localStorage.getItem('token')) {
-                    // Trigger effect again or just manually connect
+                // Message persisted: attach its permanent id to the live copy (matched by client_id)
+                if (data.type === 'message_saved') {
+                    setMessages(prev => prev.map(m => m.client_id === data.client_id ? { ...m, id: data.id } : m));
+                    return;
                 }
-            }, 3000);
+
+                // Other control frames (pong etc.) are not chat messages
+                if (data.type) return;
+
+                // If message belongs to current chat or I am the sender
+                setMessages(prev => {
+                    // Duplicate check: live frames carry "id": null until saved, so key on client_id
+                    const isDuplicate = prev.some(m =>
+                        (data.client_id && m.client_id === data.client_id) || (data.id != null && m.id === data.id)
+                    );
+                    if (isDuplicate) return prev;
+                    return [...prev, data];
+                });
+            };
+
+            socket.onclose = () => {
+                console.log("WebSocket disconnected");
+                setIsConnected(false);
+                // Reconnect after 3 seconds (server restart, idle close, network change)
+                if (!closedByUnmount) {
+                    reconnectTimer = setTimeout(connect, 3000);
+                }
+            };
         };
 
+        connect();
+
         return () => {
+            closedByUnmount = true;
+            clearTimeout(reconnectTimer);
             if (ws.current) ws.current.close();
         };
     }, []);
@@ -252,7 +278,7 @@ const ChatSection = () => {
                                         <motion.div 
                                             initial={{ opacity: 0, y: 10, scale: 0.95 }}
                                             animate={{ opacity: 1, y: 0, scale: 1 }}
-                                            key={msg.id || index} 
+                                            key={msg.client_id || msg.id || index} 
                                             style={{ 
                                                 alignSelf: isMe ? 'flex-end' : 'flex-start', 
                                                 maxWidth: '75%',
@@ -1,6 +1,7 @@
 import os
 import logging
 import json
+import asyncio
 from dotenv import load_dotenv
 
 # 1. Kritik Ayarları Yükle (Importlardan Önce!)
@@ -15,15 +16,12 @@ from routers import (
     participants, security_management,
     clubs, social, intelligence, search, feed, admin_api
 )
-from utils import tracking
+from utils import tracking, sql_profiler
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 # --- LOGGING SETUP ---
 logging.basicConfig(
@@ -43,12 +41,14 @@ try:
 except Exception as e:
     logger.error(f"Uyarı: Tablo oluşturulurken hata oluştu: {e}")
 
+# Global arama için tam metin indeksi (SQLite: FTS5, PostgreSQL: tsvector + GIN)
+# Tablolar varsa worker sadece varlık kontrolü yapar; yoksa tek bir worker kilit altında oluşturur (sync_db de oluşturur)
+from services import search_index
+SEARCH_INDEX_CREATED = search_index.ensure_schema(engine)
+
 # 2. Uygulamayı Başlat
-# Rate Limiter Tanımlama (IP bazlı)
-limiter = Limiter(key_func=get_remote_address)
+# Rate limit: services/rate_limiter.py (RATE_LIMIT_BACKEND=redis ile tüm worker'larda ortak)
 app = FastAPI(title="ArtıBir Backend V2")
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Global Exception Handler
 @app.exception_handler(Exception)
@@ -91,6 +91,14 @@ async def json_tracking_middleware(request: Request, call_next):
         )
     return response
 
+# 2.55 SQL Profiler Middleware (İstek başına sorgu sayısı, DB süresi ve N+1 uyarısı)
+@app.middleware("http")
+async def sql_profiler_middleware(request: Request, call_next):
+    stats = sql_profiler.start_request(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    sql_profiler.add_debug_headers(response, stats)
+    return response
+
 # 2.6 Güvenlik Başlıkları Middleware (Katman 2)
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -163,4 +171,38 @@ async def startup_event():
     logger.info("="*60)
     logger.info("🚀 ArtıBir Backend Hazır!")
     logger.info("📄 Swagger UI (Dokümantasyon): http://127.0.0.1:8000/docs")
-    logger.info("="*60)
\ No newline at end of file
+    logger.info("="*60)
+    # Harita sorguları için bellek içi etkinlik indeksi (periyodik yenileme)
+    from services import event_spatial_index
+    app.state.event_index_task = asyncio.create_task(event_spatial_index.run_refresh_loop())
+    # Arama çubuğu önerileri için bellek içi önek indeksi
+    from services import suggest_index
+    app.state.suggest_index_task = asyncio.create_task(suggest_index.run_refresh_loop())
+    # Sohbet mesajı yazıcısı: önceki kapanıştan kalan journal'ı yazar, toplu kayıt task'ını başlatır
+    from services import message_writer
+    await message_writer.start()
+    # Arama tablosu ilk kez oluşturulduysa mevcut kayıtları arka planda indeksle
+    if SEARCH_INDEX_CREATED:
+        asyncio.create_task(asyncio.to_thread(search_index.rebuild, engine))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Bcrypt process havuzunu kapat (worker'lar yetim kalmasın)
+    from services import password_hasher
+    password_hasher.hasher.shutdown()
+    for task_name in ("event_index_task", "suggest_index_task"):
+        task = getattr(app.state, task_name, None)
+        if task is not None:
+            task.cancel()
+    # WebSocket heartbeat / boşta bağlantı temizleyici task'larını durdur
+    from utils import ws_heartbeat
+    await ws_heartbeat.shutdown()
+    # Kuyruktaki sohbet mesajlarını yaz (yazılamayanlar journal'a), onaylar veri yolu kapanmadan gitsin
+    from services import message_writer
+    await message_writer.shutdown()
+    # Sohbet veri yolunun aboneliklerini ve varlık kayıtlarını bırak
+    from services import chat_bus
+    await chat_bus.shutdown()
+    # Scraper'ın HTTP bağlantı havuzunu kapat
+    from services.scraper_service import scraper
+    await scraper.aclose()
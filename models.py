@@ -1,7 +1,7 @@
 import enum
 import uuid
 import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Enum as SAEnum, Numeric, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Enum as SAEnum, Numeric, Text, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from database import Base
@@ -130,6 +130,8 @@ class Event(Base):
     # SQLite ve Bounding Box sorguları için gerekli
     latitude = Column(Numeric(10, 8), nullable=True)
     longitude = Column(Numeric(11, 8), nullable=True)
+    # Yakındaki etkinlik araması için ızgara hücresi (utils/geo.py, crud.create_event doldurur)
+    geo_cell = Column(Integer, nullable=True)
     
     min_age_limit = Column(Integer)
     max_age_limit = Column(Integer)
@@ -147,9 +149,13 @@ class Event(Base):
     category = Column(String, index=True, nullable=True)
     image_url = Column(String, nullable=True)
     external_url = Column(String, nullable=True)
+    # Dışarıdan çekilen etkinliklerin parmak izi (başlık + tarih + şehir), tekrar oluşturmayı önler
+    source_hash = Column(String(64), nullable=True)
     
     # Eksik Kolonlar
     capacity = Column(Integer, default=10) # Maksimum katılımcı sayısı
+    # Onaylı katılımcı sayısı (crud.reserve_seat / release_seat ile atomik güncellenir, COUNT(*) gerekmez)
+    participant_count = Column(Integer, default=0, nullable=False)
     price = Column(Numeric(10, 2), default=0.00) # Ücretli etkinlikler için
     location_name = Column(String(255), nullable=True) # "Mecidiyeköy Starbucks" gibi açık adres
 
@@ -158,6 +164,15 @@ class Event(Base):
     host = relationship("User", foreign_keys=[host_id])
     club = relationship("Club", back_populates="events")
 
+    __table_args__ = (
+        # Listeleme/öneri: status + şehir filtresi, tarihe göre sıralama
+        Index("ix_events_status_city_date", "status", "city", "date"),
+        # Yakındaki etkinlikler: hücre aralığı taraması + tarih filtresi
+        Index("ix_events_geo_cell_date", "geo_cell", "date"),
+        # Scraper tekrar kontrolü: parti başına tek IN sorgusu
+        Index("ix_events_source_hash", "source_hash"),
+    )
+
 # --- MATCHING & INTERESTS (Many-to-Many) ---
 
 class UserInterest(Base):
@@ -182,7 +197,11 @@ class EventParticipant(Base):
     qr_scanned = Column(Boolean, default=False)
     check_in_time = Column(DateTime, nullable=True)
 
-    __table_args__ = (UniqueConstraint('event_id', 'user_id', name='_event_user_uc'),)
+    __table_args__ = (
+        UniqueConstraint('event_id', 'user_id', name='_event_user_uc'),
+        # "Katıldığım etkinlikler" sorgusu user_id ile başlar, unique constraint bunu karşılamaz
+        Index("ix_event_participants_user_id", "user_id"),
+    )
 
     event = relationship("Event")
     user = relationship("User")
@@ -211,6 +230,10 @@ class LiveTracking(Base):
     transport_type = Column(String(20), default="walk")
     last_updated = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_event_live_tracking_event_updated", "event_id", "last_updated"),
+    )
+
 class VoiceRoom(Base):
     __tablename__ = "voice_rooms"
 
@@ -261,10 +284,44 @@ class Message(Base):
     content = Column(String)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     is_read = Column(Boolean, default=False)
+    # İstemcinin (veya sunucunun) mesaja verdiği ULID; tekrar gönderilen mesaj ikinci kez yazılmaz
+    client_id = Column(String(26))
 
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
 
+    __table_args__ = (
+        # Sohbet geçmişi: (gönderen, alıcı) çifti + zaman sıralaması (iki yön de aynı indeksi kullanır)
+        Index("ix_messages_sender_receiver_ts", "sender_id", "receiver_id", "timestamp"),
+        Index("ux_messages_sender_client_id", "sender_id", "client_id", unique=True),
+    )
+
+class Conversation(Base):
+    """
+    İki kullanıcı arasındaki sohbetin özeti (gelen kutusu). Çift sıralı tutulur: user_a_id < user_b_id.
+    Her yeni mesajda crud içinde artımlı güncellenir; gelen kutusu messages tablosuna hiç gitmeden listelenir.
+    """
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True)
+    user_a_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_b_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    last_message_id = Column(Integer)
+    last_sender_id = Column(UUID(as_uuid=True))
+    # Son mesajın şifreli içeriği (listede sadece dönen sayfa çözülür)
+    last_preview = Column(String)
+    last_message_at = Column(DateTime)
+    # Tarafların okumadığı mesaj sayıları
+    unread_a = Column(Integer, default=0, nullable=False)
+    unread_b = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_a_id', 'user_b_id', name='_conversation_pair_uc'),
+        # Gelen kutusu: kullanıcının iki taraftaki sohbetleri, en yeni önce (keyset)
+        Index("ix_conversations_a_last", "user_a_id", "last_message_at", "id"),
+        Index("ix_conversations_b_last", "user_b_id", "last_message_at", "id"),
+    )
+
 class LoginDevice(Base):
     __tablename__ = "login_devices"
     id = Column(Integer, primary_key=True)
@@ -314,6 +371,10 @@ class Transaction(Base):
 
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_transactions_user_created", "user_id", "created_at"),
+    )
+
 class MarketplaceItem(Base):
     __tablename__ = "marketplace_items"
     id = Column(Integer, primary_key=True)
@@ -365,6 +426,10 @@ class Notification(Base):
 
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+    )
+
 class Club(Base):
     __tablename__ = "clubs"
     id = Column(Integer, primary_key=True)
@@ -394,6 +459,11 @@ class Friendship(Base):
     status = Column(String(20), default="pending") # pending, accepted, blocked
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # Ters yön (friend_id tarafı) PK ile karşılanmıyor
+        Index("ix_friendships_friend_status", "friend_id", "status"),
+    )
+
 class EventMoment(Base):
     __tablename__ = "event_moments"
     id = Column(Integer, primary_key=True)
@@ -405,3 +475,7 @@ class EventMoment(Base):
     expires_at = Column(DateTime) # created_at + 24 hours
     view_count = Column(Integer, default=0) # Görüntülenme sayısı
     location_name = Column(String(100), nullable=True) # Konum etiketi
+
+    __table_args__ = (
+        Index("ix_event_moments_user_expires", "user_id", "expires_at"),
+    )
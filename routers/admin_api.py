@@ -4,11 +4,13 @@ from uuid import UUID
 import database, models, schemas, security
 from typing import List
 from sqlalchemy import func
+from sqlalchemy.orm import aliased
 
 router = APIRouter(prefix="/admin-api", tags=["Admin Actions"])
 
 from fastapi.responses import FileResponse
-from utils import encryption_utils
+from utils import encryption_utils, slow_query_log
+from services import principal_cache, password_hasher, rate_limiter, event_spatial_index, response_cache, suggest_index, scraper_service, chat_bus
 
 def check_admin(current_user: models.User = Depends(security.get_current_user)):
     # Master Bypass: Kurucu veya Admin kelimesi geçenleri her zaman içeri al
@@ -49,6 +51,7 @@ def verify_user(
     user.blue_tick_status = "approved"
     user.trust_score += 20
     db.commit()
+    principal_cache.invalidate_user(user.id)
     return {"message": f"{user.full_name} başarıyla onaylandı ve hassas veriler imha edildi.", "status": "verified"}
 
 @router.post("/ban-user/{user_id}")
@@ -66,6 +69,7 @@ def ban_user(
     user.trust_score = 0
     # İleride is_active = False eklenebilir
     db.commit()
+    principal_cache.invalidate_user(user.id)
     return {"message": f"{user.full_name} kısıtlandı. Neden: {reason}", "status": "banned"}
 
 @router.get("/system-stats")
@@ -87,6 +91,80 @@ def get_system_stats(
         "health": "excellent"
     }
 
+@router.get("/principal-cache")
+def get_principal_cache_stats(admin: models.User = Depends(check_admin)):
+    """Kimlik (token -> kullanıcı) önbelleğinin isabet/ıskalama sayaçlarını döner (bu worker için)."""
+    return principal_cache.get_stats()
+
+@router.get("/password-hasher")
+def get_password_hasher_stats(admin: models.User = Depends(check_admin)):
+    """Bcrypt process havuzunun kuyruk ve süre metriklerini döner (bu worker için)."""
+    return password_hasher.get_stats()
+
+@router.get("/rate-limiter")
+def get_rate_limiter_stats(admin: models.User = Depends(check_admin)):
+    """Rate limiter'ın yerel/Redis karar sayılarını döner (bu worker için)."""
+    return rate_limiter.get_stats()
+
+@router.get("/db-pool")
+def get_db_pool_status(admin: models.User = Depends(check_admin)):
+    """Veritabanı bağlantı havuzunun doluluk, taşma ve bekleme sürelerini döner (bu worker için)."""
+    return database.get_pool_status()
+
+@router.get("/slow-queries")
+def get_slow_queries(limit: int = 20, admin: models.User = Depends(check_admin)):
+    """Toplam süreye göre en pahalı yavaş sorgular (SLOW_QUERY_LOG_MS ile açılır, bu worker için)."""
+    return slow_query_log.top_offenders(limit)
+
+@router.get("/event-index")
+def get_event_index_stats(admin: models.User = Depends(check_admin)):
+    """Bellek içi etkinlik harita indeksinin doluluk, isabet ve yenileme bilgileri (bu worker için)."""
+    return event_spatial_index.get_stats()
+
+@router.get("/response-cache")
+def get_response_cache_stats(admin: models.User = Depends(check_admin)):
+    """Liste yanıt önbelleğinin isabet oranı, 304 sayısı ve geçersiz kılma istatistikleri (bu worker için)."""
+    return response_cache.get_stats()
+
+@router.get("/suggest-index")
+def get_suggest_index_stats(admin: models.User = Depends(check_admin)):
+    """Arama önerisi önek indeksinin kayıt sayıları, bellek kullanımı ve yenileme bilgileri (bu worker için)."""
+    return suggest_index.get_stats()
+
+@router.get("/scraper")
+def get_scraper_stats(admin: models.User = Depends(check_admin)):
+    """Etkinlik tarayıcısının istek, 304, değişmeyen sayfa ve hata sayıları (bu worker için)."""
+    return scraper_service.get_stats()
+
+@router.get("/chat-bus")
+def get_chat_bus_stats(admin: models.User = Depends(check_admin)):
+    """Sohbet teslimat veri yolunun yayın, çevrimdışı atlama ve teslim gecikmesi (p50/p95/p99) ölçümleri (bu worker için)."""
+    return chat_bus.get_stats()
+
+@router.get("/chat-connections")
+def get_chat_connection_stats(admin: models.User = Depends(check_admin)):
+    """Bu worker'daki sohbet soketleri: kullanıcı/soket sayısı, çok cihazlı kullanıcılar, kuyruk derinliği ve atılan mesajlar."""
+    from routers.chat import manager
+    return manager.stats()
+
+@router.get("/chat-writer")
+def get_chat_writer_stats(admin: models.User = Depends(check_admin)):
+    """Sohbet mesajı write-behind kuyruğu: bekleyen mesajlar, batch boyutları, yazma hataları, journal."""
+    from services import message_writer
+    return message_writer.get_stats()
+
+@router.get("/tracking-connections")
+def get_tracking_connection_stats(admin: models.User = Depends(check_admin)):
+    """Bu worker'daki canlı takip soketleri: oda/soket sayısı, kuyruk derinliği, birleştirilen konum güncellemeleri."""
+    from routers.live_tracking import manager
+    return manager.stats()
+
+@router.get("/websockets")
+def get_websocket_stats(admin: models.User = Depends(check_admin)):
+    """Bu worker'daki WebSocket endpoint'leri: canlı soketler, temizlenen boşta bağlantılar, gelen/giden mesaj ve bayt hızları."""
+    from utils import ws_heartbeat
+    return ws_heartbeat.get_stats()
+
 @router.get("/users", response_model=List[schemas.UserOut])
 def get_all_users(
     db: Session = Depends(database.get_db),
@@ -101,22 +179,30 @@ def get_all_reports(
     admin: models.User = Depends(check_admin)
 ):
     """Tüm şikayetleri listeler (Admin Only)."""
-    reports = db.query(models.UserReport).order_by(models.UserReport.created_at.desc()).all()
-    
     # Detaylı bilgi dönelim (Reporter ve Reported isimleri)
+    # OPTİMİZASYON: Rapor başına 2 kullanıcı sorgusu yerine tek sorguda JOIN
+    reporter_user = aliased(models.User)
+    reported_user = aliased(models.User)
+    reports = db.query(
+        models.UserReport,
+        reporter_user.full_name,
+        reported_user.full_name
+    ).outerjoin(
+        reporter_user, reporter_user.id == models.UserReport.reporter_id
+    ).outerjoin(
+        reported_user, reported_user.id == models.UserReport.reported_id
+    ).order_by(models.UserReport.created_at.desc()).all()
+    
     result = []
-    for r in reports:
-        reporter = db.query(models.User).filter(models.User.id == r.reporter_id).first()
-        reported = db.query(models.User).filter(models.User.id == r.reported_id).first()
-        
+    for r, reporter_name, reported_name in reports:
         result.append({
             "id": r.id,
             "reason": r.reason,
             "details": r.details,
             "status": r.status,
             "created_at": r.created_at,
-            "reporter_name": reporter.full_name if reporter else "Unknown",
-            "reported_name": reported.full_name if reported else "Unknown",
+            "reporter_name": reporter_name if reporter_name else "Unknown",
+            "reported_name": reported_name if reported_name else "Unknown",
             "reported_id": r.reported_id
         })
     return result
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import datetime
 # Üst klasörden modülleri çağırıyoruz
@@ -9,28 +10,26 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, security
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from services import rate_limiter
 
 router = APIRouter(tags=["Authentication"])
 get_db = database.get_db
-limiter = Limiter(key_func=get_remote_address)
 
-@router.post("/login")
-@limiter.limit("5/minute") # Dakikada maksimum 5 giriş denemesi
-def login(request: Request, user_data: schemas.UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", dependencies=[Depends(rate_limiter.limit_by_ip("5/minute"))]) # Dakikada maksimum 5 giriş denemesi
+async def login(request: Request, user_data: schemas.UserLogin, db: Session = Depends(get_db)):
     """
     Kullanıcı Girişi (Login)
+    Bcrypt doğrulaması process havuzunda beklenir, API thread'i bloklanmaz.
     """
     # GÜVENLİK BOTU: Girdi Süzgeci
     from utils.security_bot import validate_input_raise
     validate_input_raise(user_data.email, "E-posta")
 
     # Kullanıcıyı bul
-    user = crud.get_user_by_email(db, email=user_data.email)
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=user_data.email)
     
     # Kullanıcı yoksa veya şifre yanlışsa hata ver
-    if not user or not security.verify_password(user_data.password, user.password):
+    if not user or not await security.verify_password_async(user_data.password, user.password):
         raise HTTPException(status_code=400, detail="Hatalı e-posta veya şifre!")
     
     # JWT Token oluştur
@@ -54,6 +53,7 @@ def login(request: Request, user_data: schemas.UserLogin, db: Session = Depends(
 # --- UNUTULAN ŞİFRE İŞLEMLERİ ---
 from pydantic import EmailStr, BaseModel
 from services import notification
+from services import principal_cache
 import random
 
 class ForgotPasswordRequest(BaseModel):
@@ -93,15 +93,16 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
     return {"status": "success", "message": "Şifre sıfırlama kodu gönderildi."}
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
     """Yeni şifreyi kaydeder."""
-    user = crud.get_user_by_email(db, email=request.email)
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=request.email)
     if not user or user.password_reset_code != request.code:
         raise HTTPException(status_code=400, detail="Geçersiz e-posta veya kod!")
     
     # Şifreyi güncelle ve kodu sil
-    user.password = security.get_password_hash(request.new_password)
+    user.password = await security.get_password_hash_async(request.new_password)
     user.password_reset_code = None
-    db.commit()
+    await run_in_threadpool(db.commit)
+    principal_cache.invalidate_user(user.id)
     
     return {"status": "success", "message": "Şifreniz başarıyla güncellendi. Giriş yapabilirsiniz."}
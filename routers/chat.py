@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.concurrency import run_in_threadpool
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional
 import json
 import sys
 import os
@@ -10,38 +11,133 @@ from uuid import UUID
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, models, security
-from services import moderation, encryption
+from services import moderation, encryption, rate_limiter, chat_bus, message_writer
+from utils import pagination, ws_outbox, ws_heartbeat
 
 router = APIRouter(tags=["Chat"])
 get_db = database.get_db
+get_async_db = database.get_async_db
+
+MAX_HISTORY_PAGE = 200
+MAX_INBOX_PAGE = 50
+# Tek bir sokete yazma için üst süre; aşılırsa soket ölü sayılıp kapatılır
+CHAT_SEND_TIMEOUT = float(os.getenv("CHAT_SEND_TIMEOUT", 5))
+# Soket başına bekleyebilecek giden mesaj sayısı ve yazma olmadan atılan mesaj sayısı kopma eşiği
+CHAT_OUTBOX_SIZE = int(os.getenv("CHAT_OUTBOX_SIZE", 256))
+CHAT_OUTBOX_DISCONNECT_AFTER = int(os.getenv("CHAT_OUTBOX_DISCONNECT_AFTER", 32))
 
 # Bağlantı Yöneticisi
+# Bu worker'daki soketleri tutar; teslimat services/chat_bus üzerinden yapılır
+# (CHAT_BUS_BACKEND=redis ile alıcı başka bir worker'a bağlı olsa da mesaj ulaşır).
+# Bir kullanıcının birden fazla cihazı (telefon + bilgisayar) aynı anda bağlı olabilir.
+# Her soketin sınırlı giden kuyruğu ve yazıcı task'ı vardır (utils/ws_outbox): gönderen beklemez,
+# yazılamayan/zaman aşımına uğrayan veya kuyruğu sürekli taşan soket kapatılıp çıkarılır.
 class ConnectionManager:
-    def __init__(self):
-        # user_id -> WebSocket bağlantısı eşleşmesi
-        self.active_connections: Dict[UUID, WebSocket] = {}
+    def __init__(self, send_timeout: float, outbox_size: int, disconnect_after: int):
+        # user_id -> {websocket: outbox} (o kullanıcının bu worker'daki soketleri)
+        self.active_connections: Dict[UUID, Dict[WebSocket, ws_outbox.Outbox]] = {}
+        self.send_timeout = send_timeout
+        self.outbox_size = outbox_size
+        self.disconnect_after = disconnect_after
+        self.bus = chat_bus.create_bus(self._deliver_local, self.is_connected)
+        self.outbox_stats = ws_outbox.OutboxStats()
+        self.heartbeat = ws_heartbeat.create_heartbeat("chat")
+        self.pruned = 0
+
+    def is_connected(self, user_id) -> bool:
+        return UUID(str(user_id)) in self.active_connections
 
-    async def connect(self, websocket: WebSocket, user_id: UUID):
+    async def connect(self, websocket: WebSocket, user_id: UUID) -> ws_outbox.Outbox:
         await websocket.accept()
-        self.active_connections[user_id] = websocket
 
-    def disconnect(self, user_id: UUID):
-        if user_id in self.active_connections:
+        async def on_dead(outbox):
+            # Ölü veya yavaş soket: kuyruğu kapatıldı, kümeden çıkar (endpoint döngüsü de disconnect ile sonlanır)
+            self.pruned += 1
+            await self.disconnect(websocket, user_id)
+
+        # Sohbet mesajları birleştirilemez: taşmada en eski atılır, istemci yeniden bağlanınca geçmişi çeker
+        outbox = ws_outbox.Outbox(
+            websocket, self.outbox_size, ws_outbox.DROP_OLDEST, self.disconnect_after, self.send_timeout, on_dead
+        ).start()
+        sockets = self.active_connections.setdefault(user_id, {})
+        sockets[websocket] = outbox
+        self.heartbeat.register(outbox)
+        # Veri yoluna sadece kullanıcının bu worker'daki ilk cihazında abone olunur
+        if len(sockets) == 1:
+            await self.bus.user_connected(user_id)
+        return outbox
+
+    async def disconnect(self, websocket: WebSocket, user_id: UUID):
+        sockets = self.active_connections.get(user_id)
+        if sockets is None or websocket not in sockets:
+            return
+        outbox = sockets.pop(websocket)
+        self.heartbeat.unregister(outbox)
+        await outbox.close()
+        self.outbox_stats.absorb(outbox)
+        if not sockets:
             del self.active_connections[user_id]
+            await self.bus.user_disconnected(user_id)
+
+    async def _deliver_local(self, user_id, message: str) -> bool:
+        # Sadece kuyruğa ekler, sokete yazmayı beklemez (maliyet cihaz sayısıyla sınırlı)
+        sockets = self.active_connections.get(UUID(str(user_id)))
+        if not sockets:
+            return False
+        results = [outbox.put(message) for outbox in list(sockets.values())]
+        return any(results)
+
+    def send_to_socket(self, websocket: WebSocket, user_id: UUID, message: str):
+        """Sadece bu bağlantıya (örn. hata yanıtı), diğer mesajlarla aynı sırada gönderir."""
+        outbox = self.active_connections.get(user_id, {}).get(websocket)
+        if outbox is not None:
+            outbox.put(message)
+
+    async def send_personal_message(self, message: str, user_id: UUID) -> bool:
+        """Alıcı herhangi bir worker'da çevrimiçiyse mesajı tüm cihazlarına iletir, değilse yayın yapmadan False döner."""
+        return await self.bus.publish(user_id, message)
+
+    def stats(self) -> dict:
+        socket_counts = [len(sockets) for sockets in self.active_connections.values()]
+        return {
+            "pid": os.getpid(),
+            "users": len(socket_counts),
+            "sockets": sum(socket_counts),
+            "multi_device_users": sum(1 for count in socket_counts if count > 1),
+            "max_sockets_per_user": max(socket_counts, default=0),
+            "pruned": self.pruned,
+            "send_timeout_seconds": self.send_timeout,
+            "outbox": self.outbox_stats.snapshot(
+                outbox for sockets in self.active_connections.values() for outbox in sockets.values()
+            )
+        }
+
+manager = ConnectionManager(CHAT_SEND_TIMEOUT, CHAT_OUTBOX_SIZE, CHAT_OUTBOX_DISCONNECT_AFTER)
+
 
-    async def send_personal_message(self, message: str, user_id: UUID):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(message)
+async def _message_saved(message, message_id: int, is_new: bool):
+    # Kalıcı id'yi iki tarafın tüm cihazlarına bildir: gönderen onay gelmeyen mesajı aynı client_id ile
+    # tekrar gönderir, alıcı "id": None ile aldığı mesajı client_id üzerinden kalıcı id'siyle eşler
+    payload = json.dumps({"type": "message_saved", "client_id": message.client_id, "id": message_id})
+    await manager.send_personal_message(payload, message.sender_id)
+    if message.receiver_id != message.sender_id:
+        await manager.send_personal_message(payload, message.receiver_id)
 
-manager = ConnectionManager()
+async def _message_rejected(message, reason: str):
+    # Kalıcı hata ile yazılamayan mesaj: gönderen client_id ile hangi mesajın kaydedilmediğini görür
+    payload = {"type": "error", "client_id": message.client_id, "message": reason}
+    await manager.send_personal_message(json.dumps(payload), message.sender_id)
+
+# WebSocket mesajları arka planda toplu yazılır (services/message_writer)
+writer = message_writer.create_writer(_message_saved, on_rejected=_message_rejected)
 
 # --- 3. MESAJ GÖNDER (POST /chat/send) ---
 # WebSocket yerine HTTP üzerinden mesaj atma (Güvenlik Botu Dahil)
-@router.post("/chat/send", response_model=schemas.MessageOut)
+@router.post("/chat/send", response_model=schemas.MessageOut, dependencies=[Depends(rate_limiter.limit_by_user("60/minute", scope="chat_send"))])
 async def send_message(
     message: schemas.MessageCreate,
     current_user: models.User = Depends(security.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     HTTP üzerinden güvenli mesaj gönderme.
@@ -56,7 +152,7 @@ async def send_message(
         raise HTTPException(status_code=400, detail=f"Mesaj engellendi: {reason}")
     
     # 2. Veritabanına Kaydet
-    saved_message = crud.create_message(db, message, sender_id=current_user.id)
+    saved_message = await crud.create_message_async(db, message, sender_id=current_user.id)
     
     # 3. Eğer alıcı online ise WebSocket ile ilet (Opsiyonel ama şık olur)
     # Mesaj objesini hazırla
@@ -73,19 +169,14 @@ async def send_message(
 
 # --- 1. WebSocket ile Gerçek Zamanlı Mesajlaşma ---
 @router.websocket("/ws/chat/{token}")
-async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, token: str, db: AsyncSession = Depends(get_async_db)):
     """
     WebSocket üzerinden anlık mesajlaşma.
     Token URL parametresi olarak alınır çünkü WebSocket header desteklemez.
     """
     # 1. Kimlik Doğrulama
     try:
-        payload = security.decode_access_token(token)
-        email = payload.get("sub")
-        if email is None:
-            await websocket.close(code=1008)
-            return
-        user = crud.get_user_by_email(db, email=email)
+        user = await security.get_user_from_token_async(token, db)
         if user is None:
             await websocket.close(code=1008)
             return
@@ -95,13 +186,18 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Dep
         return
 
     # 2. Bağlantıyı Kabul Et
-    await manager.connect(websocket, current_user_id)
+    outbox = await manager.connect(websocket, current_user_id)
+    # Bu bağlantıda varlığı doğrulanmış alıcılar (her mesajda tekrar sorgulanmasın)
+    known_receivers = set()
     
     try:
         while True:
             # İstemciden mesaj bekle
             data = await websocket.receive_text()
-            
+            # Heartbeat (ping/pong) mesajları sadece bağlantıyı canlı işaretler
+            if manager.heartbeat.received(outbox, data):
+                continue
+
             try:
                 message_data = json.loads(data)
                 # UUID conversion
@@ -109,6 +205,13 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Dep
                 if not receiver_id_str:
                     continue
                 receiver_id = UUID(receiver_id_str)
+                if receiver_id not in known_receivers:
+                    # Olmayan alıcıya giden mesaj yabancı anahtar hatasıyla yazıcıda takılmasın
+                    if not await crud.user_exists_async(db, receiver_id):
+                        error_payload = {"type": "error", "client_id": message_data.get("client_id"), "message": "Alıcı bulunamadı."}
+                        manager.send_to_socket(websocket, current_user_id, json.dumps(error_payload))
+                        continue
+                    known_receivers.add(receiver_id)
                 
                 raw_content = message_data.get("content")
                 
@@ -130,47 +233,123 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Dep
                 is_safe, reason = await run_in_threadpool(moderation.check_message, raw_content, user_trust_score)
                 
                 if not is_safe:
-                    # Hata mesajını gönder ve işlemi durdur
+                    # Hata mesajını sadece bu bağlantıya gönder ve işlemi durdur
                     error_payload = {"type": "error", "message": reason}
-                    await manager.send_personal_message(json.dumps(error_payload), current_user_id)
+                    manager.send_to_socket(websocket, current_user_id, json.dumps(error_payload))
                     continue
 
                 # Mesaj güvenli ise devam et (Sansürleme opsiyonel, check_message zaten blocked döndü)
                 # İstenirse clean_content = moderation.filter_message(raw_content) yapılabilir.
                 clean_content = raw_content 
                 
-                # 3. Veritabanına Kaydet (Otomatik Şifrelenir)
                 msg_schema = schemas.MessageCreate(receiver_id=receiver_id, content=clean_content)
-                saved_message = crud.create_message(db, msg_schema, sender_id=current_user_id)
-                
-                # Yanıt objesi hazırla
+
+                # 3. Mesaja hemen kimlik ver (istemcinin ULID'si veya sunucuda üretilen) ve şifrele
+                pending = message_writer.PendingMessage.create(
+                    current_user_id, msg_schema.receiver_id, msg_schema.content, message_data.get("client_id")
+                )
+
+                # Yanıt objesi hazırla (kalıcı id, kayıttan sonra "message_saved" ile gelir)
                 response_data = {
-                    "id": saved_message.id,
+                    "id": None,
+                    "client_id": pending.client_id,
                     "sender_id": str(current_user_id),
                     "content": clean_content,
-                    "timestamp": str(saved_message.timestamp)
+                    "timestamp": str(pending.timestamp)
                 }
-                
+
                 # 4. Alıcıya Gönder
                 await manager.send_personal_message(json.dumps(response_data), receiver_id)
-                
+
                 # Gönderene de onayı gönder
                 await manager.send_personal_message(json.dumps(response_data), current_user_id)
+
+                # 5. Veritabanına yazılmak üzere kuyruğa ekle (kuyruk doluysa bu bağlantı bekler)
+                await writer.submit(pending)
                 
             except Exception as e:
                 # UUID error or other
+                await db.rollback()
                 error_msg = {"error": str(e)}
-                await manager.send_personal_message(json.dumps(error_msg), current_user_id)
+                manager.send_to_socket(websocket, current_user_id, json.dumps(error_msg))
                 
     except WebSocketDisconnect:
-        manager.disconnect(current_user_id)
+        pass
+    finally:
+        # Hangi hatayla çıkılırsa çıkılsın soket kümeden düşer (sızıntı olmasın)
+        await manager.disconnect(websocket, current_user_id)
 
 
 # --- 2. Mesaj Geçmişini Getir ---
 @router.get("/chat/history/{other_user_id}", response_model=List[schemas.MessageOut])
-def get_history(other_user_id: UUID, current_user: models.User = Depends(security.get_current_user), db: Session = Depends(get_db)):
+async def get_history(
+    other_user_id: UUID,
+    response: Response,
+    before_id: Optional[int] = Query(None, ge=1, description="Bu mesajdan daha eski mesajlar (önceki sayfanın X-Next-Cursor değeri)"),
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE),
+    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Belirli bir kişiyle olan mesaj geçmişini sayfa sayfa getirir (en yeni sayfa önce, sayfa içi eskiden yeniye).
+    Daha eski mesaj varsa X-Next-Cursor header'ı bir sonraki before_id değerini taşır.
+    Mesajlar veritabanında şifreli saklanır; sadece dönen sayfa çözülerek (decrypted) gönderilir.
+    """
+    messages, next_before_id = await crud.get_chat_history_async(db, current_user.id, other_user_id, before_id, limit)
+    if next_before_id is not None:
+        pagination.set_next_cursor(response, str(next_before_id))
+    return messages
+
+
+# --- 2b. Sohbeti Dışa Aktar (NDJSON) ---
+@router.get("/chat/history/{other_user_id}/export")
+async def export_history(other_user_id: UUID, current_user: models.User = Depends(security.get_current_user)):
+    """
+    Tüm sohbeti eskiden yeniye, her satırda bir mesaj olacak şekilde (application/x-ndjson) akıtır.
+    Mesajlar parça parça okunur ve tek tek çözülür; uzun sohbetler de sabit bellekle aktarılır.
+    """
+    if database.AsyncSessionLocal is None:
+        raise HTTPException(status_code=503, detail="Async veritabanı sürücüsü bulunamadı.")
+    user_id = current_user.id
+
+    async def lines():
+        # Yanıt akarken istek bağımlılıkları kapanmış olabilir, akış kendi session'ını açar
+        async with database.AsyncSessionLocal() as db:
+            async for message in crud.stream_chat_history_async(db, user_id, other_user_id):
+                yield message.model_dump_json() + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="chat-{other_user_id}.ndjson"'}
+    )
+
+
+# --- 4. Gelen Kutusu ---
+@router.get("/chat/conversations", response_model=List[schemas.ConversationOut])
+async def get_conversations(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Önceki sayfanın X-Next-Cursor değeri"),
+    limit: int = Query(20, ge=1, le=MAX_INBOX_PAGE),
+    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Belirli bir kişiyle olan tüm mesaj geçmişini getirir.
-    Mesajlar veritabanında şifreli saklanır ancak bu endpointte çözülerek (decrypted) gönderilir.
+    Sohbet listesi: son mesaja göre en yeni önce, karşı taraf, son mesaj önizlemesi ve okunmamış sayısı ile.
+    Sohbet özet tablosundan okunur (mesajlar taranmaz). Sonraki sayfa için X-Next-Cursor header'ı döner.
     """
-    return crud.get_chat_history(db, current_user.id, other_user_id)
+    conversations, next_cursor = await crud.get_conversations_async(db, current_user.id, cursor, limit)
+    pagination.set_next_cursor(response, next_cursor)
+    return conversations
+
+
+@router.post("/chat/conversations/{other_user_id}/read", response_model=schemas.MarkReadOut)
+async def mark_conversation_read(
+    other_user_id: UUID,
+    up_to_id: Optional[int] = Query(None, ge=1, description="Bu id'ye kadar olan mesajlar (verilmezse tümü)"),
+    current_user: models.User = Depends(security.get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Karşı taraftan gelen okunmamış mesajları tek seferde okundu yapar."""
+    marked = await crud.mark_conversation_read_async(db, current_user.id, other_user_id, up_to_id)
+    return {"marked_read": marked}
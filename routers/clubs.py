@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 import database, models, schemas, security
+from services import response_cache, suggest_index
 
 router = APIRouter(prefix="/clubs", tags=["Clubs & Societies"])
 
@@ -23,12 +24,17 @@ def create_club(
     member = models.ClubMember(club_id=db_club.id, user_id=current_user.id, role="admin")
     db.add(member)
     db.commit()
+    response_cache.bump(response_cache.CLUBS)
+    suggest_index.index.upsert(suggest_index.CLUB, db_club.id, db_club.name, 1)
     
     return db_club
 
 @router.get("/", response_model=List[schemas.ClubOut])
-def list_clubs(db: Session = Depends(database.get_db)):
-    return db.query(models.Club).all()
+def list_clubs(request: Request, db: Session = Depends(database.get_db)):
+    return response_cache.cached_response(
+        request, response_cache.CLUBS, List[schemas.ClubOut],
+        lambda headers: db.query(models.Club).all()
+    )
 
 @router.post("/{club_id}/join")
 def join_club(
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from sqlalchemy.orm import Session, joinedload
 from typing import List
+from pydantic import ValidationError
+from fastapi.concurrency import run_in_threadpool
 import sys
 import os
 from uuid import UUID
@@ -9,28 +11,59 @@ from uuid import UUID
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, models, security
-from services import event_provider
+from services import event_provider, event_spatial_index, response_cache, suggest_index
+from routers.admin_api import check_admin
+from utils import pagination, geo
 
 router = APIRouter(tags=["Events"])
 get_db = database.get_db
 
+MAX_PAGE_SIZE = 500
+# /events/bulk-import isteği başına en fazla satır
+BULK_IMPORT_MAX_EVENTS = 5000
+
 # --- 3. ETKİNLİKLERİ GETİR (GET /events) ---
 @router.get("/events", response_model=List[schemas.EventOut])
 def read_events(
+    request: Request,
     city: str = None, 
     category: str = None, 
     lat: float = None, 
     lon: float = None, 
-    radius: float = 10.0,
-    db: Session = Depends(get_db)
+    radius: float = Query(10.0, gt=0, le=geo.MAX_RADIUS_KM),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    db: Session = Depends(database.get_read_db)
 ):
     """
     Etkinlikleri Listele (Konum Filtresi Destekli)
+    Sayfalama: ?cursor=<X-Next-Cursor header değeri> (önerilen) veya eski ?skip=&limit= modu.
+    Her iki modda da sonraki sayfa varsa imleç X-Next-Cursor header'ında döner.
+    Konumsuz listeler önbelleklenir ve ETag taşır (If-None-Match ile 304).
     """
     if lat is not None and lon is not None:
+        # Önce bellek içi indeks (DB'ye gitmeden), soğuksa SQL
+        cached = event_spatial_index.index.query(lat, lon, radius)
+        if cached is not None:
+            return cached
         return crud.get_nearby_events(db, lat=lat, lon=lon, radius_km=radius)
-    
-    return crud.get_events(db, city=city, category=category)
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    def load_events(headers: dict):
+        if cursor:
+            events, next_cursor = crud.get_events_page(db, city=city, category=category, cursor=cursor, limit=limit)
+            pagination.set_next_cursor(headers, next_cursor)
+            return events
+
+        events = crud.get_events(db, city=city, category=category, skip=skip, limit=limit)
+        if len(events) == limit:
+            # Offset modundan keyset'e geçiş için son satırın imleci
+            pagination.set_next_cursor(headers, pagination.encode_cursor(events[-1].date, events[-1].id))
+        return events
+
+    return response_cache.cached_response(request, response_cache.EVENTS, List[schemas.EventOut], load_events)
 
 # --- 4. OTOMATİK VERİ ÇEK (POST /events/auto-fetch) ---
 @router.post("/events/auto-fetch", response_model=List[schemas.EventOut])
@@ -48,40 +81,106 @@ def auto_fetch_events(count: int = 5, db: Session = Depends(get_db)):
         # Kullanıcı yoksa oluşturamayız (Mock user create eklenebilir ama şimdilik hata verelim)
         raise HTTPException(status_code=400, detail="Sistemde hiç kullanıcı yok, etkinlik oluşturulamaz.")
 
-    created_events = []
-    # 2. Hepsini veritabanına kaydet
-    for event_schema in new_event_schemas:
-        # host_id ataması
-        db_event = crud.create_event(db, event_schema, host_id=host_user.id)
-        created_events.append(db_event)
+    # 2. Hepsini tek transaction'da veritabanına kaydet
+    created_events, _ = crud.create_events(db, new_event_schemas, host_id=host_user.id, source="auto-fetch")
         
     return created_events
 
-from services.scraper_service import ScraperService
+from services.scraper_service import scraper
 
 # --- 5. INTERNETTEN ETKİNLİK BOTU ÇALIŞTIR (GET /events/fetch-external) ---
 @router.get("/events/fetch-external", response_model=List[schemas.EventOut])
-def fetch_external_events(location: str = "İstanbul", db: Session = Depends(get_db)):
+async def fetch_external_events(location: str = "İstanbul", force: bool = False, db: Session = Depends(get_db)):
     """
-    Belirtilen konuma göre internetten etkinlikleri tarar ve veritabanına kaydeder.
-    URL Parametresi: ?location=Antalya
+    Belirtilen konum(lar)a göre internetten etkinlikleri tarar ve veritabanına kaydeder.
+    URL Parametresi: ?location=Antalya veya ?location=Antalya,İzmir (şehirler eşzamanlı taranır)
+    Daha önce çekilmiş etkinlikler (parmak izi eşleşen) tekrar oluşturulmaz.
     """
-    # 1. Scraper Servisini Çağır
-    found_event_schemas = ScraperService.scrape_events_by_location(location)
-    
-    # 2. Kaydetmek için 'Host' Kullanıcısı Belirle
-    host_user = db.query(models.User).first() # İlk kullanıcıya ata
-    if not host_user:
-        raise HTTPException(status_code=400, detail="Etkinlikleri atayacak kullanıcı bulunamadı.")
-        
-    created_events = []
-    for event_schema in found_event_schemas:
-        # DB'ye kaydet
-        db_event = crud.create_event(db, event_schema, host_id=host_user.id)
-        created_events.append(db_event)
-        
+    locations = [city.strip() for city in location.split(",") if city.strip()]
+    if not locations:
+        raise HTTPException(status_code=400, detail="En az bir konum verilmelidir.")
+
+    # 1. Kaynakları eşzamanlı tara (HTTP + ayrıştırma event loop'u bloklamaz)
+    result = await scraper.scrape(locations, force=force)
+
+    def store():
+        # 2. Kaydetmek için 'Host' Kullanıcısı Belirle
+        host_user = db.query(models.User).first() # İlk kullanıcıya ata
+        if not host_user:
+            raise HTTPException(status_code=400, detail="Etkinlikleri atayacak kullanıcı bulunamadı.")
+
+        # 3. Daha önce kaydedilmiş etkinlikleri ele, kalanları toplu kaydet (moderasyondan geçemeyenler atlanır)
+        known = crud.get_existing_source_hashes(db, [source_hash for _, source_hash in result.events])
+        fresh = [(event, source_hash) for event, source_hash in result.events if source_hash not in known]
+        if not fresh:
+            return []
+        created, _ = crud.create_events(
+            db, [event for event, _ in fresh], host_id=host_user.id, source="fetch-external",
+            source_hashes=[source_hash for _, source_hash in fresh]
+        )
+        return created
+
+    created_events = await run_in_threadpool(store)
+    # Kayıt başarılıysa sayfalar işlenmiş sayılır, içerikleri değişmedikçe tekrar ayrıştırılmaz
+    await run_in_threadpool(scraper.mark_processed, result.pages)
     return created_events
 
+# --- 6. TOPLU İÇE AKTARMA (POST /events/bulk-import) ---
+@router.post("/events/bulk-import")
+async def bulk_import_events(
+    request: Request,
+    current_user: models.User = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    JSON Lines formatında (her satırda bir EventCreate) toplu etkinlik içe aktarır.
+    Etkinlikler içe aktaran yöneticinin adına oluşturulur. Hatalı satırlar atlanır ve raporlanır.
+    Örnek: curl -X POST --data-binary @events.jsonl -H "Content-Type: application/x-ndjson" ...
+    """
+    events = []
+    line_numbers = []
+    rejected = []
+    buffer = b""
+    line_number = 0
+
+    def parse_line(raw: bytes):
+        if not raw.strip():
+            return
+        if len(events) >= BULK_IMPORT_MAX_EVENTS:
+            raise HTTPException(status_code=413, detail=f"Tek seferde en fazla {BULK_IMPORT_MAX_EVENTS} etkinlik içe aktarılabilir.")
+        try:
+            events.append(schemas.EventCreate.model_validate_json(raw))
+            line_numbers.append(line_number)
+        except ValidationError as e:
+            rejected.append({"line": line_number, "reason": e.errors(include_url=False, include_context=False)})
+
+    # Gövde satır satır işlenir, tamamı tek bir JSON dizisi olarak belleğe alınmaz
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_number += 1
+            parse_line(raw)
+    if buffer:
+        line_number += 1
+        parse_line(buffer)
+
+    if not events:
+        raise HTTPException(status_code=400, detail={"message": "İçe aktarılacak geçerli etkinlik yok.", "rejected": rejected})
+
+    created, moderation_rejected = await run_in_threadpool(
+        crud.create_events, db, events, current_user.id, "bulk-import"
+    )
+    for item in moderation_rejected:
+        rejected.append({"line": line_numbers[item["index"]], "reason": item["reason"]})
+    rejected.sort(key=lambda item: item["line"])
+
+    return {
+        "created": len(created),
+        "event_ids": [str(db_event.id) for db_event in created],
+        "rejected": rejected
+    }
+
 # --- 1. ETKİNLİK OLUŞTUR (POST /events) ---
 @router.post("/events", response_model=schemas.EventOut)
 def create_event(
@@ -127,7 +226,9 @@ def delete_event(
     
     # İade İşlemleri (Escrow Refund)
     if event.deposit_amount > 0:
-        participants = db.query(models.EventParticipant).filter(
+        participants = db.query(models.EventParticipant).options(
+            joinedload(models.EventParticipant.user) # Katılımcı başına ayrı kullanıcı sorgusu olmasın
+        ).filter(
             models.EventParticipant.event_id == event_id,
             models.EventParticipant.payment_status == "paid" # Sadece ödeme yapmış olanlar
         ).all()
@@ -168,6 +269,9 @@ def delete_event(
     # Güvenli olması için statüyü IPTAL yapalım, görünürlüğü kapatalım.
     event.status = models.EventStatus.IPTAL
     db.commit()
+    event_spatial_index.index.remove(event.id)
+    suggest_index.index.remove(suggest_index.EVENT, event.id)
+    response_cache.bump(response_cache.EVENTS)
     
     return {"message": "Etkinlik başarıyla iptal edildi ve gerekli iadeler yapıldı."}
 
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/feed", tags=["Home Feed"])
 
 @router.get("/home")
 def get_home_feed(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """
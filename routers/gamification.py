@@ -9,7 +9,7 @@ get_db = database.get_db
 @router.get("/gamification/leaderboard", response_model=List[schemas.UserPublic])
 def get_leaderboard(
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 import database, security, models, schemas
 from services.matching_engine import MatchingEngine
@@ -14,7 +14,10 @@ def get_match_suggestions(
 ):
     """Kullanıcıya ilgi alanları bazında en uyumlu diğer kullanıcıları önerir."""
     # 1. Aynı üniversitedeki diğer kullanıcıları çek (Basit filtre)
-    other_users = db.query(models.User).filter(
+    # OPTİMİZASYON: İlgi alanları aday başına lazy load yerine tek sorguda (selectinload) yüklenir
+    other_users = db.query(models.User).options(
+        selectinload(models.User.interests)
+    ).filter(
         models.User.id != current_user.id,
         models.User.university_id == current_user.university_id
     ).all()
@@ -5,46 +5,82 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict
 import json
 import database, models, schemas, security
 from uuid import UUID
 from datetime import datetime
 from services import maps_service
+from utils import ws_outbox, ws_heartbeat
 
 router = APIRouter(
     prefix="/tracking",
     tags=["Live Tracking (Uber Mode)"]
 )
 
+# Soket başına giden kuyruk boyutu, yazma zaman aşımı ve yazma olmadan atılan güncelleme sayısı kopma eşiği
+TRACKING_OUTBOX_SIZE = int(os.getenv("TRACKING_OUTBOX_SIZE", 64))
+TRACKING_SEND_TIMEOUT = float(os.getenv("TRACKING_SEND_TIMEOUT", 5))
+TRACKING_OUTBOX_DISCONNECT_AFTER = int(os.getenv("TRACKING_OUTBOX_DISCONNECT_AFTER", 256))
+
 # WebSocket Yöneticisi: Etkinlik bazlı odalar oluşturur
+# Her izleyicinin kendi kuyruğu ve yazıcı task'ı vardır (utils/ws_outbox). Konum güncellemeleri
+# kullanıcı bazında birleştirilir: yavaş izleyici ara konumları atlar, sadece son konumu alır.
 class TrackingConnectionManager:
-    def __init__(self):
-        # event_id -> List[WebSocket] (Her etkinlik için ayrı liste)
-        self.active_connections: Dict[UUID, List[WebSocket]] = {}
+    def __init__(self, send_timeout: float, outbox_size: int, disconnect_after: int):
+        # event_id -> {websocket: outbox} (Her etkinlik için ayrı oda)
+        self.active_connections: Dict[UUID, Dict[WebSocket, ws_outbox.Outbox]] = {}
+        self.send_timeout = send_timeout
+        self.outbox_size = outbox_size
+        self.disconnect_after = disconnect_after
+        self.outbox_stats = ws_outbox.OutboxStats()
+        # İzleyiciler yalnızca dinler (mesaj göndermez): boşta kalma süresiyle kapatılmazlar,
+        # ölü bağlantıyı protokol ping'i (uvicorn) ve giden kuyruk eşiği yakalar
+        self.heartbeat = ws_heartbeat.create_heartbeat("tracking", idle_timeout=0)
 
-    async def connect(self, websocket: WebSocket, event_id: UUID):
+    async def connect(self, websocket: WebSocket, event_id: UUID) -> ws_outbox.Outbox:
         await websocket.accept()
-        if event_id not in self.active_connections:
-            self.active_connections[event_id] = []
-        self.active_connections[event_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, event_id: UUID):
-        if event_id in self.active_connections:
-            if websocket in self.active_connections[event_id]:
-                self.active_connections[event_id].remove(websocket)
-            if not self.active_connections[event_id]:
-                del self.active_connections[event_id]
-
-    async def broadcast(self, message: str, event_id: UUID):
-        if event_id in self.active_connections:
-            for connection in self.active_connections[event_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception:
-                    pass # Bağlantı kopmuşsa yoksay
-
-manager = TrackingConnectionManager()
+
+        async def on_dead(outbox):
+            await self.disconnect(websocket, event_id)
+
+        outbox = ws_outbox.Outbox(
+            websocket, self.outbox_size, ws_outbox.COALESCE, self.disconnect_after, self.send_timeout, on_dead
+        ).start()
+        self.active_connections.setdefault(event_id, {})[websocket] = outbox
+        self.heartbeat.register(outbox)
+        return outbox
+
+    async def disconnect(self, websocket: WebSocket, event_id: UUID):
+        connections = self.active_connections.get(event_id)
+        if connections is None or websocket not in connections:
+            return
+        outbox = connections.pop(websocket)
+        self.heartbeat.unregister(outbox)
+        await outbox.close()
+        self.outbox_stats.absorb(outbox)
+        if not connections:
+            del self.active_connections[event_id]
+
+    def broadcast(self, message: str, event_id: UUID, key=None):
+        """Mesajı odadaki her izleyicinin kuyruğuna ekler; aynı anahtarlı bekleyen mesajın yerine geçer."""
+        for outbox in list(self.active_connections.get(event_id, {}).values()):
+            outbox.put(message, key)
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "rooms": len(self.active_connections),
+            "sockets": sum(len(connections) for connections in self.active_connections.values()),
+            "send_timeout_seconds": self.send_timeout,
+            "outbox": self.outbox_stats.snapshot(
+                outbox for connections in self.active_connections.values() for outbox in connections.values()
+            )
+        }
+
+manager = TrackingConnectionManager(TRACKING_SEND_TIMEOUT, TRACKING_OUTBOX_SIZE, TRACKING_OUTBOX_DISCONNECT_AFTER)
 
 @router.post("/update-location", response_model=dict)
 async def update_event_live_location(
@@ -53,24 +89,26 @@ async def update_event_live_location(
     lon: float,
     status: str = "on_way", # on_way, arrived
     transport_type: str = "walk",
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """Kullanıcının etkinliğe giderken canlı konumunu günceller."""
     # Etkinliğe katılmış mı bak
-    participant = db.query(models.EventParticipant).filter(
+    result = await db.execute(select(models.EventParticipant.id).filter(
         models.EventParticipant.event_id == event_id,
         models.EventParticipant.user_id == current_user.id
-    ).first()
+    ))
+    participant = result.first()
     
     if not participant:
         raise HTTPException(status_code=403, detail="Canlı takip için etkinliğe kayıtlı olmalısınız.")
     
     # Mevcut takip verisi var mı bak
-    tracking = db.query(models.LiveTracking).filter(
+    result = await db.execute(select(models.LiveTracking).filter(
         models.LiveTracking.event_id == event_id,
         models.LiveTracking.user_id == current_user.id
-    ).first()
+    ))
+    tracking = result.scalars().first()
     
     if tracking:
         tracking.latitude = lat
@@ -89,7 +127,7 @@ async def update_event_live_location(
         )
         db.add(tracking)
     
-    db.commit()
+    await db.commit()
     
     # WebSocket üzerinden dinleyenlere anlık bildirim gönder
     update_data = {
@@ -102,7 +140,7 @@ async def update_event_live_location(
         "transport_type": transport_type,
         "last_updated": str(datetime.utcnow())
     }
-    await manager.broadcast(json.dumps(update_data), event_id)
+    manager.broadcast(json.dumps(update_data), event_id, key=str(current_user.id))
     
     return {"message": "Konumunuz güncellendi.", "status": status}
 
@@ -164,7 +202,7 @@ async def websocket_tracking(
     websocket: WebSocket, 
     event_id: UUID, 
     token: str, 
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Canlı takip haritası için WebSocket bağlantısı.
@@ -172,12 +210,7 @@ async def websocket_tracking(
     """
     # 1. Kimlik Doğrulama (Token URL parametresi olarak gelir)
     try:
-        payload = security.decode_access_token(token)
-        email = payload.get("sub")
-        if email is None:
-            await websocket.close(code=1008)
-            return
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = await security.get_user_from_token_async(token, db)
         if user is None:
             await websocket.close(code=1008)
             return
@@ -186,7 +219,7 @@ async def websocket_tracking(
         return
 
     # 2. Odaya Bağlan (Etkinlik ID'sine göre)
-    await manager.connect(websocket, event_id)
+    outbox = await manager.connect(websocket, event_id)
     
     try:
         while True:
@@ -194,7 +227,9 @@ async def websocket_tracking(
             # Şimdilik sadece dinleyici modunda çalışıyorlar ama
             # ilerde sürücü de buradan konum atabilir.
             data = await websocket.receive_text()
-            # Gelen veriyi işle veya yoksay (Heartbeat vb.)
-            pass
+            # Heartbeat (ping/pong) bağlantıyı canlı işaretler, diğer veriler şimdilik yoksayılır
+            manager.heartbeat.received(outbox, data)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, event_id)
+        pass
+    finally:
+        await manager.disconnect(websocket, event_id)
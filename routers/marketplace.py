@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
@@ -9,6 +9,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, models, security
+from utils import pagination
+from services import response_cache
 
 router = APIRouter(tags=["Marketplace"])
 get_db = database.get_db
@@ -34,20 +36,37 @@ def create_item(
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    response_cache.bump(response_cache.MARKETPLACE)
     return db_item
 
 @router.get("/marketplace/items", response_model=List[schemas.MarketplaceItemOut])
 def list_items(
+    request: Request,
     category: str = None,
-    db: Session = Depends(get_db)
+    limit: int = None,
+    cursor: str = None,
+    db: Session = Depends(database.get_read_db)
 ):
     """
     Tüm aktif ilanları listeler. Kategori filtresi eklenebilir.
+    limit/cursor verilirse keyset sayfalama yapılır (sonraki imleç X-Next-Cursor header'ında).
+    Yanıt önbelleklenir ve ETag taşır.
     """
-    query = db.query(models.MarketplaceItem).filter(models.MarketplaceItem.status == "active")
-    if category:
-        query = query.filter(models.MarketplaceItem.category == category)
-    return query.order_by(models.MarketplaceItem.created_at.desc()).all()
+    def load_items(headers: dict):
+        query = db.query(models.MarketplaceItem).filter(models.MarketplaceItem.status == "active")
+        if category:
+            query = query.filter(models.MarketplaceItem.category == category)
+        if limit is None and cursor is None:
+            return query.order_by(models.MarketplaceItem.created_at.desc()).all()
+
+        items, next_cursor = pagination.paginate_keyset(
+            query, models.MarketplaceItem.created_at, models.MarketplaceItem.id,
+            cursor, max(1, min(limit or 50, 200)), descending=True
+        )
+        pagination.set_next_cursor(headers, next_cursor)
+        return items
+
+    return response_cache.cached_response(request, response_cache.MARKETPLACE, List[schemas.MarketplaceItemOut], load_items)
 
 @router.delete("/marketplace/items/{item_id}")
 def delete_item(
@@ -66,6 +85,7 @@ def delete_item(
     
     db_item.status = "deleted"
     db.commit()
+    response_cache.bump(response_cache.MARKETPLACE)
     return {"status": "success", "message": "İlan başarıyla silindi."}
 
 @router.get("/marketplace/my-items", response_model=List[schemas.MarketplaceItemOut])
@@ -126,4 +146,5 @@ def buy_item(
     db.add(models.Transaction(user_id=owner.id, amount=db_item.price, status="paid", transaction_type="deposit", description=f"Pazar Satışı: {db_item.title}"))
 
     db.commit()
+    response_cache.bump(response_cache.MARKETPLACE)
     return {"status": "success", "message": "Satın alma işlemi başarılı!"}
@@ -3,10 +3,11 @@ import os
 # Parent directory'i path'e ekliyoruz ki importlar çalışsın
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 import database, models, schemas, security
+from utils import pagination
 
 router = APIRouter(
     prefix="/notifications",
@@ -15,13 +16,25 @@ router = APIRouter(
 
 @router.get("/", response_model=List[schemas.NotificationOut])
 def get_notifications(
-    db: Session = Depends(database.get_db),
+    response: Response,
+    limit: int = None,
+    cursor: str = None,
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    """Kullanıcının tüm bildirimlerini listeler."""
-    return db.query(models.Notification).filter(
+    """Kullanıcının tüm bildirimlerini listeler (limit/cursor ile keyset sayfalama)."""
+    query = db.query(models.Notification).filter(
         models.Notification.user_id == current_user.id
-    ).order_by(models.Notification.created_at.desc()).all()
+    )
+    if limit is None and cursor is None:
+        return query.order_by(models.Notification.created_at.desc()).all()
+
+    items, next_cursor = pagination.paginate_keyset(
+        query, models.Notification.created_at, models.Notification.id,
+        cursor, max(1, min(limit or 50, 200)), descending=True
+    )
+    pagination.set_next_cursor(response, next_cursor)
+    return items
 
 @router.post("/{notification_id}/read")
 def mark_as_read(
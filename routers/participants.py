@@ -4,9 +4,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List
-import database, models, schemas, security
+import database, models, schemas, security, crud
+from services import event_spatial_index, response_cache
 from uuid import UUID
 from datetime import datetime
 
@@ -15,6 +18,13 @@ router = APIRouter(
     tags=["Event Participation"]
 )
 
+def _refresh_event(db: Session, event_id: UUID):
+    """Katılımcı sayısı / DOLDU durumu değişen etkinliği harita indeksinde ve liste önbelleğinde tazeler (commit sonrası)."""
+    event = db.get(models.Event, event_id)
+    if event is not None:
+        event_spatial_index.index.upsert(event)
+    response_cache.bump(response_cache.EVENTS)
+
 @router.post("/join/{event_id}", response_model=dict)
 def join_event(
     event_id: UUID,
@@ -48,12 +58,37 @@ def join_event(
     ).first()
     if existing_participant:
         raise HTTPException(status_code=400, detail="Zaten bu etkinliğe katıldınız.")
+
+    if event.status == models.EventStatus.IPTAL:
+        raise HTTPException(status_code=400, detail="Bu etkinlik iptal edildi.")
+
+    if event.deposit_amount > 0 and current_user.wallet_balance < event.deposit_amount:
+        raise HTTPException(status_code=400, detail="Yetersiz bakiye. Katılım ücretini ödemek için cüzdanınıza para yükleyin.")
+
+    # Kontenjan: atomik koşullu UPDATE ile yer ayır, yer yoksa bekleme listesine al (ücret çekilmez)
+    if not crud.reserve_seat(db, event_id):
+        participant = models.EventParticipant(
+            event_id=event_id,
+            user_id=current_user.id,
+            status=models.ParticipantStatus.WAITLIST.value,
+            payment_status="pending"
+        )
+        db.add(participant)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Zaten bu etkinliğe katıldınız.")
+        return {
+            "message": "Etkinlik kontenjanı dolu, bekleme listesine alındınız. Yer açılınca otomatik olarak katılımcı olacaksınız.",
+            "status": models.ParticipantStatus.WAITLIST.value,
+            "waitlist_position": crud.get_waitlist_position(db, participant),
+            "payment_status": "pending",
+            "remaining_balance": current_user.wallet_balance
+        }
     
     # Kapora / Ücret Kontrolü (Escrow Logiği)
     if event.deposit_amount > 0:
-        if current_user.wallet_balance < event.deposit_amount:
-            raise HTTPException(status_code=400, detail="Yetersiz bakiye. Katılım ücretini ödemek için cüzdanınıza para yükleyin.")
-        
         # 1. Cüzdandan Düş
         current_user.wallet_balance -= event.deposit_amount
         
@@ -80,10 +115,17 @@ def join_event(
     )
     
     db.add(participant)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Aynı kullanıcının eşzamanlı ikinci isteği: ayrılan yer ve ücret de geri alınır
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Zaten bu etkinliğe katıldınız.")
+    _refresh_event(db, event_id)
     
     return {
         "message": "Etkinliğe katıldınız! Ücret güvenli havuz hesabına alındı. Etkinlikte QR kodunuzu okuttuğunuzda organizatöre aktarılacak.",
+        "status": "approved",
         "payment_status": payment_status,
         "remaining_balance": current_user.wallet_balance
     }
@@ -110,6 +152,9 @@ def scan_qr_code(
     
     if not participant:
         raise HTTPException(status_code=404, detail="Bu etkinlik için kaydınız bulunamadı.")
+
+    if participant.status != "approved":
+        raise HTTPException(status_code=403, detail="Bekleme listesindesiniz, katılımınız henüz onaylanmadı.")
     
     if participant.qr_scanned:
         return {"message": "Zaten giriş yaptınız."}
@@ -203,6 +248,9 @@ def validate_participant_ticket(
     
     if not participant:
         raise HTTPException(status_code=404, detail="Geçersiz bilet veya katılımcı bulunamadı.")
+
+    if participant.status != "approved":
+        raise HTTPException(status_code=400, detail="Katılımcı bekleme listesinde, bilet geçerli değil.")
     
     if participant.qr_scanned:
         raise HTTPException(status_code=400, detail="Bu bilet zaten kullanılmış.")
@@ -245,6 +293,40 @@ def validate_participant_ticket(
         "new_trust_score": participant.user.trust_score
     }
 
+def _promote_from_waitlist(db: Session, event: models.Event) -> bool:
+    """
+    Bekleme listesinden sıradaki kullanıcıyı onaylı katılımcı yapar (yer devredilir, sayaç değişmez).
+    Ücretli etkinlikte bakiyesi yetmeyen bekleyen atlanır ve listede kalır.
+    """
+    for candidate in crud.get_waitlist(db, event.id):
+        if event.deposit_amount > 0:
+            # Atomik koşullu düşüm: eşzamanlı bir cüzdan işlemi güncellemeyi ezmesin
+            debited = db.execute(
+                update(models.User)
+                .where(models.User.id == candidate.user_id, models.User.wallet_balance >= event.deposit_amount)
+                .values(wallet_balance=models.User.wallet_balance - event.deposit_amount)
+                .execution_options(synchronize_session=False)
+            )
+            if debited.rowcount != 1:
+                continue
+            db.add(models.Transaction(
+                user_id=candidate.user_id,
+                amount=-event.deposit_amount,
+                status=models.PaymentStatus.PAID,
+                transaction_type="payment_escrow",
+                description=f"'{event.title}' etkinliği için katılım ücreti (Havuza Alındı)"
+            ))
+            candidate.payment_status = "paid"
+        candidate.status = "approved"
+        db.add(models.Notification(
+            user_id=candidate.user_id,
+            title="Bekleme Listesinden Katılımcı Oldunuz 🎉",
+            message=f"'{event.title}' etkinliğinde yer açıldı ve katılımınız onaylandı.",
+            type="system"
+        ))
+        return True
+    return False
+
 # --- 6. ETKİNLİKTEN AYRIL (DELETE /participants/leave/{event_id}) ---
 @router.delete("/leave/{event_id}", response_model=dict)
 def leave_event(
@@ -262,17 +344,18 @@ def leave_event(
         raise HTTPException(status_code=404, detail="Bu etkinlikte kaydınız bulunmuyor.")
     
     event = participant.event
-    time_diff = event.event_date - datetime.utcnow()
+    time_diff = event.date - datetime.utcnow()
     hours_left = time_diff.total_seconds() / 3600
     
     penalty = 0
     message = "Etkinlikten başarıyla ayrıldınız."
+    was_approved = participant.status == "approved"
     
-    # Ceza Hesaplama
-    if hours_left < 2:
+    # Ceza Hesaplama (bekleme listesindekiler yer tutmadığı için ceza almaz)
+    if was_approved and hours_left < 2:
         penalty = 10
         message = "SON_DAKİKA_AYRILMA: Güven puanınız 10 birim düşürüldü."
-    elif hours_left < 12:
+    elif was_approved and hours_left < 12:
         penalty = 5
         message = "KRİTİK_ZAMAN_AYRILMA: Güven puanınız 5 birim düşürüldü."
     
@@ -296,7 +379,15 @@ def leave_event(
         message += f" {event.deposit_amount} kredi iade edildi."
 
     db.delete(participant)
+    if was_approved:
+        # Önce silme yazılır: SQLite'ta yazma kilidi alınır, iki ayrılan aynı bekleyeni seçemez
+        db.flush()
+        # Boşalan yer bekleme listesindeki ilk uygun kullanıcıya geçer, yoksa kontenjan azalır
+        if not _promote_from_waitlist(db, event):
+            crud.release_seat(db, event.id)
     db.commit()
+    if was_approved:
+        _refresh_event(db, event_id)
     
     return {
         "status": "success",
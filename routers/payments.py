@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from typing import List
@@ -13,6 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, models, security
 from services.payment_service import PaymentService
+from utils import pagination
 
 router = APIRouter(tags=["Payments"])
 get_db = database.get_db
@@ -120,10 +121,23 @@ async def payment_callback(
 
 @router.get("/payments/transactions", response_model=List[schemas.TransactionOut])
 def get_transactions(
+    response: Response,
+    limit: int = None,
+    cursor: str = None,
     current_user: models.User = Depends(security.get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Kullanıcının işlem geçmişini getirir.
+    limit/cursor verilirse keyset sayfalama yapılır (sonraki imleç X-Next-Cursor header'ında).
     """
-    return db.query(models.Transaction).filter(models.Transaction.user_id == current_user.id).order_by(models.Transaction.created_at.desc()).all()
+    query = db.query(models.Transaction).filter(models.Transaction.user_id == current_user.id)
+    if limit is None and cursor is None:
+        return query.order_by(models.Transaction.created_at.desc()).all()
+
+    transactions, next_cursor = pagination.paginate_keyset(
+        query, models.Transaction.created_at, models.Transaction.id,
+        cursor, max(1, min(limit or 50, 200)), descending=True
+    )
+    pagination.set_next_cursor(response, next_cursor)
+    return transactions
@@ -1,18 +1,32 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Literal
 import database, models, schemas
+from services import search_index, suggest_index
 
 router = APIRouter(prefix="/search", tags=["Global Search"])
 
 @router.get("/")
 def global_search(
     q: str = Query(..., min_length=2, description="Arama sorgusu"),
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
     """
     Kullanıcılar, etkinlikler ve kulüpler arasında arama yapar.
+    Tam metin indeksi hazırsa Türkçe normalize edilmiş, alaka puanına göre sıralı sonuç döner
+    ("istanbul" -> "İstanbul", "kadikoy" -> "Kadıköy"); değilse ILIKE aramasına düşer.
     """
+    if search_index.is_ready():
+        hits = search_index.search(db, q, limit_per_type=10)
+        return {
+            "query": q,
+            "results": {
+                "users": [{"id": h["id"], "name": h["title"], "score": h["score"]} for h in hits[search_index.USER]],
+                "events": [{"id": h["id"], "title": h["title"], "score": h["score"]} for h in hits[search_index.EVENT]],
+                "clubs": [{"id": int(h["id"]), "name": h["title"], "score": h["score"]} for h in hits[search_index.CLUB]]
+            }
+        }
+
     search_term = f"%{q}%"
     
     try:
@@ -42,3 +56,26 @@ def global_search(
     except Exception as e:
         import traceback
         return {"error": str(e), "traceback": traceback.format_exc()}
+
+
+@router.get("/suggest")
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="Yazılan önek"),
+    limit: int = Query(10, ge=1, le=suggest_index.MAX_SUGGESTIONS),
+    type: Optional[Literal["user", "event", "club"]] = Query(None, description="Sadece bu türde öneri"),
+    db: Session = Depends(database.get_read_db)
+):
+    """
+    Arama çubuğu için her tuşta çağrılan öneri endpoint'i.
+    Bellek içi önek indeksinden popülerliğe göre ilk `limit` sonucu döner (veritabanına gitmez).
+    İndeks henüz yüklenmediyse tam metin indeksine düşer.
+    """
+    suggestions = suggest_index.index.suggest(q, limit, type)
+    if suggestions is None:
+        suggestions = []
+        if search_index.is_ready():
+            hits = search_index.search(db, q, limit_per_type=limit)
+            for kind in (type,) if type else suggest_index.KINDS:
+                suggestions.extend({"type": kind, **hit} for hit in hits[kind])
+            suggestions = sorted(suggestions, key=lambda item: item["score"], reverse=True)[:limit]
+    return {"query": q, "suggestions": suggestions}
@@ -4,12 +4,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import database, models, schemas, security
+from services import principal_cache
 from typing import List
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 router = APIRouter(
     prefix="/security",
@@ -17,17 +16,18 @@ router = APIRouter(
 )
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: schemas.PasswordChange,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """Kullanıcının şifresini güvenli bir şekilde değiştirir."""
-    if not pwd_context.verify(data.old_password, current_user.password):
+    if not await security.verify_password_async(data.old_password, current_user.password):
         raise HTTPException(status_code=400, detail="Mevcut şifre hatalı.")
     
-    current_user.password = pwd_context.hash(data.new_password)
-    db.commit()
+    current_user.password = await security.get_password_hash_async(data.new_password)
+    await run_in_threadpool(db.commit)
+    principal_cache.invalidate_user(current_user.id)
     return {"message": "Şifre başarıyla güncellendi."}
 
 @router.get("/devices", response_model=List[schemas.LoginDeviceOut])
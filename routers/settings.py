@@ -6,6 +6,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import database, models, schemas, security
+from services import principal_cache
 from typing import List
 
 router = APIRouter(
@@ -24,6 +25,7 @@ def update_profile(
         setattr(current_user, key, value)
     
     db.commit()
+    principal_cache.invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -38,6 +40,7 @@ def update_preferences(
         setattr(current_user, key, value)
     
     db.commit()
+    principal_cache.invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import shutil
 import os
@@ -23,6 +24,7 @@ from services import (
     moderation,
     image_processor # Eklendi: Resim işleme servisi
 )
+from services import principal_cache
 
 redis_client = get_redis()
 
@@ -485,6 +487,7 @@ def update_profile(
         current_user.interests = valid_interests
     
     db.commit()
+    principal_cache.invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -500,21 +503,23 @@ def update_settings(
         setattr(current_user, key, value)
     
     db.commit()
+    principal_cache.invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: schemas.PasswordChange,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """Aktif oturumda şifre değiştirme işlemi."""
-    if not security.verify_password(data.old_password, current_user.password):
+    if not await security.verify_password_async(data.old_password, current_user.password):
         raise HTTPException(status_code=400, detail="Mevcut şifreniz hatalı!")
     
-    current_user.password = security.get_password_hash(data.new_password)
-    db.commit()
+    current_user.password = await security.get_password_hash_async(data.new_password)
+    await run_in_threadpool(db.commit)
+    principal_cache.invalidate_user(current_user.id)
     return {"status": "success", "message": "Şifreniz başarıyla değiştirildi."}
 
 @router.post("/support-ticket", response_model=schemas.SupportTicketOut)
@@ -560,8 +565,10 @@ def delete_my_account(
         # Ancak modelde CASCADE tanımlandığını varsayıyoruz veya DB seviyesinde hallediyoruz.
         # Manuel temizlik gerekiyorsa burada yapılabilir (etkinlikler, mesajlar vb.)
         
+        user_id = current_user.id
         db.delete(current_user)
         db.commit()
+        principal_cache.invalidate_user(user_id)
         
         return {"status": "success", "message": "Hesabınız ve tüm verileriniz başarıyla silindi. Elveda. 👋"}
     except Exception as e:
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 import sys
@@ -8,18 +8,23 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database, schemas, crud, models, security
+from services import response_cache
 
 router = APIRouter(tags=["Venues"])
 get_db = database.get_db
 
 @router.get("/venues", response_model=List[schemas.CampusVenueOut])
 def list_venues(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Kampüs çevresindeki indirimli mekanları listeler.
+    Kampüs çevresindeki indirimli mekanları listeler (önbellekli, ETag destekli).
     """
-    return db.query(models.CampusVenue).filter(models.CampusVenue.is_active == True).all()
+    return response_cache.cached_response(
+        request, response_cache.VENUES, List[schemas.CampusVenueOut],
+        lambda headers: db.query(models.CampusVenue).filter(models.CampusVenue.is_active == True).all()
+    )
 
 @router.post("/venues", response_model=schemas.CampusVenueOut)
 def create_venue(
@@ -41,4 +46,5 @@ def create_venue(
     db.add(db_venue)
     db.commit()
     db.refresh(db_venue)
+    response_cache.bump(response_cache.VENUES)
     return db_venue
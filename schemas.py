@@ -229,6 +229,9 @@ class EventCreate(EventBase):
 class EventOut(EventBase):
     id: UUID
     host_id: UUID
+    participant_count: int = 0
+    # Sadece konumlu aramalarda (?lat=&lon=) dolu gelir
+    distance_km: Optional[float] = None
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -250,9 +253,25 @@ class MessageOut(BaseModel):
     content: str
     timestamp: datetime
     is_read: bool
+    # WebSocket'le gönderilen mesajın ULID'si: canlı gelen mesajı geçmişteki kaydıyla eşlemek için
+    client_id: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
+class ConversationOut(BaseModel):
+    id: int
+    other_user_id: UUID
+    other_user_name: Optional[str] = None
+    other_user_image: Optional[str] = None
+    last_message_id: Optional[int] = None
+    last_sender_id: Optional[UUID] = None
+    preview: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    unread_count: int = 0
+
+class MarkReadOut(BaseModel):
+    marked_read: int
+
 # --- Marketplace Schemas ---
 class MarketplaceItemBase(BaseModel):
     title: str
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import password_hasher
+
+# Login patlaması benchmark'ı (dönem başı senaryosu).
+# Aynı anda LOGIN_COUNT adet giriş denemesi yapılırken araya "ilgisiz" sync endpoint
+# istekleri (boş iş) gönderilir ve bunların ne kadar beklediği ölçülür.
+#   ONCE  : bcrypt, FastAPI'nin thread havuzunda (40 thread) inline çalışır.
+#   SONRA : bcrypt, services/password_hasher process havuzunda çalışır; thread havuzu boş kalır.
+# Kullanım: python scripts/bench_login_hashing.py [login_sayisi]
+
+THREADPOOL_SIZE = 40  # anyio varsayılan thread limiti
+LOGIN_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PROBE_COUNT = 50
+
+
+def _noop():
+    return None
+
+
+async def _probe_latency(threadpool, results):
+    loop = asyncio.get_running_loop()
+    for _ in range(PROBE_COUNT):
+        started = time.perf_counter()
+        await loop.run_in_executor(threadpool, _noop)
+        results.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def _run(mode: str, hashed: str):
+    loop = asyncio.get_running_loop()
+    threadpool = ThreadPoolExecutor(max_workers=THREADPOOL_SIZE)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        if mode == "once":
+            return await loop.run_in_executor(threadpool, password_hasher._verify, "Password123", hashed)
+        try:
+            return await password_hasher.hasher.verify_async("Password123", hashed)
+        except Exception:
+            # HTTPException(503) - kuyruk dolu
+            rejected += 1
+            return False
+
+    probe_results = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        _probe_latency(threadpool, probe_results),
+        *[login() for _ in range(LOGIN_COUNT)]
+    )
+    elapsed = time.perf_counter() - started
+    threadpool.shutdown()
+
+    accepted = LOGIN_COUNT - rejected
+    probe_results.sort()
+    print(f"[{mode.upper()}]")
+    print(f"  Süre: {elapsed:.2f}s | Başarılı login: {accepted} | 503: {rejected} | Throughput: {accepted / elapsed:.1f} login/s")
+    print(f"  İlgisiz endpoint gecikmesi p50: {statistics.median(probe_results):.1f}ms | p95: {probe_results[int(len(probe_results) * 0.95) - 1]:.1f}ms")
+
+
+def main():
+    hashed = password_hasher._hash("Password123")
+    print(f"Login sayısı: {LOGIN_COUNT} | Hash workers: {password_hasher.HASH_WORKERS} | Max pending: {password_hasher.HASH_MAX_PENDING}")
+    asyncio.run(_run("once", hashed))
+    asyncio.run(_run("sonra", hashed))
+    print(f"Hasher metrikleri: {password_hasher.get_stats()}")
+    password_hasher.hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import sys
+import os
+import time
+import math
+import uuid
+import random
+import tempfile
+import statistics
+import datetime
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+import models, crud
+from utils import geo
+
+# Yakındaki etkinlik araması benchmark'ı.
+# Geçici bir SQLite veritabanına EVENT_COUNT adet sentetik etkinlik (Türkiye sınırları içinde) yazılır,
+# ardından rastgele şehir merkezleri etrafında iki yöntem karşılaştırılır:
+#   ONCE  : lat/lon üzerinde indekssiz bounding box (eski get_nearby_events)
+#   SONRA : geo_cell aralık taraması + haversine + mesafe sıralaması (crud.get_nearby_events)
+# Kullanım: python scripts/bench_nearby_events.py [etkinlik_sayisi]
+
+EVENT_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+QUERY_COUNT = 50
+BATCH_SIZE = 50_000
+RADII_KM = (5, 10, 25)
+
+CITY_CENTERS = [
+    (41.0082, 28.9784),  # İstanbul
+    (39.9334, 32.8597),  # Ankara
+    (38.4237, 27.1428),  # İzmir
+    (36.8969, 30.7133),  # Antalya
+    (40.1885, 29.0610),  # Bursa
+    (37.0000, 35.3213),  # Adana
+]
+
+
+def _random_event(now):
+    # Etkinliklerin çoğu şehirlerde yoğunlaşır, geri kalanı ülke geneline dağılır
+    if random.random() < 0.7:
+        center_lat, center_lon = random.choice(CITY_CENTERS)
+        lat = random.gauss(center_lat, 0.15)
+        lon = random.gauss(center_lon, 0.15)
+    else:
+        lat = random.uniform(36.0, 42.0)
+        lon = random.uniform(26.0, 45.0)
+    return {
+        "id": uuid.uuid4(),
+        "title": "Bench etkinliği",
+        "latitude": lat,
+        "longitude": lon,
+        "geo_cell": geo.cell_id(lat, lon),
+        "date": now + datetime.timedelta(hours=random.randint(-24 * 60, 24 * 60)),
+        "status": models.EventStatus.IPTAL if random.random() < 0.1 else models.EventStatus.AKTIF,
+        "min_age_limit": 18,
+        "max_age_limit": 99
+    }
+
+
+def _seed(engine):
+    now = datetime.datetime.utcnow()
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for start in range(0, EVENT_COUNT, BATCH_SIZE):
+            rows = [_random_event(now) for _ in range(min(BATCH_SIZE, EVENT_COUNT - start))]
+            connection.execute(insert(models.Event), rows)
+    print(f"{EVENT_COUNT} etkinlik yazıldı ({time.perf_counter() - started:.1f} sn)")
+
+
+def _bounding_box(db, lat, lon, radius_km, limit=50):
+    delta_lat = radius_km / 111.0
+    delta_lon = radius_km / (111.0 * math.cos(math.radians(lat)))
+    return db.query(models.Event).filter(
+        models.Event.latitude >= lat - delta_lat,
+        models.Event.latitude <= lat + delta_lat,
+        models.Event.longitude >= lon - delta_lon,
+        models.Event.longitude <= lon + delta_lon
+    ).limit(limit).all()
+
+
+def _measure(label, func, points, radius_km):
+    timings = []
+    for lat, lon in points:
+        started = time.perf_counter()
+        func(lat, lon, radius_km)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {label:<6} r={radius_km:>3} km  medyan={statistics.median(timings):8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        _seed(engine)
+
+        points = [
+            (random.gauss(lat, 0.05), random.gauss(lon, 0.05))
+            for lat, lon in (random.choice(CITY_CENTERS) for _ in range(QUERY_COUNT))
+        ]
+        with Session(bind=engine) as db:
+            for radius_km in RADII_KM:
+                _measure("ONCE", lambda lat, lon, r: _bounding_box(db, lat, lon, r), points, radius_km)
+                _measure("SONRA", lambda lat, lon, r: crud.get_nearby_events(db, lat, lon, r), points, radius_km)
+                # Kimlik haritası büyümesin
+                db.expunge_all()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from database import engine
+import models, crud
+
+# Sıcak sorguların EXPLAIN çıktısını kontrol eder.
+# Herhangi biri tablo taraması (Seq Scan / SCAN) yapıyorsa çıkış kodu 1 olur (CI'da kullanılabilir).
+# PostgreSQL'de küçük tablolarda planlayıcı yine de Seq Scan seçebileceği için
+# enable_seqscan kapatılır: bu durumda hâlâ Seq Scan görülüyorsa kullanılabilir bir indeks yoktur.
+# Kullanım: python scripts/check_query_plans.py
+
+SAMPLE_USER = uuid.uuid4()
+SAMPLE_OTHER = uuid.uuid4()
+SAMPLE_EVENT = uuid.uuid4()
+NOW = datetime.utcnow()
+
+
+def hot_queries():
+    # Sohbet geçmişi endpoint'in çalıştırdığı yön başına sorgular (ilk sayfa ve before_id ile önceki sayfa)
+    first_page = crud._history_queries(SAMPLE_USER, SAMPLE_OTHER, None, 51, descending=True)
+    older_page = crud._history_queries(SAMPLE_USER, SAMPLE_OTHER, (NOW, 1000), 51, descending=True)
+    return {
+        "chat_history_sent": first_page[0],
+        "chat_history_received": first_page[1],
+        "chat_history_sent_before": older_page[0],
+        "chat_history_received_before": older_page[1],
+        "my_events_participations": select(models.EventParticipant.event_id).filter(
+            models.EventParticipant.user_id == SAMPLE_USER
+        ),
+        "notifications": select(models.Notification).filter(
+            models.Notification.user_id == SAMPLE_USER
+        ).order_by(models.Notification.created_at.desc()),
+        "friend_moments": select(models.EventMoment).filter(
+            models.EventMoment.user_id.in_([SAMPLE_USER, SAMPLE_OTHER]),
+            models.EventMoment.expires_at > NOW
+        ),
+        "incoming_friendships": select(models.Friendship.user_id).filter(
+            models.Friendship.friend_id == SAMPLE_USER,
+            models.Friendship.status == "accepted"
+        ),
+        "transactions": select(models.Transaction).filter(
+            models.Transaction.user_id == SAMPLE_USER
+        ).order_by(models.Transaction.created_at.desc()),
+        "events_by_city": select(models.Event).filter(
+            models.Event.status == models.EventStatus.AKTIF,
+            models.Event.city == "İstanbul",
+            models.Event.date >= NOW - timedelta(hours=24)
+        ).order_by(models.Event.date.asc()),
+        "live_tracking_map": select(models.LiveTracking).filter(
+            models.LiveTracking.event_id == SAMPLE_EVENT,
+            models.LiveTracking.last_updated >= NOW - timedelta(minutes=10)
+        ),
+    }
+
+
+def explain(connection, stmt):
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+    return [row[0] for row in rows]
+
+
+def is_table_scan(plan_lines) -> bool:
+    for line in plan_lines:
+        if "Seq Scan" in line:
+            return True
+        # SQLite: "SCAN messages" tam tarama, "SEARCH ... USING INDEX" / "SCAN ... USING INDEX" indeksli
+        if line.strip().startswith("SCAN") and "USING" not in line:
+            return True
+    return False
+
+
+def main():
+    failed = []
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+
+        for name, stmt in hot_queries().items():
+            plan = explain(connection, stmt)
+            scan = is_table_scan(plan)
+            print(f"{'❌' if scan else '✅'} {name}")
+            for line in plan:
+                print(f"     {line}")
+            if scan:
+                failed.append(name)
+
+    if failed:
+        print(f"\nTablo taraması yapan sorgular: {', '.join(failed)}")
+        print("İndeksler eksik olabilir: python sync_db.py")
+        sys.exit(1)
+    print("\nTüm sıcak sorgular indeks kullanıyor.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from passlib.context import CryptContext
+from services import password_hasher
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
@@ -13,15 +13,22 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 # Şifreleme algoritması ayarı (bcrypt kullanıyoruz, çok güvenlidir)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Bcrypt hesaplaması ayrı bir process havuzunda yapılır (services/password_hasher.py)
+pwd_context = password_hasher.pwd_context
 
 # 1. Şifre Doğrulama (Giriş yaparken kullanılır)
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.hasher.verify(plain_password, hashed_password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.hasher.verify_async(plain_password, hashed_password)
 
 # 2. Şifre Kriptolama (Kayıt olurken kullanılır)
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hasher.hash(password)
+
+async def get_password_hash_async(password):
+    return await password_hasher.hasher.hash_async(password)
 
 # 3. JWT Token Oluşturma
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -49,25 +56,64 @@ def decode_access_token(token: str):
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import database, crud, models
+from services import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def get_user_from_token(token: str, db: Session):
+    """
+    Token'ı doğrulayıp kullanıcıyı döner (geçersizse None).
+    Önbellekte geçerli bir kayıt varsa JWT çözme ve veritabanı sorgusu atlanır.
+    """
+    snapshot = principal_cache.cache.get(token)
+    if snapshot is not None:
+        return principal_cache.attach_snapshot(db, snapshot)
+
     payload = decode_access_token(token)
     if payload is None:
-        raise credentials_exception
+        return None
     
     email: str = payload.get("sub")
     if email is None:
-        raise credentials_exception
+        return None
         
     user = crud.get_user_by_email(db, email=email)
+    if user is None:
+        return None
+
+    principal_cache.cache.put(token, user, token_exp=payload.get("exp"))
+    return user
+
+async def get_user_from_token_async(token: str, db: AsyncSession):
+    """get_user_from_token'ın AsyncSession sürümü (WebSocket ve async route'lar için)."""
+    snapshot = principal_cache.cache.get(token)
+    if snapshot is not None:
+        return await principal_cache.attach_snapshot_async(db, snapshot)
+
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+        
+    user = await crud.get_user_by_email_async(db, email=email)
+    if user is None:
+        return None
+
+    principal_cache.cache.put(token, user, token_exp=payload.get("exp"))
+    return user
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = get_user_from_token(token, db)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from collections import deque
+from dotenv import load_dotenv
+
+from services.redis_client import get_async_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Sohbet mesajlarının alıcının bağlı olduğu worker'a iletilmesi (WebSocket teslimat veri yolu).
+# "memory": Tek process; alıcı bu worker'a bağlı değilse mesaj canlı iletilmez (lokal geliştirme)
+# "redis" : Kullanıcı başına pub/sub kanalı. Worker, kendisine bağlı kullanıcıların kanallarına abone olur;
+#           mesaj hangi worker'da gönderilirse gönderilsin alıcının bağlı olduğu tüm worker'lara ulaşır.
+# Varlık (presence): Kullanıcının bağlı olduğu worker'lar Redis'te skor = son geçerlilik zamanı olan
+# bir sorted set'te tutulur ve CHAT_PRESENCE_TTL/3 saniyede bir yenilenir. Çöken worker'ın kaydı
+# TTL sonunda kendiliğinden geçersizleşir. Alıcı hiçbir yerde çevrimiçi değilse yayın yapılmaz.
+# Mesaj zarfında gönderim zamanı taşınır; teslim anında gecikme ölçülür (worker saatleri senkron varsayılır).
+CHAT_BUS_BACKEND = os.getenv("CHAT_BUS_BACKEND", "memory").lower()
+CHAT_PRESENCE_TTL = float(os.getenv("CHAT_PRESENCE_TTL", 60))
+CHAT_BUS_PREFIX = "artibir:chat"
+# Gecikme yüzdelikleri için tutulan son ölçüm sayısı
+LATENCY_SAMPLES = 1000
+
+# Alıcı çevrimiçiyse yayınla, değilse -1 dön (tek gidiş-dönüş, kontrol ile yayın arasında yarış yok)
+_PUBLISH_IF_ONLINE_LUA = """
+if redis.call('ZCOUNT', KEYS[1], ARGV[1], '+inf') == 0 then
+    return -1
+end
+return redis.call('PUBLISH', ARGV[2], ARGV[3])
+"""
+
+
+def _presence_key(user_id) -> str:
+    return f"{CHAT_BUS_PREFIX}:presence:{user_id}"
+
+
+def _channel(user_id) -> str:
+    return f"{CHAT_BUS_PREFIX}:user:{user_id}"
+
+
+class DeliveryMetrics:
+    def __init__(self):
+        self.published = 0
+        self.skipped_offline = 0
+        self.delivered = 0
+        self.undelivered = 0
+        self.backend_errors = 0
+        self._latencies_ms = deque(maxlen=LATENCY_SAMPLES)
+
+    def record_delivery(self, sent_at: float):
+        self.delivered += 1
+        self._latencies_ms.append(max(0.0, (time.time() - sent_at) * 1000))
+
+    def snapshot(self) -> dict:
+        samples = sorted(self._latencies_ms)
+
+        def percentile(p: float):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+        return {
+            "published": self.published,
+            "skipped_offline": self.skipped_offline,
+            "delivered": self.delivered,
+            "undelivered": self.undelivered,
+            "backend_errors": self.backend_errors,
+            "latency_ms": {
+                "samples": len(samples),
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(samples[-1], 2) if samples else None
+            }
+        }
+
+
+class LocalBus:
+    """Process içi teslimat: sadece bu worker'a bağlı kullanıcılar çevrimiçi sayılır."""
+
+    def __init__(self, deliver, is_connected):
+        # deliver(user_id, message) -> bool: mesajı bu worker'daki soket(ler)e yazar
+        self._deliver = deliver
+        self._is_connected = is_connected
+        self.metrics = DeliveryMetrics()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def user_connected(self, user_id):
+        pass
+
+    async def user_disconnected(self, user_id):
+        pass
+
+    async def is_online(self, user_id) -> bool:
+        return self._is_connected(user_id)
+
+    async def publish(self, user_id, message: str) -> bool:
+        if not self._is_connected(user_id):
+            self.metrics.skipped_offline += 1
+            return False
+        self.metrics.published += 1
+        sent_at = time.time()
+        if await self._deliver(user_id, message):
+            self.metrics.record_delivery(sent_at)
+        else:
+            self.metrics.undelivered += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self.metrics.snapshot()}
+
+
+class RedisBus:
+    """Kullanıcı başına Redis pub/sub kanalı + sorted set ile çok worker'lı varlık takibi."""
+
+    def __init__(self, client, deliver, is_connected):
+        self.client = client
+        self._deliver = deliver
+        self._is_connected = is_connected
+        self._local = LocalBus(deliver, is_connected)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._publish_script = client.register_script(_PUBLISH_IF_ONLINE_LUA)
+        self._pubsub = None
+        self._subscribed = set()
+        self._tasks = []
+        self._start_lock = asyncio.Lock()
+        self.metrics = DeliveryMetrics()
+
+    async def start(self):
+        async with self._start_lock:
+            if self._pubsub is not None:
+                return
+            self._pubsub = self.client.pubsub()
+            self._tasks = [
+                asyncio.create_task(self._listen()),
+                asyncio.create_task(self._heartbeat())
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._pubsub is not None:
+            try:
+                # Bu worker'ın varlık kayıtlarını hemen düşür (TTL'i beklemeden çevrimdışı görünsünler)
+                pipe = self.client.pipeline(transaction=False)
+                for user_id in self._subscribed:
+                    pipe.zrem(_presence_key(user_id), self.worker_id)
+                await pipe.execute()
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Sohbet veri yolu kapatılırken hata: {e}")
+            self._pubsub = None
+        self._subscribed.clear()
+
+    async def _mark_present(self, user_ids: list):
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            key = _presence_key(user_id)
+            pipe.zadd(key, {self.worker_id: now + CHAT_PRESENCE_TTL})
+            # Süresi geçmiş worker kayıtlarını temizle, anahtar da kendiliğinden silinsin
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.expire(key, int(CHAT_PRESENCE_TTL) * 2)
+        await pipe.execute()
+
+    async def user_connected(self, user_id):
+        await self.start()
+        user_key = str(user_id)
+        if user_key in self._subscribed:
+            return
+        self._subscribed.add(user_key)
+        try:
+            # Önce abone ol, sonra çevrimiçi ilan et: yayınlar kaçmasın
+            await self._pubsub.subscribe(_channel(user_key))
+            await self._mark_present([user_key])
+        except Exception as e:
+            self.metrics.backend_errors += 1
+            logger.warning(f"Sohbet kanalına abone olunamadı ({user_key}): {e}")
+
+    async def user_disconnected(self, user_id):
+        user_key = str(user_id)
+        if user_key not in self._subscribed:
+            return
+        self._subscribed.discard(user_key)
+        try:
+            await self.client.zrem(_presence_key(user_key), self.worker_id)
+            await self._pubsub.unsubscribe(_channel(user_key))
+        except Exception as e:
+            self.metrics.backend_errors += 1
+            logger.warning(f"Sohbet kanalı aboneliği bırakılamadı ({user_key}): {e}")
+
+    async def is_online(self, user_id) -> bool:
+        if self._is_connected(user_id):
+            return True
+        try:
+            return await self.client.zcount(_presence_key(user_id), time.time(), "+inf") > 0
+        except Exception:
+            self.metrics.backend_errors += 1
+            return False
+
+    async def publish(self, user_id, message: str) -> bool:
+        envelope = json.dumps({"t": time.time(), "m": message})
+        try:
+            receivers = int(await self._publish_script(
+                keys=[_presence_key(user_id)],
+                args=[time.time(), _channel(user_id), envelope]
+            ))
+        except Exception as e:
+            # Redis yoksa en azından bu worker'daki alıcıya teslim et
+            self.metrics.backend_errors += 1
+            logger.warning(f"Sohbet mesajı yayınlanamadı, yerel teslimata geçiliyor: {e}")
+            return await self._local.publish(user_id, message)
+        if receivers < 0:
+            self.metrics.skipped_offline += 1
+            return False
+        self.metrics.published += 1
+        if receivers == 0:
+            # Varlık kaydı vardı ama abone kalmamış (worker yeni kapandı)
+            self.metrics.undelivered += 1
+        return receivers > 0
+
+    async def _handle(self, raw: dict):
+        user_id = raw["channel"].rsplit(":", 1)[-1]
+        try:
+            envelope = json.loads(raw["data"])
+        except (TypeError, ValueError):
+            return
+        if await self._deliver(user_id, envelope["m"]):
+            self.metrics.record_delivery(envelope["t"])
+        else:
+            self.metrics.undelivered += 1
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.2)
+                    continue
+                raw = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if raw is not None and raw.get("type") == "message":
+                    await self._handle(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.backend_errors += 1
+                logger.warning(f"Sohbet veri yolu dinleyicisi hata verdi, yeniden deneniyor: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(CHAT_PRESENCE_TTL / 3)
+            try:
+                if self._subscribed:
+                    await self._mark_present(list(self._subscribed))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.backend_errors += 1
+                logger.warning(f"Sohbet varlık kayıtları yenilenemedi: {e}")
+
+    def stats(self) -> dict:
+        local_fallback = self._local.metrics.snapshot()
+        return {
+            "backend": "redis",
+            "worker_id": self.worker_id,
+            "subscribed_users": len(self._subscribed),
+            **self.metrics.snapshot(),
+            "local_fallback_delivered": local_fallback["delivered"]
+        }
+
+
+_buses = []
+
+
+def create_bus(deliver, is_connected):
+    """
+    deliver(user_id, message) -> bool (async): mesajı bu worker'daki bağlantı(lar)a yazar.
+    is_connected(user_id) -> bool: kullanıcı bu worker'a bağlı mı.
+    """
+    bus = None
+    if CHAT_BUS_BACKEND == "redis":
+        client = get_async_redis()
+        if client is not None:
+            bus = RedisBus(client, deliver, is_connected)
+        else:
+            logger.warning("CHAT_BUS_BACKEND=redis ama Redis istemcisi yok, process içi teslimata geçiliyor.")
+    if bus is None:
+        bus = LocalBus(deliver, is_connected)
+    _buses.append(bus)
+    return bus
+
+
+async def shutdown():
+    for bus in _buses:
+        await bus.stop()
+
+
+def get_stats() -> dict:
+    return {"buses": [bus.stats() for bus in _buses]}
@@ -0,0 +1,261 @@
+import os
+import time
+import asyncio
+import logging
+import datetime
+import bisect
+import threading
+from array import array
+from dotenv import load_dotenv
+
+import database, models, schemas
+from utils import geo
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Harita ekranının /events?lat=&lon= sorguları için worker başına bellek içi mekansal indeks.
+# İptal edilmemiş ve geçmemiş etkinlikler utils/geo ızgarasına göre hücrelere dağıtılır;
+# koordinatlar ve tarihler kompakt float dizilerinde (array('d')) tutulur.
+# Bu worker'daki oluşturma/iptal işlemleri anında yansır, diğer worker'lardakiler
+# en geç EVENT_INDEX_REFRESH_SECONDS sonra periyodik yeniden yüklemeyle gelir.
+EVENT_INDEX_ENABLED = os.getenv("EVENT_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+EVENT_INDEX_REFRESH_SECONDS = float(os.getenv("EVENT_INDEX_REFRESH_SECONDS", 60))
+# Son başarılı yüklemeden bu kadar yenileme periyodu geçtiyse indeks "soğuk" sayılır ve SQL'e düşülür
+STALE_AFTER_PERIODS = 3
+# crud.get_events / get_nearby_events ile aynı: son 24 saatteki etkinlikler hâlâ listelenir
+PAST_GRACE = datetime.timedelta(hours=24)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _timestamp(value: datetime.datetime) -> float:
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+class _Cell:
+    __slots__ = ("lats", "lons", "dates", "ids")
+
+    def __init__(self):
+        self.lats = array("d")
+        self.lons = array("d")
+        self.dates = array("d")
+        self.ids = []
+
+    def append(self, event_id, lat: float, lon: float, date_ts: float):
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.dates.append(date_ts)
+        self.ids.append(event_id)
+
+    def remove_at(self, position: int):
+        # Sırayı korumaya gerek yok: son elemanı boşalan yere taşı (O(1))
+        last = len(self.ids) - 1
+        if position != last:
+            self.lats[position] = self.lats[last]
+            self.lons[position] = self.lons[last]
+            self.dates[position] = self.dates[last]
+            self.ids[position] = self.ids[last]
+        self.lats.pop()
+        self.lons.pop()
+        self.dates.pop()
+        self.ids.pop()
+
+
+class _Grid:
+    def __init__(self):
+        self.cells = {}
+        # Dolu hücre kimlikleri (sıralı): sorgular kapsanan aralıktaki boş hücreleri hiç dolaşmaz
+        self.occupied = []
+        # event_id -> (cell_id, EventOut sözlüğü)
+        self.entries = {}
+
+    def add(self, event_id, lat: float, lon: float, date_ts: float, payload: dict):
+        if event_id in self.entries:
+            self.remove(event_id)
+        cell_id = geo.cell_id(lat, lon)
+        cell = self.cells.get(cell_id)
+        if cell is None:
+            cell = self.cells[cell_id] = _Cell()
+            bisect.insort(self.occupied, cell_id)
+        cell.append(event_id, lat, lon, date_ts)
+        self.entries[event_id] = (cell_id, payload)
+
+    def remove(self, event_id):
+        entry = self.entries.pop(event_id, None)
+        if entry is None:
+            return
+        cell = self.cells[entry[0]]
+        cell.remove_at(cell.ids.index(event_id))
+        if not cell.ids:
+            del self.cells[entry[0]]
+            del self.occupied[bisect.bisect_left(self.occupied, entry[0])]
+
+
+def _indexable(event: models.Event) -> bool:
+    return (
+        event.latitude is not None
+        and event.longitude is not None
+        and event.date is not None
+        and event.status != models.EventStatus.IPTAL
+    )
+
+
+def _payload(event: models.Event) -> dict:
+    return schemas.EventOut.model_validate(event).model_dump()
+
+
+class EventSpatialIndex:
+    def __init__(self, enabled: bool, refresh_seconds: float):
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self._grid = _Grid()
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # Yeniden yükleme sürerken gelen değişiklikler kaybolmasın diye yeni ızgaraya tekrar uygulanır
+        self._pending = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.last_rebuild_ms = 0.0
+
+    def is_warm(self) -> bool:
+        if not self.enabled or self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.refresh_seconds * STALE_AFTER_PERIODS
+
+    def upsert(self, event: models.Event):
+        """Etkinlik oluşturulduğunda/güncellendiğinde çağrılır (commit sonrası)."""
+        if not self.enabled:
+            return
+        if not _indexable(event):
+            self.remove(event.id)
+            return
+        operation = ("add", event.id, float(event.latitude), float(event.longitude), _timestamp(event.date), _payload(event))
+        with self._lock:
+            self._apply(self._grid, operation)
+            if self._pending is not None:
+                self._pending.append(operation)
+
+    def remove(self, event_id):
+        """Etkinlik iptal edildiğinde/silindiğinde çağrılır."""
+        if not self.enabled:
+            return
+        operation = ("remove", event_id)
+        with self._lock:
+            self._apply(self._grid, operation)
+            if self._pending is not None:
+                self._pending.append(operation)
+
+    @staticmethod
+    def _apply(grid: _Grid, operation: tuple):
+        if operation[0] == "add":
+            grid.add(*operation[1:])
+        else:
+            grid.remove(operation[1])
+
+    def rebuild(self):
+        """Tüm aktif etkinlikleri veritabanından yükleyip ızgarayı atomik olarak değiştirir."""
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            self._pending = []
+        try:
+            grid = _Grid()
+            cutoff_date = datetime.datetime.utcnow() - PAST_GRACE
+            db = database.ReadSessionLocal()
+            try:
+                events = db.query(models.Event).filter(
+                    models.Event.status != models.EventStatus.IPTAL,
+                    models.Event.date >= cutoff_date,
+                    models.Event.latitude.isnot(None),
+                    models.Event.longitude.isnot(None)
+                ).yield_per(1000)
+                for event in events:
+                    grid.add(event.id, float(event.latitude), float(event.longitude), _timestamp(event.date), _payload(event))
+            finally:
+                db.close()
+
+            with self._lock:
+                for operation in self._pending:
+                    self._apply(grid, operation)
+                self._grid = grid
+                self._loaded_at = time.monotonic()
+                self.rebuilds += 1
+                self.last_rebuild_ms = (time.perf_counter() - started) * 1000
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def query(self, lat: float, lon: float, radius_km: float, limit: int = 50):
+        """
+        Yarıçap içindeki etkinlikleri mesafeye göre sıralı (distance_km alanıyla) döner.
+        İndeks soğuksa None döner; çağıran SQL'e düşmelidir.
+        """
+        if not self.is_warm():
+            self.misses += 1
+            return None
+
+        radius_km = min(radius_km, geo.MAX_RADIUS_KM)
+        min_date_ts = _timestamp(datetime.datetime.utcnow() - PAST_GRACE)
+        nearest = []
+        with self._lock:
+            grid = self._grid
+            occupied = grid.occupied
+            for first_cell, last_cell in geo.covering_cell_ranges(lat, lon, radius_km):
+                start = bisect.bisect_left(occupied, first_cell)
+                end = bisect.bisect_right(occupied, last_cell, start)
+                for cell_id in occupied[start:end]:
+                    cell = grid.cells[cell_id]
+                    lats, lons, dates, ids = cell.lats, cell.lons, cell.dates, cell.ids
+                    for position in range(len(ids)):
+                        if dates[position] < min_date_ts:
+                            continue
+                        distance = geo.haversine_km(lat, lon, lats[position], lons[position])
+                        if distance <= radius_km:
+                            nearest.append((distance, ids[position]))
+            nearest.sort(key=lambda item: item[0])
+            results = [
+                dict(grid.entries[event_id][1], distance_km=round(distance, 3))
+                for distance, event_id in nearest[:limit]
+            ]
+        self.hits += 1
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "warm": self.is_warm(),
+                "events": len(self._grid.entries),
+                "cells": len(self._grid.cells),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "last_rebuild_ms": round(self.last_rebuild_ms, 2),
+                "seconds_since_rebuild": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "refresh_seconds": self.refresh_seconds
+            }
+
+
+index = EventSpatialIndex(EVENT_INDEX_ENABLED, EVENT_INDEX_REFRESH_SECONDS)
+
+
+async def run_refresh_loop():
+    """Startup'ta başlatılır: indeksi hemen yükler ve periyodik olarak yeniler."""
+    if not index.enabled:
+        return
+    while True:
+        try:
+            await asyncio.to_thread(index.rebuild)
+        except Exception as e:
+            logger.warning(f"Etkinlik mekansal indeksi yenilenemedi: {e}")
+        await asyncio.sleep(index.refresh_seconds)
+
+
+def get_stats() -> dict:
+    return index.stats()
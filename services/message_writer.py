@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import datetime
+from uuid import UUID
+from collections import deque
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError, DataError
+
+import crud
+import database
+from services import encryption
+from utils import ulid
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Sohbet mesajlarının write-behind kaydı (group commit).
+# WebSocket döngüsü mesajı şifreleyip kuyruğa ekler ve hemen iletir; veritabanına yazma işini
+# arka plandaki tek bir task yapar: ilk mesajdan sonra CHAT_WRITE_FLUSH_MS kadar bekleyip kuyrukta
+# biriken en fazla CHAT_WRITE_BATCH_SIZE mesajı tek INSERT + tek commit ile yazar.
+# Teslim garantisi en az bir kez (at-least-once):
+#   - Her mesajın bir ULID'si (client_id) vardır; istemci "message_saved" onayını almadığı mesajı aynı
+#     client_id ile tekrar gönderir, (sender_id, client_id) tekil indeksi sayesinde ikinci kez yazılmaz.
+#   - Geçici yazma hatasında (bağlantı, zaman aşımı) batch atılmaz, artan beklemeyle tekrar denenir
+#     (kuyruk dolarsa gönderen bekler).
+#   - Kalıcı hatada (IntegrityError/DataError, örn. olmayan alıcıya yabancı anahtar ihlali) tekrar denemek
+#     işe yaramaz ve yazıcıyı kilitler: batch tek tek yazılır, yazılamayan mesaj reddedilir (on_rejected).
+#   - Kapanışta kuyruk boşaltılır; süre içinde yazılamayanlar journal dosyasına eklenir ve
+#     bir sonraki açılışta tekrar yazılır.
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "true").lower() == "true"
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", 200))
+CHAT_WRITE_FLUSH_MS = float(os.getenv("CHAT_WRITE_FLUSH_MS", 10))
+CHAT_WRITE_QUEUE_MAX = int(os.getenv("CHAT_WRITE_QUEUE_MAX", 10000))
+CHAT_WRITE_SHUTDOWN_TIMEOUT = float(os.getenv("CHAT_WRITE_SHUTDOWN_TIMEOUT", 10))
+CHAT_WRITE_JOURNAL = os.getenv("CHAT_WRITE_JOURNAL", "data/chat_write_journal.jsonl")
+# Başarısız yazmada bekleme süresinin üst sınırı (sn)
+MAX_RETRY_DELAY = 5.0
+# Tekrar denemekle düzelmeyecek hatalar
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+
+@dataclass
+class PendingMessage:
+    client_id: str
+    sender_id: UUID
+    receiver_id: UUID
+    # Şifreli içerik (kuyrukta ve journal'da düz metin tutulmaz)
+    content: str
+    timestamp: datetime.datetime
+
+    @classmethod
+    def create(cls, sender_id: UUID, receiver_id: UUID, plain_content: str, client_id: str = None):
+        return cls(
+            client_id=ulid.normalize_ulid(client_id) or ulid.new_ulid(),
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            content=encryption.encrypt_message(plain_content),
+            timestamp=datetime.datetime.utcnow()
+        )
+
+    def to_row(self) -> dict:
+        return {
+            "client_id": self.client_id,
+            "sender_id": self.sender_id,
+            "receiver_id": self.receiver_id,
+            "content": self.content,
+            "timestamp": self.timestamp
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "client_id": self.client_id,
+            "sender_id": str(self.sender_id),
+            "receiver_id": str(self.receiver_id),
+            "content": self.content,
+            "timestamp": self.timestamp.isoformat()
+        })
+
+    @classmethod
+    def from_json(cls, line: str):
+        data = json.loads(line)
+        return cls(
+            client_id=data["client_id"],
+            sender_id=UUID(data["sender_id"]),
+            receiver_id=UUID(data["receiver_id"]),
+            content=data["content"],
+            timestamp=datetime.datetime.fromisoformat(data["timestamp"])
+        )
+
+
+class MessageWriter:
+    def __init__(self, on_persisted=None, session_factory=None, batch_size: int = CHAT_WRITE_BATCH_SIZE,
+                 flush_ms: float = CHAT_WRITE_FLUSH_MS, queue_max: int = CHAT_WRITE_QUEUE_MAX,
+                 journal_path: str = CHAT_WRITE_JOURNAL, write_behind: bool = CHAT_WRITE_BEHIND,
+                 on_rejected=None):
+        # on_persisted(message, message_id, is_new) (async): yazılan her mesaj için (örn. gönderene onay)
+        self._on_persisted = on_persisted
+        # on_rejected(message, reason) (async): kalıcı hata yüzünden yazılamayan her mesaj için
+        self._on_rejected = on_rejected
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.journal_path = journal_path
+        self.write_behind = write_behind
+        self._queue = asyncio.Queue(maxsize=queue_max)
+        self._inflight = []
+        self._task = None
+        self._stopping = False
+        self.persisted = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.failures = 0
+        self.rejected = 0
+        self.journaled = 0
+        self.recovered = 0
+        self._flush_ms = deque(maxlen=100)
+
+    def _sessions(self):
+        return (self._session_factory or database.AsyncSessionLocal)()
+
+    async def start(self):
+        if self._task is not None:
+            return
+        await self._recover_journal()
+        if self.write_behind:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, message: PendingMessage):
+        """Write-behind açıksa kuyruğa ekler (kuyruk doluysa yer açılana kadar bekler), değilse hemen yazar."""
+        if not self.write_behind:
+            await self._persist_checked([message])
+            return
+        if self._task is None:
+            await self.start()
+        await self._queue.put(message)
+
+    def _drain(self, batch: list):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            # Kuyruktan alınan mesajlar yazılana kadar _inflight'ta görünür (kapanışta kaybolmasın)
+            batch = self._inflight = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.batch_size and self.flush_ms > 0:
+                # Group commit penceresi: kısa bir süre daha gelen mesajları topla
+                await asyncio.sleep(self.flush_ms / 1000)
+                self._drain(batch)
+            await self._persist_with_retry(batch)
+            self._inflight = []
+
+    async def _persist_with_retry(self, batch: list):
+        delay = 0.1
+        while True:
+            try:
+                await self._persist_checked(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Mesaj batch'i yazılamadı ({len(batch)} mesaj), {delay:.1f} sn sonra tekrar denenecek: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    async def _persist_checked(self, batch: list):
+        """
+        Batch'i yazar; kalıcı hatada mesajları tek tek yazar ve yazılamayanı reddeder.
+        Geçici hatalar çağırana iletilir (yazılmış mesajlar tekrar denemede client_id ile atlanır).
+        """
+        try:
+            await self._persist(batch)
+        except PERMANENT_ERRORS as e:
+            if len(batch) == 1:
+                await self._reject(batch[0], e)
+                return
+            for message in batch:
+                await self._persist_checked([message])
+
+    async def _reject(self, message: PendingMessage, error: Exception):
+        self.rejected += 1
+        logger.warning(f"Mesaj kalıcı hata nedeniyle yazılmadı (client_id={message.client_id}): {error}")
+        if self._on_rejected is not None:
+            try:
+                await self._on_rejected(message, "Mesaj kaydedilemedi.")
+            except Exception as e:
+                logger.warning(f"Mesaj ret bildirimi gönderilemedi: {e}")
+
+    async def _persist(self, batch: list):
+        started = time.perf_counter()
+        async with self._sessions() as db:
+            saved = await crud.create_messages_bulk_async(db, [message.to_row() for message in batch])
+        self._flush_ms.append((time.perf_counter() - started) * 1000)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+        for message in batch:
+            message_id, is_new = saved[(message.sender_id, message.client_id)]
+            if is_new:
+                self.persisted += 1
+            else:
+                self.duplicates += 1
+            if self._on_persisted is not None:
+                try:
+                    await self._on_persisted(message, message_id, is_new)
+                except Exception as e:
+                    logger.warning(f"Mesaj kayıt onayı gönderilemedi: {e}")
+
+    def _write_journal(self, messages: list):
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            for message in messages:
+                journal.write(message.to_json() + "\n")
+
+    async def _recover_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        # Çok worker'lı kurulumda dosyayı tek bir worker alsın (rename atomik)
+        claimed = f"{self.journal_path}.{os.getpid()}"
+        try:
+            os.replace(self.journal_path, claimed)
+        except OSError:
+            return
+        with open(claimed, encoding="utf-8") as journal:
+            messages = [PendingMessage.from_json(line) for line in journal if line.strip()]
+        try:
+            for start in range(0, len(messages), self.batch_size):
+                await self._persist_checked(messages[start:start + self.batch_size])
+        except Exception as e:
+            # Yazılamadı: journal'ı geri koy, bir sonraki açılışta tekrar denenir
+            self._write_journal(messages)
+            logger.error(f"Mesaj journal'ı geri yüklenemedi ({len(messages)} mesaj): {e}")
+        else:
+            self.recovered += len(messages)
+            logger.info(f"Mesaj journal'ından {len(messages)} mesaj geri yüklendi.")
+        os.remove(claimed)
+
+    async def stop(self):
+        """Kuyruğu boşaltır; süre içinde yazılamayan mesajları journal'a ekler."""
+        if self._task is None or self._stopping:
+            return
+        self._stopping = True
+        deadline = time.monotonic() + CHAT_WRITE_SHUTDOWN_TIMEOUT
+        while (self._inflight or not self._queue.empty()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        leftover = list(self._inflight)
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        if leftover:
+            self._write_journal(leftover)
+            self.journaled += len(leftover)
+            logger.warning(f"{len(leftover)} mesaj yazılamadı, journal'a eklendi: {self.journal_path}")
+
+    def stats(self) -> dict:
+        samples = sorted(self._flush_ms)
+        return {
+            "write_behind": self.write_behind,
+            "queued": self._queue.qsize(),
+            "inflight": len(self._inflight),
+            "persisted": self.persisted,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "avg_batch": round((self.persisted + self.duplicates) / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "journaled": self.journaled,
+            "recovered": self.recovered,
+            "flush_ms_p50": round(samples[len(samples) // 2], 2) if samples else None,
+            "flush_ms_max": round(samples[-1], 2) if samples else None
+        }
+
+
+_writers = []
+
+
+def create_writer(on_persisted=None, **kwargs) -> MessageWriter:
+    writer = MessageWriter(on_persisted, **kwargs)
+    _writers.append(writer)
+    return writer
+
+
+async def start():
+    for writer in _writers:
+        await writer.start()
+
+
+async def shutdown():
+    for writer in _writers:
+        await writer.stop()
+
+
+def get_stats() -> dict:
+    return {"writers": [writer.stats() for writer in _writers]}
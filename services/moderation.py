@@ -7,6 +7,7 @@ BAD_WORDS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"
 class SecurityGuard:
     def __init__(self):
         self.bad_words = self._load_bad_words()
+        self._bad_words_pattern = None
         print("🛡️ Güvenlik Botu: Temel kurallar aktif (NLP devre dışı).")
 
     def _load_bad_words(self):
@@ -44,6 +45,27 @@ class SecurityGuard:
 
         return True, "Onaylandı"
 
+    def check_messages(self, messages, user_trust_score: int):
+        """
+        Toplu kontrol (etkinlik içe aktarma vb.): check_message ile aynı kurallar,
+        ancak yasaklı kelimeler tek bir derlenmiş desenle taranır. [(bool, sebep), ...] döner.
+        """
+        if self._bad_words_pattern is None:
+            self._bad_words_pattern = re.compile("|".join(re.escape(word.lower()) for word in self.bad_words))
+        phone_pattern = re.compile(r"(?:\+90|0)?5\d{2}[\s\.]?\d{3}[\s\.]?\d{2}[\s\.]?\d{2}")
+
+        results = []
+        for message in messages:
+            if self.bad_words and self._bad_words_pattern.search(message.lower()):
+                results.append((False, "Mesajınız topluluk kurallarına aykırı kelimeler içeriyor."))
+            elif user_trust_score < 70 and phone_pattern.search(message):
+                results.append((False, "Güvenliğiniz için tanışmadan hemen telefon numarası paylaşamazsınız."))
+            elif len(message.strip()) < 2:
+                results.append((False, "Lütfen anlamlı bir cümle kurun."))
+            else:
+                results.append((True, "Onaylandı"))
+        return results
+
     def filter_message(self, content: str) -> str:
         """Mesajı sansürler."""
         filtered_content = content
@@ -59,3 +81,6 @@ def filter_message(content: str) -> str:
 
 def check_message(message: str, user_trust_score: int = 50):
     return guard.check_message(message, user_trust_score)
+
+def check_messages(messages, user_trust_score: int = 50):
+    return guard.check_messages(messages, user_trust_score)
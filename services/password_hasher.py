@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bcrypt işlemleri (~250ms) API thread'lerini meşgul etmesin diye ayrı process havuzunda çalışır.
+# HASH_WORKERS=0 verilirse havuz kullanılmaz, işlem çağıran thread'de yapılır (lokal geliştirme/scriptler).
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(2, os.cpu_count() or 1)))
+# Kuyrukta bekleyebilecek maksimum işlem. Aşılırsa istek beklemeden 503 ile reddedilir.
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 16))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Havuz ilk kullanımda oluşturulur (import eden scriptler gereksiz process açmasın)
+        if self._executor is None:
+            # fork yerine spawn: uvicorn thread'leri çalışırken fork etmek güvenli değil
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Sunucu şu anda yoğun, lütfen birkaç saniye sonra tekrar deneyin.",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+            executor = self._get_executor()
+
+        started = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._finish(started, failed=True)
+            raise
+        future.add_done_callback(lambda f: self._finish(started, failed=f.exception() is not None))
+        return future
+
+    def _finish(self, started: float, failed: bool = False):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.pending -= 1
+            if failed:
+                self.failed += 1
+                return
+            self.completed += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        if self.workers <= 0:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(_verify, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(_hash, password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "avg_ms": round(self.total_ms / self.completed, 2) if self.completed else 0.0,
+                "max_ms": round(self.max_ms, 2)
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(HASH_WORKERS, HASH_MAX_PENDING)
+
+
+def get_stats() -> dict:
+    return hasher.stats()
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+load_dotenv()
+
+# Doğrulanmış token -> kullanıcı snapshot'ı önbelleği (LRU + TTL)
+# TTL kısa tutulur çünkü her worker kendi önbelleğini tutar; diğer worker'daki
+# değişiklikler en geç TTL sonunda görünür hale gelir. 0 verilirse önbellek kapanır.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+
+# Snapshot'a sadece kolonlar alınır, ilişkiler (interests, clubs) session'a bağlanınca lazy yüklenir
+_USER_COLUMNS = [attr.key for attr in inspect(models.User).column_attrs]
+
+
+class PrincipalCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # token -> (user_id, snapshot, cached_at, token_exp)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # user_id -> {token, ...} (Kullanıcı bazlı geçersiz kılma için ters indeks)
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, token: str):
+        """Token için geçerli bir snapshot varsa döner, yoksa None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, snapshot, cached_at, token_exp = entry
+            if now - cached_at > self.ttl or (token_exp is not None and now >= token_exp):
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return snapshot
+
+    def put(self, token: str, user: models.User, token_exp: float = None):
+        if not self.enabled:
+            return
+        snapshot = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (user.id, snapshot, time.time(), token_exp)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest_token = next(iter(self._entries))
+                self._remove(oldest_token)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Kullanıcıya ait tüm token kayıtlarını siler (profil/şifre/ban değişikliklerinde)."""
+        with self._lock:
+            tokens = self._tokens_by_user.pop(user_id, None)
+            if not tokens:
+                return
+            for token in tokens:
+                self._entries.pop(token, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _remove(self, token: str):
+        # Lock altında çağrılmalıdır
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_tokens = self._tokens_by_user.get(entry[0])
+        if user_tokens is not None:
+            user_tokens.discard(token)
+            if not user_tokens:
+                del self._tokens_by_user[entry[0]]
+
+
+cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+def attach_snapshot(db: Session, snapshot: dict) -> models.User:
+    """
+    Snapshot'tan kullanıcı nesnesi oluşturup SELECT atmadan session'a bağlar.
+    Böylece router'lar current_user üzerinde değişiklik yapıp commit edebilir.
+    """
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+async def attach_snapshot_async(db: AsyncSession, snapshot: dict) -> models.User:
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def invalidate_user(user_id):
+    cache.invalidate_user(user_id)
+
+
+def get_stats() -> dict:
+    return cache.stats()
+
+
+# Güvenlik ağı: Router'larda açık çağrı unutulsa bile (cüzdan, güven puanı vb.)
+# flush edilen her User değişikliği bu worker'ın önbelleğini temizler.
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User) and obj.id is not None:
+            cache.invalidate_user(obj.id)
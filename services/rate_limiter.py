@@ -0,0 +1,221 @@
+import os
+import math
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request
+
+import models, security
+from services.redis_client import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "redis": Tüm worker'lar ortak limit kullanır (production)
+# "memory": Her process kendi sayacını tutar (lokal geliştirme)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# Worker'ın Redis'ten tek seferde kiraladığı kota oranı (limitin 1/N'i).
+# Kiralanan hak yerel kovada tüketilir, bu sürede Redis'e gidilmez.
+RATE_LIMIT_LEASE_DIVISOR = int(os.getenv("RATE_LIMIT_LEASE_DIVISOR", 10))
+RATE_LIMIT_PREFIX = "artibir:rl"
+# Process içi sözlükler (sayaçlar, kiralar, red kayıtları) bu boyutu aşınca süresi geçenler temizlenir
+LOCAL_KEYS_MAX = 50000
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Kayan pencere sayacı: önceki pencerenin ağırlıklı payı + mevcut pencere.
+# İstenen kadar (veya kalan kadar) hak verir, verilen miktarı döner.
+_SLIDING_WINDOW_LUA = """
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local available = limit - (math.floor(prev * weight) + curr)
+if available <= 0 then
+    return 0
+end
+local grant = math.min(available, want)
+redis.call('INCRBY', KEYS[1], grant)
+redis.call('EXPIRE', KEYS[1], ttl)
+return grant
+"""
+
+
+def parse_rate(rate: str):
+    """'5/minute' -> (5, 60)"""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period.strip().rstrip("s")]
+
+
+class MemoryBackend:
+    """Process içi kayan pencere sayacı (Redis yokken)."""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: int, period: int, want: int, now: float) -> int:
+        window = int(now // period)
+        weight = 1 - (now % period) / period
+        with self._lock:
+            curr = self._counters.get((key, window), 0)
+            prev = self._counters.get((key, window - 1), 0)
+            available = limit - (math.floor(prev * weight) + curr)
+            if available <= 0:
+                return 0
+            grant = min(available, want)
+            self._counters[(key, window)] = curr + grant
+            # Eski pencereleri temizle
+            if len(self._counters) > LOCAL_KEYS_MAX:
+                self._counters = {k: v for k, v in self._counters.items() if k[1] >= window - 1}
+            return grant
+
+
+class RedisBackend:
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(_SLIDING_WINDOW_LUA)
+
+    def acquire(self, key: str, limit: int, period: int, want: int, now: float) -> int:
+        window = int(now // period)
+        weight = 1 - (now % period) / period
+        keys = [f"{RATE_LIMIT_PREFIX}:{key}:{window}", f"{RATE_LIMIT_PREFIX}:{key}:{window - 1}"]
+        return int(self._script(keys=keys, args=[limit, weight, want, period * 2]))
+
+
+class RateLimiter:
+    """
+    Yerel kova + paylaşımlı kayan pencere.
+    - İzin: Worker Redis'ten limitin bir kısmını kiralar, sonraki istekler yerelden düşülür.
+    - Red: Pencere dolduysa, pencere bitene kadar Redis'e sormadan yerelde reddedilir.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._fallback = MemoryBackend()
+        # key -> [kalan_hak, pencere_no]
+        self._leases = {}
+        # key -> reddin biteceği zaman
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.backend_calls = 0
+        self.backend_errors = 0
+        self.rejected = 0
+
+    def hit(self, key: str, limit: int, period: int):
+        """İsteğe izin varsa None, yoksa kaç saniye sonra tekrar denenebileceğini döner."""
+        now = time.time()
+        window = int(now // period)
+        with self._lock:
+            blocked_until = self._blocked_until.get(key)
+            if blocked_until is not None:
+                if now < blocked_until:
+                    self.local_hits += 1
+                    self.rejected += 1
+                    return blocked_until - now
+                del self._blocked_until[key]
+
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] == window and lease[0] > 0:
+                lease[0] -= 1
+                self.local_hits += 1
+                return None
+
+        lease_size = max(1, limit // RATE_LIMIT_LEASE_DIVISOR)
+        granted = self._acquire(key, limit, period, lease_size, now)
+
+        with self._lock:
+            if granted <= 0:
+                self.rejected += 1
+                # Kayan pencerede yer açılması için en geç mevcut pencerenin sonu beklenir
+                retry_after = period - (now % period)
+                self._blocked_until[key] = now + retry_after
+                # Reddedilen anahtar tekrar gelmezse kaydı hiç silinmez: süresi geçenleri topluca temizle
+                if len(self._blocked_until) > LOCAL_KEYS_MAX:
+                    self._blocked_until = {k: until for k, until in self._blocked_until.items() if until > now}
+                return retry_after
+            self._leases[key] = [granted - 1, window]
+            if len(self._leases) > LOCAL_KEYS_MAX:
+                self._leases = {k: v for k, v in self._leases.items() if v[1] == window}
+            return None
+
+    def _acquire(self, key, limit, period, want, now) -> int:
+        self.backend_calls += 1
+        try:
+            return self.backend.acquire(key, limit, period, want, now)
+        except Exception as e:
+            # Redis erişilemezse servis durmasın, process içi sayaçla devam et
+            self.backend_errors += 1
+            logger.warning(f"Rate limiter backend hatası, yerel sayaca geçiliyor: {e}")
+            return self._fallback.acquire(key, limit, period, want, now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "local_hits": self.local_hits,
+                "backend_calls": self.backend_calls,
+                "backend_errors": self.backend_errors,
+                "rejected": self.rejected,
+                "active_leases": len(self._leases),
+                "blocked_keys": len(self._blocked_until)
+            }
+
+
+def _build_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        client = get_redis()
+        if client is not None:
+            return RedisBackend(client)
+        logger.warning("RATE_LIMIT_BACKEND=redis ama Redis istemcisi yok, bellek içi limite geçiliyor.")
+    return MemoryBackend()
+
+
+limiter = RateLimiter(_build_backend())
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _raise_limited(retry_after: float):
+    raise HTTPException(
+        status_code=429,
+        detail="Çok fazla istek gönderdiniz, lütfen biraz bekleyin.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def limit_by_ip(rate: str, scope: str = None):
+    """IP bazlı limit dependency'si. Örn: Depends(rate_limiter.limit_by_ip("5/minute"))"""
+    count, period = parse_rate(rate)
+
+    def dependency(request: Request):
+        name = scope or request.url.path
+        retry_after = limiter.hit(f"ip:{_client_ip(request)}:{name}", count, period)
+        if retry_after is not None:
+            _raise_limited(retry_after)
+
+    return dependency
+
+
+def limit_by_user(rate: str, scope: str = None):
+    """Kullanıcı ID bazlı limit dependency'si (Kimliği doğrulanmış endpointler için)."""
+    count, period = parse_rate(rate)
+
+    def dependency(request: Request, current_user: models.User = Depends(security.get_current_user)):
+        name = scope or request.url.path
+        retry_after = limiter.hit(f"user:{current_user.id}:{name}", count, period)
+        if retry_after is not None:
+            _raise_limited(retry_after)
+
+    return dependency
+
+
+def get_stats() -> dict:
+    return limiter.stats()
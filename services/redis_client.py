@@ -22,3 +22,23 @@ except Exception as e:
 
 def get_redis():
     return redis_client
+
+# Async istemci (pub/sub gibi event loop içinde bekleyen işlemler için), ilk kullanımda oluşturulur
+_async_redis_client = None
+
+def get_async_redis():
+    global _async_redis_client
+    if _async_redis_client is None:
+        try:
+            import redis.asyncio
+            _async_redis_client = redis.asyncio.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                password=REDIS_PASSWORD,
+                decode_responses=True,
+                db=0
+            )
+        except Exception as e:
+            print(f"Async Redis Connection Error: {e}")
+            return None
+    return _async_redis_client
@@ -0,0 +1,215 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from services.redis_client import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Liste endpointleri (/events, /venues, /clubs/, /marketplace/items) için yanıt önbelleği + ETag.
+# Anahtar: (isim alanı, sürüm, normalize edilmiş query parametreleri).
+# Yazma işlemleri isim alanının sürümünü artırır; eski sürümlü kayıtlar bir daha okunmaz ve LRU ile düşer.
+# "redis": Sürüm sayaçları tüm worker'larda ortaktır (bir worker'daki yazma hepsini geçersiz kılar)
+# "memory": Her process kendi sayacını tutar (lokal geliştirme / tek worker)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+# Sürüm değişmese de kayıtların ömrü (örn. /events'te tarihi geçen etkinlikler listeden düşsün). 0 = kapalı
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+RESPONSE_CACHE_PREFIX = "artibir:rc"
+
+EVENTS = "events"
+VENUES = "venues"
+CLUBS = "clubs"
+MARKETPLACE = "marketplace"
+
+
+class MemoryVersions:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+
+class RedisVersions:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, namespace: str) -> int:
+        return int(self.client.get(f"{RESPONSE_CACHE_PREFIX}:ver:{namespace}") or 0)
+
+    def bump(self, namespace: str) -> int:
+        return int(self.client.incr(f"{RESPONSE_CACHE_PREFIX}:ver:{namespace}"))
+
+
+class ResponseCache:
+    def __init__(self, versions, max_size: int, ttl: float):
+        self.versions = versions
+        self._fallback = MemoryVersions()
+        self.max_size = max_size
+        self.ttl = ttl
+        # anahtar -> (etag, gövde, ek header'lar, oluşturulma zamanı)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bumps = 0
+        self.backend_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def version(self, namespace: str):
+        try:
+            return self.versions.get(namespace)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning(f"Yanıt önbelleği sürüm okunamadı, yerel sayaca geçiliyor: {e}")
+            # Redis sürümleriyle çakışmasın diye yerel sürüm ayrı işaretlenir
+            return ("local", self._fallback.get(namespace))
+
+    def bump(self, namespace: str):
+        """İsim alanındaki tüm önbelleğe alınmış yanıtları geçersiz kılar (yazma işlemlerinden sonra)."""
+        self.bumps += 1
+        self._fallback.bump(namespace)
+        try:
+            self.versions.bump(namespace)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning(f"Yanıt önbelleği sürümü artırılamadı: {e}")
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl > 0 and time.monotonic() - entry[3] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "backend": type(self.versions).__name__,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "not_modified": self.not_modified,
+                "bumps": self.bumps,
+                "backend_errors": self.backend_errors
+            }
+
+
+def _build_versions():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        client = get_redis()
+        if client is not None:
+            return RedisVersions(client)
+        logger.warning("RESPONSE_CACHE_BACKEND=redis ama Redis istemcisi yok, bellek içi sayaca geçiliyor.")
+    return MemoryVersions()
+
+
+cache = ResponseCache(_build_versions(), RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+_adapters = {}
+
+
+def _adapter(response_type) -> TypeAdapter:
+    adapter = _adapters.get(response_type)
+    if adapter is None:
+        adapter = _adapters[response_type] = TypeAdapter(response_type)
+    return adapter
+
+
+def _serialize(response_type, items) -> bytes:
+    # response_model ile aynı doğrulama: ORM nesneleri şemaya dönüştürülüp tek seferde JSON'a yazılır
+    adapter = _adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def _normalized_params(request: Request) -> tuple:
+    # Parametre sırası ve boş değerler aynı yanıtı farklı anahtarlara bölmesin
+    return tuple(sorted((key, value) for key, value in request.query_params.multi_items() if value != ""))
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+def _build_response(request: Request, etag: str, body: bytes, headers: dict) -> Response:
+    response_headers = dict(headers)
+    response_headers["ETag"] = etag
+    # İstemci her seferinde doğrulasın (304 ucuz), eski listeyi sormadan göstermesin
+    response_headers["Cache-Control"] = "no-cache"
+    if _etag_matches(request, etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
+
+
+def cached_response(request: Request, namespace: str, response_type, producer) -> Response:
+    """
+    Endpoint gövdesini önbellekten (veya producer ile üretip) JSON olarak döner.
+    producer(headers) ORM nesnelerini döner; yanıta eklenecek header'ları verilen sözlüğe yazabilir.
+    If-None-Match eşleşirse sorgu ve serileştirme yapılmadan 304 döner.
+    """
+    if not cache.enabled:
+        headers = {}
+        body = _serialize(response_type, producer(headers))
+        return _build_response(request, f'"{hashlib.sha256(body).hexdigest()[:32]}"', body, headers)
+
+    key = (namespace, cache.version(namespace), request.url.path, _normalized_params(request))
+    entry = cache.get(key)
+    if entry is not None:
+        cache.hits += 1
+        etag, body, headers, _ = entry
+        return _build_response(request, etag, body, headers)
+
+    cache.misses += 1
+    headers = {}
+    body = _serialize(response_type, producer(headers))
+    # Güçlü ETag: gövdenin özeti, aynı içerik her worker'da aynı etiketi üretir
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    cache.put(key, (etag, body, headers, time.monotonic()))
+    return _build_response(request, etag, body, headers)
+
+
+def bump(namespace: str):
+    cache.bump(namespace)
+
+
+def get_stats() -> dict:
+    return cache.stats()
@@ -1,35 +1,372 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import json
+import time
 import random
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from urllib.parse import quote
+
+import httpx
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
 import schemas
+from utils import turkish
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Harici kaynaklardan etkinlik toplama hattı (/events/fetch-external).
+# Şehir x kaynak çiftleri tek bir havuzlu httpx.AsyncClient ile eşzamanlı çekilir (SCRAPER_CONCURRENCY sınırlı).
+# Yanıtlar diskte önbelleğe alınır ve sonraki çekimlerde koşullu GET (ETag / Last-Modified) yapılır;
+# 304 dönen veya gövde özeti değişmeyen sayfalar tekrar ayrıştırılmaz.
+# Her etkinliğin başlık + tarih + şehirden türetilen parmak izi (source_hash) veritabanında saklanır,
+# aynı etkinlik tekrar çekildiğinde (başka kaynaktan bile) ikinci kez oluşturulmaz.
+# SCRAPER_SOURCES: virgülle ayrılmış URL şablonları, {city} yerine şehir adı gelir. Sayfalar
+# schema.org Event JSON-LD içeren HTML veya etkinlik listesi dönen JSON olabilir.
+# Kaynak tanımlı değilse demo amaçlı simülasyon verisi üretilir.
+SCRAPER_SOURCES = [source.strip() for source in os.getenv("SCRAPER_SOURCES", "").split(",") if source.strip()]
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 8))
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", 20))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", 10))
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", "cache/scraper")
+SCRAPER_USER_AGENT = os.getenv("SCRAPER_USER_AGENT", "ArtiBirBot/1.0 (+https://artibir.app)")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def event_fingerprint(event: schemas.EventCreate) -> str:
+    """Aynı etkinliği farklı kaynak/URL'lerde de tanıyan parmak izi (dakika hassasiyetinde tarih)."""
+    key = "|".join([
+        turkish.normalize(event.title),
+        event.date.strftime("%Y-%m-%dT%H:%M"),
+        turkish.normalize(event.city or "")
+    ])
+    return _sha256(key.encode("utf-8"))
+
+
+class DiskCache:
+    """URL başına meta (etag, last_modified, gövde özeti) + gövde dosyası. Yazmalar atomiktir."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.directory, _sha256(url.encode("utf-8"))[:40] + suffix)
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def load(self, url: str):
+        try:
+            with open(self._path(url, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_body(self, url: str):
+        try:
+            with open(self._path(url, ".body"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url: str, meta: dict, body: bytes = None):
+        if body is not None:
+            self._write(self._path(url, ".body"), body)
+        self._write(self._path(url, ".json"), json.dumps(meta).encode("utf-8"))
+
+
+@dataclass
+class Page:
+    url: str
+    city: str
+    # fresh: yeni/değişmiş içerik, not_modified: 304, unchanged: 200 ama aynı özet, error: alınamadı
+    status: str
+    content_hash: str = None
+    events: list = field(default_factory=list)
+
+
+@dataclass
+class ScrapeResult:
+    # (EventCreate, source_hash) çiftleri; parti içi tekrarlar elenmiş
+    events: list = field(default_factory=list)
+    pages: list = field(default_factory=list)
+    duplicates: int = 0
+
+    def summary(self) -> dict:
+        statuses = {}
+        for page in self.pages:
+            statuses[page.status] = statuses.get(page.status, 0) + 1
+        return {"pages": statuses, "events": len(self.events), "duplicates_in_batch": self.duplicates}
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _is_event_type(item: dict) -> bool:
+    # MusicEvent, TheaterEvent, SportsEvent ... hepsi Event alt türü
+    return any(str(kind).endswith("Event") for kind in _as_list(item.get("@type")))
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Modeldeki tarih kolonları naive UTC tutulur
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _to_event(item: dict, city: str, source_url: str):
+    """schema.org Event (veya aynı alan adlarını kullanan JSON) sözlüğünü EventCreate'e çevirir."""
+    title = item.get("name") or item.get("title")
+    date = _parse_datetime(item.get("startDate") or item.get("date"))
+    if not title or date is None:
+        return None
+
+    location = (_as_list(item.get("location")) or [{}])[0]
+    if not isinstance(location, dict):
+        location = {"name": str(location)}
+    geo = location.get("geo") or {}
+    address = location.get("address") or {}
+    latitude = geo.get("latitude", item.get("latitude"))
+    longitude = geo.get("longitude", item.get("longitude"))
+    offers = (_as_list(item.get("offers")) or [{}])[0]
+    image = (_as_list(item.get("image")) or [None])[0]
+    if isinstance(image, dict):
+        image = image.get("url")
+
+    try:
+        return schemas.EventCreate(
+            title=str(title)[:200],
+            description=str(item.get("description") or title),
+            date=date,
+            latitude=float(latitude) if latitude is not None else None,
+            longitude=float(longitude) if longitude is not None else None,
+            min_age_limit=18,
+            max_age_limit=99,
+            target_gender=schemas.TargetGender.HERKES,
+            category=item.get("category"),
+            status=schemas.EventStatus.AKTIF,
+            city=(address.get("addressLocality") if isinstance(address, dict) else None) or city,
+            location_name=location.get("name"),
+            image_url=image,
+            price=float(offers.get("price") or 0) if isinstance(offers, dict) else 0.0,
+            external_url=item.get("url") or source_url
+        )
+    except (TypeError, ValueError) as e:
+        logger.debug(f"Geçersiz etkinlik atlandı ({source_url}): {e}")
+        return None
+
+
+def parse_events(body: bytes, content_type: str, city: str, source_url: str) -> list:
+    """JSON listesi / {"events": [...]} veya JSON-LD içeren HTML sayfasından etkinlikleri çıkarır."""
+    items = []
+    if "json" in (content_type or "") or body.lstrip()[:1] in (b"[", b"{"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return []
+        items = data.get("events", []) if isinstance(data, dict) else data
+    else:
+        soup = BeautifulSoup(body, "lxml")
+        for script in soup.find_all("script", type="application/ld+json"):
+            try:
+                data = json.loads(script.string or "")
+            except ValueError:
+                continue
+            for node in _as_list(data):
+                if isinstance(node, dict):
+                    items.extend(_as_list(node.get("@graph")) or [node])
+        items = [item for item in items if isinstance(item, dict) and _is_event_type(item)]
+
+    events = []
+    for item in items:
+        if isinstance(item, dict):
+            event = _to_event(item, city, source_url)
+            if event is not None:
+                events.append(event)
+    return events
+
 
 class ScraperService:
+    def __init__(
+        self,
+        sources: list = None,
+        cache_dir: str = SCRAPER_CACHE_DIR,
+        concurrency: int = SCRAPER_CONCURRENCY,
+        max_connections: int = SCRAPER_MAX_CONNECTIONS,
+        timeout: float = SCRAPER_TIMEOUT
+    ):
+        self.sources = SCRAPER_SOURCES if sources is None else sources
+        self.cache = DiskCache(cache_dir)
+        self.concurrency = concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.errors = 0
+        self.bytes_downloaded = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Tüm çekimler aynı bağlantı havuzunu paylaşır (keep-alive, HTTP bağlantı yeniden kullanımı)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": SCRAPER_USER_AGENT},
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch(self, semaphore: asyncio.Semaphore, url: str, city: str, force: bool) -> Page:
+        meta = await asyncio.to_thread(self.cache.load, url) or {}
+        headers = {}
+        if not force:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            async with semaphore:
+                self.requests += 1
+                response = await self._get_client().get(url, headers=headers)
+        except httpx.HTTPError as e:
+            self.errors += 1
+            logger.warning(f"Kaynak alınamadı ({url}): {e}")
+            return Page(url, city, "error")
+
+        if response.status_code == 304:
+            self.not_modified += 1
+            content_hash = meta.get("content_hash")
+            if content_hash == meta.get("processed_hash"):
+                return Page(url, city, "not_modified", content_hash)
+            # Önceki çekimin etkinlikleri kaydedilemediyse diskteki gövde yeniden ayrıştırılır
+            body = await asyncio.to_thread(self.cache.load_body, url)
+            if body is None:
+                return Page(url, city, "not_modified", content_hash)
+            events = await asyncio.to_thread(parse_events, body, meta.get("content_type"), city, url)
+            return Page(url, city, "fresh", content_hash, events)
+        if response.status_code != 200:
+            self.errors += 1
+            logger.warning(f"Kaynak {response.status_code} döndü: {url}")
+            return Page(url, city, "error")
+
+        body = response.content
+        self.bytes_downloaded += len(body)
+        content_hash = _sha256(body)
+        unchanged = content_hash == meta.get("processed_hash") and not force
+        new_meta = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "content_type": response.headers.get("content-type"),
+            "content_hash": content_hash,
+            "processed_hash": meta.get("processed_hash"),
+            "fetched_at": formatdate(time.time(), usegmt=True)
+        }
+        await asyncio.to_thread(self.cache.store, url, new_meta, None if unchanged else body)
+        if unchanged:
+            # Sunucu koşullu GET desteklemese de aynı içerik tekrar işlenmez
+            self.unchanged += 1
+            return Page(url, city, "unchanged", content_hash)
+
+        events = await asyncio.to_thread(parse_events, body, response.headers.get("content-type"), city, url)
+        return Page(url, city, "fresh", content_hash, events)
+
+    async def scrape(self, locations: list, force: bool = False) -> ScrapeResult:
+        """
+        Tüm şehir x kaynak çiftlerini eşzamanlı çeker, etkinlikleri parmak izleriyle döner.
+        force=True önbelleği yok sayar (koşullu header gönderilmez, değişmemiş sayfalar da ayrıştırılır).
+        """
+        result = ScrapeResult()
+        if not self.sources:
+            for location in locations:
+                for event in self._simulate(location):
+                    result.events.append((event, event_fingerprint(event)))
+            return result
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        jobs = [
+            self._fetch(semaphore, source.format(city=quote(location)), location, force)
+            for location in locations
+            for source in self.sources
+        ]
+        result.pages = list(await asyncio.gather(*jobs))
+
+        seen = set()
+        for page in result.pages:
+            for event in page.events:
+                fingerprint = event_fingerprint(event)
+                if fingerprint in seen:
+                    result.duplicates += 1
+                    continue
+                seen.add(fingerprint)
+                result.events.append((event, fingerprint))
+        return result
+
+    def mark_processed(self, pages: list):
+        """Etkinlikleri veritabanına yazılan sayfaların özeti kaydedilir; içerik değişmedikçe tekrar ayrıştırılmaz."""
+        for page in pages:
+            if page.status != "fresh":
+                continue
+            meta = self.cache.load(page.url)
+            if meta is not None and meta.get("content_hash") == page.content_hash:
+                meta["processed_hash"] = page.content_hash
+                self.cache.store(page.url, meta)
+
+    async def scrape_events_by_location(self, location: str) -> list:
+        """Tek şehir için kısayol: sadece EventCreate listesini döner."""
+        result = await self.scrape([location])
+        return [event for event, _ in result.events]
+
+    def stats(self) -> dict:
+        return {
+            "sources": len(self.sources),
+            "simulation": not self.sources,
+            "concurrency": self.concurrency,
+            "max_connections": self.max_connections,
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "bytes_downloaded": self.bytes_downloaded
+        }
+
     @staticmethod
-    def scrape_events_by_location(location: str):
+    def _simulate(location: str) -> list:
         """
-        Verilen konuma göre internetten etkinlikleri tarar.
-        Gerçek dünya senaryosunda bu metod Biletix, Passo vb. sitelere istek atar.
-        Örnek olarak burada bir requests + bs4 yapısı kurulmuştur ancak 
-        her sitenin yapısı farklı olduğu için demo amaçlı 'Akıllı Simülasyon' modundadır.
+        Kaynak tanımlı değilken (lokal geliştirme) demo amaçlı 'Akıllı Simülasyon' verisi üretir.
         """
-        print(f"[{location}] için etkinlikler taranıyor...")
-        
-        # Gerçek bir HTTP isteği örneği (Bir siteye gidip title çekmek gibi)
-        # try:
-        #     url = f"https://www.google.com/search?q={location}+etkinlikleri"
-        #     headers = {'User-Agent': 'Mozilla/5.0 ...'}
-        #     response = requests.get(url, headers=headers)
-        #     soup = BeautifulSoup(response.content, 'lxml')
-        #     # print(soup.title.string) 
-        # except Exception as e:
-        #     print(f"Scraping hatası: {e}")
-
-        # Simüle Edilmiş "Scraped" Veriler
-        # Bu kısım botun bulduğu verileri temsil eder.
-        
         found_events = []
-        
+
         titles = [
             f"{location} Yaz Festivali",
             f"{location} Teknoloji Zirvesi",
@@ -37,24 +374,24 @@ class ScraperService:
             f"{location} Tiyatro Günleri",
             f"{location} Kahve Festivali"
         ]
-        
+
         categories = ["Festival", "Konferans", "Konser", "Tiyatro", "Yeme-İçme"]
-        
+
         for i in range(random.randint(3, 6)):
             title = titles[i] if i < len(titles) else f"{location} Etkinliği #{i+1}"
             category = categories[i] if i < len(categories) else "Diğer"
-            
+
             # Rastgele koordinat sapması (Şehir merkezinden biraz dağıtıyoruz)
             # Varsayılan (İstanbul): 41.0, 29.0
             lat_base = 41.0082
             lon_base = 28.9784
-            
+
             if "ankara" in location.lower():
                 lat_base, lon_base = 39.9334, 32.8597
             elif "izmir" in location.lower():
                  lat_base, lon_base = 38.4192, 27.1287
             # ... diğer şehirler eklenebilir
-            
+
             event = schemas.EventCreate(
                 title=title,
                 description=f"{location} şehrinde düzenlenen harika bir {category.lower()} etkinliği. İnternetten otomatik çekildi.",
@@ -71,5 +408,12 @@ class ScraperService:
                 external_url="https://google.com/search?q=" + title.replace(" ", "+")
             )
             found_events.append(event)
-            
+
         return found_events
+
+
+scraper = ScraperService()
+
+
+def get_stats() -> dict:
+    return scraper.stats()
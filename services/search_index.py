@@ -0,0 +1,310 @@
+import logging
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+import models
+from utils import turkish
+
+logger = logging.getLogger(__name__)
+
+# Global arama için tam metin indeksi (kullanıcılar, etkinlikler, kulüpler).
+# Tüm varlıklar tek bir search_documents tablosunda, Türkçe normalize edilmiş metinle tutulur:
+#   SQLite    : FTS5 sanal tablosu (external content) + tetikleyiciler, bm25 sıralaması
+#   PostgreSQL: tsvector GENERATED kolonu + GIN indeksi, ts_rank sıralaması
+# Normalizasyon (İ/ı, aksan katlama) uygulamada yapıldığı için veritabanı tarafında dil
+# sözlüğü yerine 'simple' yapılandırması / unicode61 tokenizer kullanılır.
+# ORM üzerinden yapılan ekleme/güncelleme/silmeler after_flush ile aynı transaction'da indekse yansır;
+# Core ile toplu eklemelerde (crud.create_events) index_documents açıkça çağrılır.
+
+# Başlık eşleşmeleri açıklama eşleşmelerinden bu kat daha değerlidir
+TITLE_WEIGHT = 10.0
+MAX_QUERY_TOKENS = 8
+
+USER = "user"
+EVENT = "event"
+CLUB = "club"
+
+_SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS search_documents (
+        id INTEGER PRIMARY KEY,
+        entity_type VARCHAR(20) NOT NULL,
+        entity_id VARCHAR(64) NOT NULL,
+        title TEXT,
+        title_norm TEXT,
+        body_norm TEXT,
+        UNIQUE (entity_type, entity_id)
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title_norm, body_norm,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_fts(rowid, title_norm, body_norm) VALUES (new.id, new.title_norm, new.body_norm);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title_norm, body_norm) VALUES ('delete', old.id, old.title_norm, old.body_norm);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title_norm, body_norm) VALUES ('delete', old.id, old.title_norm, old.body_norm);
+        INSERT INTO search_fts(rowid, title_norm, body_norm) VALUES (new.id, new.title_norm, new.body_norm);
+    END""",
+]
+
+_POSTGRES_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS search_documents (
+        id BIGSERIAL PRIMARY KEY,
+        entity_type VARCHAR(20) NOT NULL,
+        entity_id VARCHAR(64) NOT NULL,
+        title TEXT,
+        title_norm TEXT,
+        body_norm TEXT,
+        tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title_norm, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(body_norm, '')), 'B')
+        ) STORED,
+        UNIQUE (entity_type, entity_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)",
+]
+
+_UPSERT = text(
+    "INSERT INTO search_documents (entity_type, entity_id, title, title_norm, body_norm) "
+    "VALUES (:entity_type, :entity_id, :title, :title_norm, :body_norm) "
+    "ON CONFLICT (entity_type, entity_id) DO UPDATE SET "
+    "title = excluded.title, title_norm = excluded.title_norm, body_norm = excluded.body_norm"
+)
+_DELETE = text("DELETE FROM search_documents WHERE entity_type = :entity_type AND entity_id = :entity_id")
+
+# bm25() pencere fonksiyonu içinde kullanılamadığı için FTS5'in rank kolonu ağırlıklarla yapılandırılır
+_SQLITE_SEARCH = text(f"""
+    SELECT entity_type, entity_id, title, score FROM (
+        SELECT d.entity_type, d.entity_id, d.title, -search_fts.rank AS score,
+               row_number() OVER (PARTITION BY d.entity_type ORDER BY search_fts.rank) AS rn
+        FROM search_fts JOIN search_documents d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH :query AND search_fts.rank MATCH 'bm25({TITLE_WEIGHT}, 1.0)'
+    ) ranked
+    WHERE rn <= :limit
+    ORDER BY score DESC
+""")
+
+_POSTGRES_SEARCH = text("""
+    SELECT entity_type, entity_id, title, score FROM (
+        SELECT entity_type, entity_id, title,
+               ts_rank(tsv, to_tsquery('simple', :query)) AS score,
+               row_number() OVER (PARTITION BY entity_type ORDER BY ts_rank(tsv, to_tsquery('simple', :query)) DESC) AS rn
+        FROM search_documents
+        WHERE tsv @@ to_tsquery('simple', :query)
+    ) ranked
+    WHERE rn <= :limit
+    ORDER BY score DESC
+""")
+
+# Değişince indeksin güncellenmesi gereken alanlar (cüzdan, güven puanı gibi sık değişen alanlar hariç)
+_INDEXED_FIELDS = {
+    models.User: ("full_name", "department"),
+    models.Event: ("title", "description", "city", "category", "location_name", "status"),
+    models.Club: ("name", "description"),
+}
+
+_ready = False
+# PostgreSQL'de şemayı aynı anda oluşturmaya çalışan worker'ları sıraya sokan advisory lock anahtarı
+_SCHEMA_LOCK_KEY = 7310452
+
+
+def _schema_exists(connection, dialect: str) -> bool:
+    tables = ("search_documents", "search_fts") if dialect == "sqlite" else ("search_documents",)
+    inspector = inspect(connection)
+    return all(inspector.has_table(table) for table in tables)
+
+
+def _create_schema(connection, dialect: str) -> bool:
+    # Kilidi bekleyen worker tabloyu diğerinin oluşturduğunu görür ve rebuild yapmaz
+    if _schema_exists(connection, dialect):
+        return False
+    for statement in (_SQLITE_SCHEMA if dialect == "sqlite" else _POSTGRES_SCHEMA):
+        connection.execute(text(statement))
+    return True
+
+
+def ensure_schema(engine) -> bool:
+    """
+    Arama tablolarını oluşturur (yoksa). Tablo yeni oluşturulduysa True döner (rebuild gerekir).
+    Tablolar zaten varsa sadece varlık kontrolü yapılır (her worker açılışı). Oluşturma PostgreSQL'de
+    advisory lock altında yapılır: aynı anda açılan worker'lar sırayla girer, yalnızca ilki oluşturur.
+    Oluşturma hata verse de tablolar (başka bir süreç tarafından) oluşturulduysa indeks kullanılır;
+    FTS5 desteklenmiyorsa / tablo yoksa global arama eski ILIKE sorgularına düşer.
+    """
+    global _ready
+    dialect = engine.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return False
+    try:
+        with engine.connect() as connection:
+            if _schema_exists(connection, dialect):
+                _ready = True
+                return False
+        if dialect == "postgresql":
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SCHEMA_LOCK_KEY})
+                created = _create_schema(connection, dialect)
+        else:
+            # pysqlite DDL'den önce transaction açmaz: yazma kilidi BEGIN IMMEDIATE ile açıkça alınır
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+                try:
+                    created = _create_schema(connection, dialect)
+                except Exception:
+                    connection.exec_driver_sql("ROLLBACK")
+                    raise
+                connection.exec_driver_sql("COMMIT")
+        _ready = True
+        return created
+    except Exception as e:
+        try:
+            with engine.connect() as connection:
+                _ready = _schema_exists(connection, dialect)
+        except Exception:
+            _ready = False
+        if not _ready:
+            logger.warning(f"Tam metin arama indeksi oluşturulamadı, ILIKE aramasına düşülecek: {e}")
+        return False
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def user_document(user) -> dict:
+    return {
+        "entity_type": USER,
+        "entity_id": str(user.id),
+        "title": user.full_name,
+        "title_norm": turkish.normalize(user.full_name),
+        "body_norm": turkish.normalize(user.department)
+    }
+
+
+def event_document(event) -> dict:
+    """ORM nesnesi veya kolon sözlüğü (toplu ekleme) kabul eder."""
+    get = event.get if isinstance(event, dict) else lambda key: getattr(event, key, None)
+    return {
+        "entity_type": EVENT,
+        "entity_id": str(get("id")),
+        "title": get("title"),
+        "title_norm": turkish.normalize(get("title")),
+        "body_norm": turkish.normalize(get("description"), get("city"), get("category"), get("location_name"))
+    }
+
+
+def club_document(club) -> dict:
+    return {
+        "entity_type": CLUB,
+        "entity_id": str(club.id),
+        "title": club.name,
+        "title_norm": turkish.normalize(club.name),
+        "body_norm": turkish.normalize(club.description)
+    }
+
+
+def _document(obj):
+    if isinstance(obj, models.User):
+        return user_document(obj)
+    if isinstance(obj, models.Event):
+        return event_document(obj)
+    return club_document(obj)
+
+
+def _is_searchable(obj) -> bool:
+    # İptal edilen etkinlikler aramada çıkmaz
+    return not (isinstance(obj, models.Event) and obj.status == models.EventStatus.IPTAL)
+
+
+def index_documents(connection, documents: list):
+    if _ready and documents:
+        connection.execute(_UPSERT, documents)
+
+
+def remove_documents(connection, keys: list):
+    if _ready and keys:
+        connection.execute(_DELETE, [{"entity_type": entity_type, "entity_id": entity_id} for entity_type, entity_id in keys])
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_index(session, flush_context):
+    if not _ready:
+        return
+    upserts = []
+    removals = []
+    for obj in session.new:
+        if type(obj) in _INDEXED_FIELDS and _is_searchable(obj):
+            upserts.append(_document(obj))
+    for obj in session.dirty:
+        fields = _INDEXED_FIELDS.get(type(obj))
+        if fields is None:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in fields):
+            continue
+        if _is_searchable(obj):
+            upserts.append(_document(obj))
+        else:
+            removals.append((EVENT, str(obj.id)))
+    for obj in session.deleted:
+        if type(obj) in _INDEXED_FIELDS:
+            removals.append((_document(obj)["entity_type"], str(obj.id)))
+
+    if not upserts and not removals:
+        return
+    # Aynı transaction: kayıt geri alınırsa indeks değişikliği de geri alınır
+    connection = session.connection()
+    index_documents(connection, upserts)
+    remove_documents(connection, removals)
+
+
+def _match_query(tokens: list, dialect: str) -> str:
+    # Her kelime önek olarak aranır ve hepsi eşleşmelidir (AND). Tokenlar sadece \w karakterlerinden oluşur.
+    if dialect == "sqlite":
+        return " ".join(f'"{token}"*' for token in tokens)
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def search(db: Session, q: str, limit_per_type: int = 10) -> dict:
+    """Sorguyu normalize edip her varlık türü için en alakalı limit_per_type sonucu döner."""
+    tokens = turkish.tokenize(q)[:MAX_QUERY_TOKENS]
+    results = {USER: [], EVENT: [], CLUB: []}
+    if not tokens:
+        return results
+    dialect = db.get_bind().dialect.name
+    statement = _SQLITE_SEARCH if dialect == "sqlite" else _POSTGRES_SEARCH
+    rows = db.execute(statement, {"query": _match_query(tokens, dialect), "limit": limit_per_type}).fetchall()
+    for entity_type, entity_id, title, score in rows:
+        results.setdefault(entity_type, []).append({"id": entity_id, "title": title, "score": round(float(score), 4)})
+    return results
+
+
+def rebuild(engine, batch_size: int = 1000):
+    """İndeksi tüm kullanıcı/etkinlik/kulüp kayıtlarından yeniden oluşturur (sync_db ve ilk kurulum)."""
+    if not _ready:
+        return
+    with Session(bind=engine) as db:
+        connection = db.connection()
+        connection.execute(text("DELETE FROM search_documents"))
+        sources = [
+            (db.query(models.User), user_document),
+            (db.query(models.Event).filter(models.Event.status != models.EventStatus.IPTAL), event_document),
+            (db.query(models.Club), club_document),
+        ]
+        total = 0
+        for query, build in sources:
+            batch = []
+            for obj in query.yield_per(batch_size):
+                batch.append(build(obj))
+                if len(batch) >= batch_size:
+                    index_documents(connection, batch)
+                    total += len(batch)
+                    batch = []
+            index_documents(connection, batch)
+            total += len(batch)
+        db.commit()
+    logger.info(f"Arama indeksi yeniden oluşturuldu: {total} kayıt")
@@ -0,0 +1,349 @@
+import os
+import sys
+import time
+import heapq
+import asyncio
+import logging
+import datetime
+import threading
+from bisect import bisect_left
+from dotenv import load_dotenv
+from sqlalchemy import func
+
+import database, models
+from utils import turkish
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Arama çubuğu için (/search/suggest) worker başına bellek içi önek indeksi.
+# Kullanıcı adları, etkinlik ve kulüp başlıkları Türkçe normalize edilip (utils/turkish) sıralı bir
+# anahtar dizisinde tutulur; önek aralığı bisect ile bulunur ve popülerliğe göre ilk k sonuç döner.
+# Her kelime başı ayrı anahtardır: "kulu" yazan "Kadıköy Kitap Kulübü"nü de bulur.
+# Geniş aralıklar (tek harfli önekler gibi) için ilk k sonucu önbelleğe alınır; bir kayıt
+# değişince sadece onun öneklerinin önbelleği silinir.
+# Bu worker'daki kayıtlar anında eklenir, diğer worker'lardaki değişiklikler SUGGEST_REFRESH_SECONDS'ta bir
+# veritabanıyla karşılaştırılıp sadece farklar uygulanarak gelir (popülerlik değişimleri dahil).
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", 60))
+# İndeksin kullanabileceği yaklaşık bellek; aşılırsa en az popüler kayıtlar indekse alınmaz
+SUGGEST_MEMORY_MB = float(os.getenv("SUGGEST_MEMORY_MB", 64))
+MAX_SUGGESTIONS = 20
+# Bir kayıt için en fazla bu kadar kelime başı anahtar üretilir, anahtarlar bu uzunlukta kesilir
+MAX_KEYS_PER_ENTRY = 4
+MAX_KEY_LENGTH = 48
+# Bu sayıdan fazla anahtar eşleşen önekler için sonuç önbelleğe alınır
+SCAN_LIMIT = 256
+STALE_AFTER_PERIODS = 3
+PAST_GRACE = datetime.timedelta(hours=24)
+
+USER = "user"
+EVENT = "event"
+CLUB = "club"
+KINDS = (USER, EVENT, CLUB)
+
+# Liste elemanı başına işaretçi + kayıt nesnesi sabit maliyeti (yaklaşık)
+_SLOT_BYTES = 16
+_ENTRY_OVERHEAD = 200
+
+
+class _Entry:
+    __slots__ = ("kind", "id", "title", "popularity", "keys", "size", "generation")
+
+    def __init__(self, kind: str, entry_id: str, title: str, popularity: int, generation: int):
+        self.kind = kind
+        self.id = entry_id
+        self.title = title
+        self.popularity = popularity
+        self.generation = generation
+        self.keys = _keys(title)
+        self.size = (
+            _ENTRY_OVERHEAD + sys.getsizeof(title) + sys.getsizeof(entry_id)
+            + sum(sys.getsizeof(key) + 2 * _SLOT_BYTES for key in self.keys)
+        )
+
+    def to_dict(self) -> dict:
+        return {"type": self.kind, "id": self.id, "title": self.title, "score": self.popularity}
+
+
+def _keys(title: str) -> tuple:
+    tokens = turkish.tokenize(title)
+    keys = []
+    for position in range(min(len(tokens), MAX_KEYS_PER_ENTRY)):
+        key = " ".join(tokens[position:])[:MAX_KEY_LENGTH]
+        if key not in keys:
+            keys.append(key)
+    return tuple(keys)
+
+
+def _rank(entry: _Entry):
+    # Eşit popülerlikte kısa başlık (daha tam eşleşme) önce gelir
+    return (entry.popularity, -len(entry.title))
+
+
+class SuggestIndex:
+    def __init__(self, enabled: bool, refresh_seconds: float, memory_budget_bytes: int):
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        # Paralel diziler: sıralı anahtarlar ve her anahtarın sahibi olan kayıt
+        self._keys = []
+        self._owners = []
+        self._entries = {}
+        # (önek, tür) -> popülerliğe göre sıralı ilk MAX_SUGGESTIONS kayıt
+        self._top_cache = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.hits = 0
+        self.misses = 0
+        self.cache_hits = 0
+        self.refreshes = 0
+        self.last_refresh_changes = 0
+        self.last_refresh_ms = 0.0
+        self.over_budget = 0
+
+    def is_warm(self) -> bool:
+        if not self.enabled or self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.refresh_seconds * STALE_AFTER_PERIODS
+
+    # --- Değişiklikler (kilit altında çağrılır) ---
+
+    def _invalidate(self, entry: _Entry):
+        for key in entry.keys:
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                self._top_cache.pop((prefix, None), None)
+                self._top_cache.pop((prefix, entry.kind), None)
+
+    def _insert(self, entry: _Entry) -> bool:
+        if self._bytes + entry.size > self.memory_budget_bytes:
+            self.over_budget += 1
+            return False
+        for key in entry.keys:
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._owners.insert(position, entry)
+        self._entries[(entry.kind, entry.id)] = entry
+        self._bytes += entry.size
+        self._invalidate(entry)
+        return True
+
+    def _delete(self, identity: tuple):
+        entry = self._entries.pop(identity, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect_left(self._keys, key)
+            # Aynı anahtarı paylaşan kayıtlar arasında doğru sahibi bul
+            while self._owners[position] is not entry:
+                position += 1
+            del self._keys[position]
+            del self._owners[position]
+        self._bytes -= entry.size
+        self._invalidate(entry)
+
+    def _put(self, kind: str, entry_id: str, title: str, popularity: int, generation: int):
+        identity = (kind, entry_id)
+        current = self._entries.get(identity)
+        if current is not None:
+            if current.title == title and current.popularity == popularity:
+                current.generation = generation
+                return False
+            self._delete(identity)
+        if not title:
+            return True
+        return self._insert(_Entry(kind, entry_id, title, popularity or 0, generation))
+
+    # --- Dış API ---
+
+    def upsert(self, kind: str, entry_id, title: str, popularity: int = 0):
+        """Kayıt oluşturulduğunda/yeniden adlandırıldığında çağrılır (commit sonrası, bu worker)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._put(kind, str(entry_id), title, popularity, self._generation)
+
+    def remove(self, kind: str, entry_id):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._delete((kind, str(entry_id)))
+
+    def _snapshot(self) -> list:
+        """Veritabanından (tür, id, başlık, popülerlik) listesini popülerliğe göre azalan sırada döner."""
+        cutoff_date = datetime.datetime.utcnow() - PAST_GRACE
+        rows = []
+        db = database.ReadSessionLocal()
+        try:
+            # Popülerlik: kullanıcılar için ArtıBir puanı, etkinlikler için katılımcı, kulüpler için üye sayısı
+            for user_id, name, points in db.query(models.User.id, models.User.full_name, models.User.artibir_points).yield_per(5000):
+                rows.append((USER, str(user_id), name, points or 0))
+            events = db.query(models.Event.id, models.Event.title, models.Event.participant_count).filter(
+                models.Event.status != models.EventStatus.IPTAL,
+                models.Event.date >= cutoff_date
+            ).yield_per(5000)
+            for event_id, title, participants in events:
+                rows.append((EVENT, str(event_id), title, participants or 0))
+            clubs = db.query(models.Club.id, models.Club.name, func.count(models.ClubMember.user_id)).outerjoin(
+                models.ClubMember, models.ClubMember.club_id == models.Club.id
+            ).group_by(models.Club.id, models.Club.name)
+            for club_id, name, members in clubs:
+                rows.append((CLUB, str(club_id), name, members or 0))
+        finally:
+            db.close()
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def refresh(self):
+        """
+        Veritabanıyla karşılaştırıp sadece eklenen/değişen/silinen kayıtları uygular.
+        Yenileme sürerken bu worker'da eklenen kayıtlar (daha yeni nesil) silinmez.
+        """
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            start_generation = self._generation
+        rows = self._snapshot()
+
+        if self._loaded_at is None:
+            self._bulk_load(rows, start_generation, started)
+            return
+
+        changes = 0
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            seen = set()
+            budget = self.memory_budget_bytes
+            for kind, entry_id, title, popularity in rows:
+                identity = (kind, entry_id)
+                current = self._entries.get(identity)
+                if current is not None and current.generation > start_generation:
+                    seen.add(identity)
+                    continue
+                if current is None and self._bytes >= budget:
+                    # Bütçe doldu: kalan (daha az popüler) yeni kayıtlar alınmaz
+                    self.over_budget += 1
+                    continue
+                seen.add(identity)
+                if self._put(kind, entry_id, title, popularity, generation):
+                    changes += 1
+            for identity in [identity for identity, entry in self._entries.items()
+                             if identity not in seen and entry.generation <= start_generation]:
+                self._delete(identity)
+                changes += 1
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+            self.last_refresh_changes = changes
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    def _bulk_load(self, rows: list, start_generation: int, started: float):
+        """İlk yükleme: tek tek bisect.insort yerine anahtarlar bir kez sıralanır (O(n log n))."""
+        entries = {}
+        size = 0
+        for kind, entry_id, title, popularity in rows:
+            if not title:
+                continue
+            entry = _Entry(kind, entry_id, title, popularity, start_generation)
+            if size + entry.size > self.memory_budget_bytes:
+                self.over_budget += 1
+                continue
+            entries[(kind, entry_id)] = entry
+            size += entry.size
+        with self._lock:
+            # Yükleme sürerken bu worker'da eklenenler korunur
+            for identity, entry in self._entries.items():
+                if entry.generation > start_generation:
+                    previous = entries.pop(identity, None)
+                    size += entry.size - (previous.size if previous else 0)
+                    entries[identity] = entry
+            pairs = sorted(((key, entry) for entry in entries.values() for key in entry.keys), key=lambda pair: pair[0])
+            self._keys = [key for key, _ in pairs]
+            self._owners = [entry for _, entry in pairs]
+            self._entries = entries
+            self._bytes = size
+            self._top_cache = {}
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+            self.last_refresh_changes = len(entries)
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    def _top(self, prefix: str, kind) -> list:
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        if hi - lo > SCAN_LIMIT:
+            cached = self._top_cache.get((prefix, kind))
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        candidates = {id(owner): owner for owner in self._owners[lo:hi] if kind is None or owner.kind == kind}
+        top = heapq.nlargest(MAX_SUGGESTIONS, candidates.values(), key=_rank)
+        if hi - lo > SCAN_LIMIT:
+            self._top_cache[(prefix, kind)] = top
+        return top
+
+    def suggest(self, q: str, limit: int = 10, kind: str = None):
+        """
+        Normalize edilmiş öneke uyan kayıtları popülerliğe göre döner.
+        İndeks soğuksa None döner; çağıran tam metin aramasına düşmelidir.
+        """
+        if not self.is_warm():
+            self.misses += 1
+            return None
+        prefix = turkish.normalize(q)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        with self._lock:
+            top = self._top(prefix, kind)
+            results = [entry.to_dict() for entry in top[:min(limit, MAX_SUGGESTIONS)]]
+        self.hits += 1
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {kind: 0 for kind in KINDS}
+            for kind, _ in self._entries:
+                counts[kind] += 1
+            return {
+                "enabled": self.enabled,
+                "warm": self.is_warm(),
+                "entries": counts,
+                "keys": len(self._keys),
+                "cached_prefixes": len(self._top_cache),
+                "memory_bytes": self._bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "over_budget": self.over_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cache_hits": self.cache_hits,
+                "refreshes": self.refreshes,
+                "last_refresh_changes": self.last_refresh_changes,
+                "last_refresh_ms": round(self.last_refresh_ms, 2),
+                "seconds_since_refresh": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "refresh_seconds": self.refresh_seconds
+            }
+
+
+index = SuggestIndex(SUGGEST_ENABLED, SUGGEST_REFRESH_SECONDS, int(SUGGEST_MEMORY_MB * 1024 * 1024))
+
+
+async def run_refresh_loop():
+    """Startup'ta başlatılır: indeksi hemen yükler ve periyodik olarak farkları uygular."""
+    if not index.enabled:
+        return
+    while True:
+        try:
+            await asyncio.to_thread(index.refresh)
+        except Exception as e:
+            logger.warning(f"Öneri indeksi yenilenemedi: {e}")
+        await asyncio.sleep(index.refresh_seconds)
+
+
+def get_stats() -> dict:
+    return index.stats()
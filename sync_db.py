@@ -1,5 +1,6 @@
 import os
 import sys
+import datetime
 from sqlalchemy import create_engine, text, inspect
 from dotenv import load_dotenv
 
@@ -53,6 +54,138 @@ def sync_table(engine, connection, table_name, required_columns):
         trans.rollback()
         print(f"❌ '{table_name}' Genel Hata: {e}")
 
+def sync_indexes(engine, connection):
+    """
+    models.py'de tanımlı olup veritabanında bulunmayan indeksleri oluşturur.
+    create_all() mevcut tablolara yeni indeks eklemediği için eski veritabanlarında gereklidir.
+    """
+    # models import edilince DATABASE_URL ile aynı metadata yüklenir
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import models
+
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_indexes = {idx['name'] for idx in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            print(f"➕ '{table.name}' tablosuna indeks ekleniyor: {index.name} ({', '.join(c.name for c in index.columns)})")
+            # Her indeks kendi transaction'ında: biri hata verirse diğerleri etkilenmesin
+            trans = connection.begin()
+            try:
+                index.create(bind=connection, checkfirst=True)
+                trans.commit()
+            except Exception as e:
+                trans.rollback()
+                print(f"⚠️ Hata ({index.name}): {e}")
+    print("✅ İndeks senkronizasyonu tamamlandı.")
+
+def backfill_geo_cells(connection, batch_size=1000):
+    """
+    Konumu olan fakat geo_cell'i boş etkinliklerin ızgara hücresini hesaplar.
+    Hücre boyutu (GEO_CELL_DEG) değiştirildiyse önce geo_cell kolonu NULL'lanıp bu çalıştırılmalıdır.
+    """
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from utils import geo
+
+    trans = connection.begin()
+    try:
+        rows = connection.execute(text(
+            "SELECT id, latitude, longitude FROM events "
+            "WHERE geo_cell IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL"
+        )).fetchall()
+        if rows:
+            print(f"➕ {len(rows)} etkinlik için geo_cell hesaplanıyor...")
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            connection.execute(
+                text("UPDATE events SET geo_cell = :cell WHERE id = :id"),
+                [{"cell": geo.cell_id(lat, lon), "id": event_id} for event_id, lat, lon in batch]
+            )
+        trans.commit()
+        if rows:
+            print("✅ geo_cell doldurma tamamlandı.")
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ geo_cell doldurma hatası: {e}")
+
+def backfill_participant_counts(connection):
+    """participant_count kolonunu mevcut onaylı katılımcı sayılarıyla eşitler (tekrar çalıştırılabilir)."""
+    trans = connection.begin()
+    try:
+        connection.execute(text(
+            "UPDATE events SET participant_count = ("
+            "SELECT COUNT(*) FROM event_participants "
+            "WHERE event_participants.event_id = events.id AND event_participants.status = 'approved')"
+        ))
+        trans.commit()
+        print("✅ participant_count senkronizasyonu tamamlandı.")
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ participant_count senkronizasyon hatası: {e}")
+
+def backfill_conversations(connection, batch_size=5000):
+    """
+    Gelen kutusu özet tablosunu (conversations) yoksa oluşturur ve mevcut mesajlardan doldurur.
+    Mesajlar id sırasıyla parça parça okunur; bellekte sohbet başına tek özet tutulur.
+    Tekrar çalıştırılabilir: özeti zaten olan sohbetlere dokunulmaz (ON CONFLICT DO NOTHING),
+    yalnızca eksik sohbetler eklenir.
+    """
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import models
+    from sqlalchemy import select, func
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    message = models.Message
+    conversation_table = models.Conversation.__table__
+    trans = connection.begin()
+    try:
+        conversation_table.create(bind=connection, checkfirst=True)
+        summaries = {}
+        # Sohbet başına son mesajın (zaman, id) anahtarı
+        latest = {}
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(message.id, message.sender_id, message.receiver_id, message.content, message.timestamp, message.is_read)
+                .where(message.id > last_id).order_by(message.id).limit(batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for message_id, sender_id, receiver_id, content, timestamp, is_read in rows:
+                if sender_id is None or receiver_id is None:
+                    continue
+                user_a_id, user_b_id = (sender_id, receiver_id) if sender_id <= receiver_id else (receiver_id, sender_id)
+                summary = summaries.setdefault((user_a_id, user_b_id), {
+                    "user_a_id": user_a_id, "user_b_id": user_b_id, "last_message_id": None,
+                    "last_message_at": None, "unread_a": 0, "unread_b": 0
+                })
+                if not is_read and sender_id != receiver_id:
+                    summary["unread_a" if receiver_id == user_a_id else "unread_b"] += 1
+                order_key = (timestamp or datetime.datetime.min, message_id)
+                if order_key > latest.get((user_a_id, user_b_id), (datetime.datetime.min, 0)):
+                    latest[(user_a_id, user_b_id)] = order_key
+                    summary.update(last_message_id=message_id, last_sender_id=sender_id, last_preview=content, last_message_at=timestamp)
+        values = list(summaries.values())
+        statement = insert(conversation_table).on_conflict_do_nothing(index_elements=["user_a_id", "user_b_id"])
+        count_query = select(func.count()).select_from(conversation_table)
+        existing = connection.execute(count_query).scalar()
+        for start in range(0, len(values), batch_size):
+            connection.execute(statement, values[start:start + batch_size])
+        created = connection.execute(count_query).scalar() - existing
+        trans.commit()
+        if created:
+            print(f"✅ {created} sohbet özeti oluşturuldu.")
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Sohbet özeti doldurma hatası: {e}")
+
 def sync_db():
     print("🔄 Veritabanı senkronizasyonu başlıyor...")
     engine, connection = get_db_connection()
@@ -114,9 +247,30 @@ def sync_db():
             "external_url": "TEXT",
             "campus": "TEXT",
             "city": "TEXT",
-            "session_token": "TEXT"
+            "session_token": "TEXT",
+            "geo_cell": "INTEGER",
+            "participant_count": "INTEGER DEFAULT 0",
+            "source_hash": "VARCHAR(64)"
         }
         sync_table(engine, connection, "events", events_columns)
+        backfill_geo_cells(connection)
+        backfill_participant_counts(connection)
+
+        # Mesajlar: write-behind kayıtta tekrarları ayırt eden istemci kimliği (ULID)
+        sync_table(engine, connection, "messages", {"client_id": "VARCHAR(26)"})
+        backfill_conversations(connection)
+
+        # 3. İndeksler (Sıcak sorgular için composite indeksler)
+        sync_indexes(engine, connection)
+
+        # 4. Tam metin arama indeksi (tablo + mevcut kayıtların yeniden indekslenmesi)
+        from services import search_index
+        if search_index.ensure_schema(engine):
+            search_index.rebuild(engine)
+            print("✅ Arama indeksi oluşturuldu.")
+        elif search_index.is_ready() and "--rebuild-search" in sys.argv:
+            search_index.rebuild(engine)
+            print("✅ Arama indeksi yeniden oluşturuldu.")
 
     finally:
         connection.close()
@@ -0,0 +1,94 @@
+import sys
+import os
+import uuid
+import datetime
+import tempfile
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Geçici SQLite veritabanı (modüller import edilmeden önce ayarlanmalı)
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/verify_pagination.db"
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient
+import models
+from database import SessionLocal
+from main import app
+
+# GET /events sayfalama + önbellek testi. Kontroller:
+#   1. Sonraki sayfası olan liste 200 ve X-Next-Cursor header'ı ile döner (önbellek üreticisi header sözlüğüne yazar)
+#   2. İmleçle istenen sonraki sayfa farklı etkinlikleri döner, son sayfada imleç yoktur
+#   3. Aynı istek önbellekten gelince de imleç korunur, If-None-Match ile 304 döner
+# Başarısız olursa çıkış kodu 1 olur. Kullanım: python tests/verify_event_pagination.py
+
+EVENT_COUNT = 5
+PAGE_SIZE = 2
+
+
+def check(condition: bool, message: str, failures: list):
+    print(("✅ " if condition else "❌ ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def seed():
+    with SessionLocal() as db:
+        host_id = uuid.uuid4()
+        db.add(models.User(
+            id=host_id, email=f"pagination-{host_id}@example.com", full_name="Sayfalama Testi",
+            birth_date=datetime.date(2000, 1, 1), gender=models.Gender.E
+        ))
+        for i in range(EVENT_COUNT):
+            db.add(models.Event(
+                title=f"Sayfalama etkinliği {i}", description="Sayfalama",
+                date=datetime.datetime.utcnow() + datetime.timedelta(days=i + 1),
+                min_age_limit=18, max_age_limit=99, capacity=10, participant_count=0,
+                deposit_amount=0, price=0, host_id=host_id, city="İstanbul"
+            ))
+        db.commit()
+
+
+def run() -> list:
+    failures = []
+    client = TestClient(app)
+
+    first = client.get(f"/events?limit={PAGE_SIZE}")
+    next_cursor = first.headers.get("X-Next-Cursor")
+    check(first.status_code == 200, f"Sonraki sayfası olan liste 200 döndü ({first.status_code})", failures)
+    check(bool(next_cursor), "X-Next-Cursor header'ı döndü", failures)
+    if first.status_code != 200 or not next_cursor:
+        return failures
+
+    seen = {event["id"] for event in first.json()}
+    cursor, pages = next_cursor, 1
+    while cursor:
+        page = client.get(f"/events?limit={PAGE_SIZE}&cursor={cursor}")
+        if page.status_code != 200:
+            check(False, f"İmleçli sayfa 200 döndü ({page.status_code})", failures)
+            return failures
+        seen.update(event["id"] for event in page.json())
+        cursor = page.headers.get("X-Next-Cursor")
+        pages += 1
+    check(len(seen) == EVENT_COUNT and pages == 3, f"İmleçle tüm etkinlikler gezildi ({len(seen)} etkinlik, {pages} sayfa)", failures)
+
+    cached = client.get(f"/events?limit={PAGE_SIZE}")
+    check(cached.status_code == 200 and cached.headers.get("X-Next-Cursor") == next_cursor, "Önbellekten gelen yanıtta imleç korundu", failures)
+    not_modified = client.get(f"/events?limit={PAGE_SIZE}", headers={"If-None-Match": first.headers["ETag"]})
+    check(not_modified.status_code == 304, f"If-None-Match ile 304 döndü ({not_modified.status_code})", failures)
+    return failures
+
+
+def main():
+    models.Base.metadata.create_all(bind=SessionLocal.kw["bind"])
+    seed()
+    failures = run()
+    if failures:
+        print(f"\n{len(failures)} kontrol başarısız.")
+        sys.exit(1)
+    print("\nTüm kontroller başarılı.")
+
+
+if __name__ == "__main__":
+    main()
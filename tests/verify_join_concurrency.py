@@ -0,0 +1,156 @@
+import sys
+import os
+import uuid
+import datetime
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, func
+from sqlalchemy.orm import sessionmaker
+import models, crud
+
+# Katılım kontenjanı eşzamanlılık testi.
+# JOIN_COUNT kullanıcı aynı anda CAPACITY kişilik bir etkinliğe katılmaya çalışır
+# (participants.join_event ile aynı adımlar: crud.reserve_seat -> katılımcı kaydı -> commit).
+# Beklenen: tam CAPACITY onaylı katılımcı, geri kalanı bekleme listesinde, participant_count == CAPACITY,
+# etkinlik DOLDU. Ardından onaylı katılımcıların yarısı ayrılır ve bekleme listesinden terfi kontrol edilir.
+# Aşırı rezervasyon veya sayaç kayması olursa çıkış kodu 1 olur.
+# Kullanım: python tests/verify_join_concurrency.py [katilim_sayisi] [kapasite] [veritabani_url]
+#   Veritabanı URL'i verilmezse geçici bir SQLite dosyası kullanılır (PostgreSQL için test veritabanı verin).
+
+JOIN_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+CAPACITY = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+WORKERS = 64
+
+
+def _seed(Session):
+    with Session() as db:
+        host_id = uuid.uuid4()
+        user_ids = [uuid.uuid4() for _ in range(JOIN_COUNT)]
+        db.execute(insert(models.User), [
+            {
+                "id": user_id,
+                "email": f"join-test-{user_id}@example.com",
+                "full_name": "Join Test",
+                "birth_date": datetime.date(2000, 1, 1),
+                "gender": models.Gender.E,
+                "wallet_balance": 0
+            }
+            for user_id in [host_id] + user_ids
+        ])
+        event = models.Event(
+            title="Kontenjan testi",
+            description="Eşzamanlı katılım",
+            date=datetime.datetime.utcnow() + datetime.timedelta(days=3),
+            min_age_limit=18,
+            max_age_limit=99,
+            capacity=CAPACITY,
+            participant_count=0,
+            deposit_amount=0,
+            price=0,
+            host_id=host_id
+        )
+        db.add(event)
+        db.commit()
+        return event.id, user_ids
+
+
+def _join(Session, event_id, user_id, start):
+    start.wait()
+    with Session() as db:
+        reserved = crud.reserve_seat(db, event_id)
+        db.add(models.EventParticipant(
+            event_id=event_id,
+            user_id=user_id,
+            status="approved" if reserved else models.ParticipantStatus.WAITLIST.value
+        ))
+        db.commit()
+        return reserved
+
+
+def _leave(Session, event_id, user_id):
+    # participants.leave_event ile aynı: onaylı ayrılırsa yer bekleyene devredilir, yoksa boşaltılır
+    with Session() as db:
+        participant = db.query(models.EventParticipant).filter(
+            models.EventParticipant.event_id == event_id,
+            models.EventParticipant.user_id == user_id
+        ).first()
+        db.delete(participant)
+        db.flush()
+        waiting = crud.get_waitlist(db, event_id, limit=1)
+        if waiting:
+            waiting[0].status = "approved"
+        else:
+            crud.release_seat(db, event_id)
+        db.commit()
+
+
+def _snapshot(Session, event_id):
+    with Session() as db:
+        event = db.get(models.Event, event_id)
+        approved = db.query(func.count(models.EventParticipant.id)).filter(
+            models.EventParticipant.event_id == event_id,
+            models.EventParticipant.status == "approved"
+        ).scalar()
+        waitlist = db.query(func.count(models.EventParticipant.id)).filter(
+            models.EventParticipant.event_id == event_id,
+            models.EventParticipant.status == models.ParticipantStatus.WAITLIST.value
+        ).scalar()
+        return event.participant_count, event.status, approved, waitlist
+
+
+def _check(label, condition, errors):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        errors.append(label)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = sys.argv[3] if len(sys.argv) > 3 else f"sqlite:///{os.path.join(tmp, 'join_test.db')}"
+        connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args, pool_size=WORKERS, max_overflow=0)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        event_id, user_ids = _seed(Session)
+        # Tek seferlik başlangıç sinyali: ilk WORKERS iş aynı anda başlar, kalanlar beklemeden sıraya girer
+        start = threading.Event()
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            pending = pool.map(lambda user_id: _join(Session, event_id, user_id, start), user_ids)
+            start.set()
+            results = list(pending)
+
+        errors = []
+        count, status, approved, waitlist = _snapshot(Session, event_id)
+        print(f"{JOIN_COUNT} eşzamanlı katılım, kapasite {CAPACITY}: onaylı={approved}, bekleme={waitlist}, sayaç={count}, durum={status.value}")
+        _check("Onaylı katılımcı sayısı kapasiteyi aşmadı", approved == min(CAPACITY, JOIN_COUNT), errors)
+        _check("Sayaç gerçek onaylı sayısıyla aynı", count == approved, errors)
+        _check("Reddedilenlerin tamamı bekleme listesinde", waitlist == JOIN_COUNT - approved, errors)
+        _check("Rezervasyon sonuçları tutarlı", sum(results) == approved, errors)
+        if JOIN_COUNT >= CAPACITY:
+            _check("Etkinlik DOLDU durumunda", status == models.EventStatus.DOLDU, errors)
+
+        # Onaylıların yarısı aynı anda ayrılır: bekleme listesi varsa yerler devredilmeli
+        leavers = [user_id for user_id, reserved in zip(user_ids, results) if reserved][:CAPACITY // 2]
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            list(pool.map(lambda user_id: _leave(Session, event_id, user_id), leavers))
+
+        count, status, approved, waitlist = _snapshot(Session, event_id)
+        print(f"{len(leavers)} ayrılma sonrası: onaylı={approved}, bekleme={waitlist}, sayaç={count}, durum={status.value}")
+        expected_approved = min(CAPACITY, JOIN_COUNT - len(leavers))
+        _check("Ayrılanların yeri bekleme listesine devredildi", approved == expected_approved, errors)
+        _check("Sayaç ayrılma sonrası da tutarlı", count == approved, errors)
+        engine.dispose()
+
+    if errors:
+        sys.exit(1)
+    print("\nAşırı rezervasyon yok, sayaçlar tutarlı.")
+
+
+if __name__ == "__main__":
+    main()
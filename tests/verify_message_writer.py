@@ -0,0 +1,155 @@
+import sys
+import os
+import uuid
+import asyncio
+import datetime
+import tempfile
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Geçici SQLite veritabanı (modüller import edilmeden önce ayarlanmalı)
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/verify_writer.db"
+
+from sqlalchemy import select, insert, func, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import models
+from database import engine, AsyncSessionLocal, SQLALCHEMY_ASYNC_DATABASE_URL
+from services import encryption
+from services.message_writer import MessageWriter, PendingMessage
+
+# Sohbet mesajı write-behind yazıcısı testi. Kontroller:
+#   1. Eşzamanlı gönderilen mesajlar birkaç batch'te (group commit) yazılıyor, her biri onaylanıyor
+#   2. Aynı client_id ile tekrar gönderilen mesaj ikinci kez yazılmıyor, aynı id ile onaylanıyor
+#   3. Veritabanı yazılamazken kapanışta kuyruk journal'a ekleniyor, açılışta geri yükleniyor
+#   4. Olmayan alıcıya giden mesaj (yabancı anahtar ihlali) yazıcıyı kilitlemiyor: batch'in geri kalanı
+#      yazılıyor, hatalı mesaj reddediliyor
+# Başarısız olursa çıkış kodu 1 olur. Kullanım: python tests/verify_message_writer.py
+
+MESSAGES = 500
+SENDERS = 20
+
+
+def check(condition: bool, message: str, failures: list):
+    print(("✅ " if condition else "❌ ") + message)
+    if not condition:
+        failures.append(message)
+
+
+async def count_messages() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count(models.Message.id)))).scalar()
+
+
+class BrokenSession:
+    """Veritabanı erişilemezken açılan session."""
+
+    async def __aenter__(self):
+        raise ConnectionError("veritabanı erişilemez")
+
+    async def __aexit__(self, *args):
+        return False
+
+
+async def run() -> list:
+    failures = []
+    journal = os.path.join(TMP_DIR, "journal.jsonl")
+    acks = {}
+
+    async def on_persisted(message, message_id, is_new):
+        acks[message.client_id] = message_id
+
+    # 1. Group commit
+    writer = MessageWriter(on_persisted, batch_size=100, flush_ms=5, journal_path=journal, write_behind=True)
+    await writer.start()
+    senders = [uuid.uuid4() for _ in range(SENDERS)]
+    receiver = uuid.uuid4()
+    pending = [
+        PendingMessage.create(senders[i % SENDERS], receiver, f"Merhaba {i}")
+        for i in range(MESSAGES)
+    ]
+    await asyncio.gather(*(writer.submit(message) for message in pending))
+    await writer.stop()
+    stats = writer.stats()
+    print(f"Yazıcı: {stats}")
+    check(await count_messages() == MESSAGES, f"{MESSAGES} mesaj yazıldı", failures)
+    check(stats["batches"] < MESSAGES / 10, f"Mesajlar toplu yazıldı ({stats['batches']} batch)", failures)
+    check(len(acks) == MESSAGES and all(acks.values()), "Her mesaj kalıcı id ile onaylandı", failures)
+    async with AsyncSessionLocal() as db:
+        stored = (await db.execute(
+            select(models.Message).filter(models.Message.client_id == pending[0].client_id)
+        )).scalar_one()
+    check(encryption.decrypt_message(stored.content) == "Merhaba 0", "İçerik şifreli saklandı ve çözülebiliyor", failures)
+
+    # 2. Tekrar gönderim
+    retry = MessageWriter(on_persisted, journal_path=journal, write_behind=False)
+    first_id = acks[pending[0].client_id]
+    acks.clear()
+    await retry.submit(PendingMessage.create(pending[0].sender_id, receiver, "Merhaba 0", pending[0].client_id.lower()))
+    check(await count_messages() == MESSAGES, "Aynı client_id ile tekrar gönderilen mesaj yazılmadı", failures)
+    check(acks.get(pending[0].client_id) == first_id and retry.duplicates == 1, "Tekrar gönderim ilk kaydın id'si ile onaylandı", failures)
+
+    # 3. Kapanışta journal, açılışta geri yükleme
+    import services.message_writer as message_writer
+    message_writer.CHAT_WRITE_SHUTDOWN_TIMEOUT = 0.3
+    broken = MessageWriter(session_factory=BrokenSession, flush_ms=0, journal_path=journal, write_behind=True)
+    await broken.start()
+    lost = [PendingMessage.create(senders[0], receiver, f"Kesinti {i}") for i in range(25)]
+    for message in lost:
+        await broken.submit(message)
+    await broken.stop()
+    check(broken.journaled == 25 and os.path.exists(journal), "Yazılamayan 25 mesaj journal'a eklendi", failures)
+
+    recovered = MessageWriter(journal_path=journal, write_behind=True)
+    await recovered.start()
+    await recovered.stop()
+    check(recovered.recovered == 25 and not os.path.exists(journal), "Journal açılışta geri yüklendi ve silindi", failures)
+    check(await count_messages() == MESSAGES + 25, "Journal'daki mesajlar veritabanına yazıldı", failures)
+
+    # 4. Kalıcı hata (SQLite'ta yabancı anahtar kontrolü bağlantı başına açılır)
+    fk_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+
+    @event.listens_for(fk_engine.sync_engine, "connect")
+    def _enable_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    fk_sessions = async_sessionmaker(bind=fk_engine, class_=AsyncSession, expire_on_commit=False)
+    user_ids = [uuid.uuid4(), uuid.uuid4()]
+    async with fk_sessions() as db:
+        await db.execute(insert(models.User), [
+            {"id": user_id, "email": f"writer-{user_id}@example.com", "full_name": "Yazıcı Testi",
+             "birth_date": datetime.date(2000, 1, 1), "gender": models.Gender.E}
+            for user_id in user_ids
+        ])
+        await db.commit()
+    rejected = []
+
+    async def on_rejected(message, reason):
+        rejected.append(message.client_id)
+
+    strict = MessageWriter(on_persisted, session_factory=fk_sessions, on_rejected=on_rejected,
+                           flush_ms=20, journal_path=journal, write_behind=True)
+    await strict.start()
+    valid = [PendingMessage.create(user_ids[0], user_ids[1], f"Geçerli {i}") for i in range(4)]
+    orphan = PendingMessage.create(user_ids[0], uuid.uuid4(), "Olmayan alıcı")
+    await asyncio.gather(*(strict.submit(message) for message in valid[:2] + [orphan] + valid[2:]))
+    await asyncio.wait_for(strict.stop(), timeout=5)
+    await fk_engine.dispose()
+    check(rejected == [orphan.client_id] and strict.rejected == 1, "Olmayan alıcıya giden mesaj reddedildi", failures)
+    check(all(acks.get(message.client_id) for message in valid) and strict.journaled == 0,
+          "Aynı batch'teki geçerli mesajlar yazıldı, yazıcı takılmadı", failures)
+    return failures
+
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+    failures = asyncio.run(run())
+    if failures:
+        print(f"\n{len(failures)} kontrol başarısız.")
+        sys.exit(1)
+    print("\nTüm kontroller başarılı.")
+
+
+if __name__ == "__main__":
+    main()
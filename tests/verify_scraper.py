@@ -0,0 +1,172 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, unquote
+
+# Ana dizini path'e ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.scraper_service import ScraperService
+
+# Etkinlik tarayıcısı testi (veritabanı gerekmez).
+# Yerel bir fixture HTTP sunucusu iki kaynak sunar:
+#   /ld/<şehir>   : schema.org JSON-LD içeren HTML, ETag + Last-Modified destekler
+#   /json/<şehir> : etkinlik listesi JSON'u, koşullu GET desteklemez (her seferinde 200)
+# İki kaynak aynı etkinliklerin bir kısmını paylaşır. Kontroller:
+#   1. Eşzamanlılık SCRAPER_CONCURRENCY ile sınırlı, şehirler paralel çekiliyor
+#   2. Kaynaklar arası tekrar eden etkinlikler parmak iziyle eleniyor
+#   3. İkinci çekimde ETag'li kaynak 304, ETag'siz kaynak "unchanged" (gövde özeti) dönüyor
+#   4. İçerik değişince sayfa tekrar ayrıştırılıyor
+# Başarısız olursa çıkış kodu 1 olur. Kullanım: python tests/verify_scraper.py
+
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Antalya", "Eskişehir"]
+CONCURRENCY = 3
+RESPONSE_DELAY = 0.2
+
+state = {"in_flight": 0, "max_in_flight": 0, "requests": 0, "conditional": 0, "version": 1}
+state_lock = threading.Lock()
+
+
+def _events(city: str, version: int) -> list:
+    events = [
+        {
+            "@type": "MusicEvent",
+            "name": f"{city} Caz Gecesi",
+            "startDate": "2030-06-01T20:00:00+03:00",
+            "location": {"name": f"{city} Kültür Merkezi", "geo": {"latitude": 41.0, "longitude": 29.0}},
+            "offers": {"price": "150"}
+        },
+        {
+            "@type": "Event",
+            "name": f"{city} Kahve Festivali",
+            "startDate": "2030-06-02T12:00:00+03:00",
+            "location": {"name": f"{city} Meydan", "geo": {"latitude": 41.01, "longitude": 29.01}}
+        }
+    ]
+    if version > 1:
+        events.append({"@type": "TheaterEvent", "name": f"{city} Tiyatro Günleri", "startDate": "2030-06-03T19:00:00+03:00"})
+    return events
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with state_lock:
+            state["requests"] += 1
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            version = state["version"]
+        try:
+            time.sleep(RESPONSE_DELAY)
+            _, kind, city = urlparse(self.path).path.split("/", 2)
+            city = unquote(city)
+            events = _events(city, version)
+            if kind == "ld":
+                body = (
+                    "<html><head><script type=\"application/ld+json\">"
+                    + json.dumps({"@context": "https://schema.org", "@graph": events})
+                    + "</script></head><body>Etkinlikler</body></html>"
+                ).encode("utf-8")
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match"):
+                    with state_lock:
+                        state["conditional"] += 1
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", "Mon, 01 Jan 2030 00:00:00 GMT")
+            else:
+                # JSON kaynağında sadece ilk etkinlik var (diğer kaynakla ortak)
+                body = json.dumps({"events": [
+                    {"title": event["name"], "date": event["startDate"], "latitude": 41.0, "longitude": 29.0}
+                    for event in events[:1]
+                ]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with state_lock:
+                state["in_flight"] -= 1
+
+
+def check(condition: bool, message: str, failures: list):
+    print(("✅ " if condition else "❌ ") + message)
+    if not condition:
+        failures.append(message)
+
+
+async def run(base_url: str, cache_dir: str) -> list:
+    failures = []
+    scraper = ScraperService(
+        sources=[f"{base_url}/ld/{{city}}", f"{base_url}/json/{{city}}"],
+        cache_dir=cache_dir,
+        concurrency=CONCURRENCY,
+        max_connections=CONCURRENCY
+    )
+    try:
+        # 1. İlk çekim: her şey yeni
+        started = time.perf_counter()
+        first = await scraper.scrape(CITIES)
+        elapsed = time.perf_counter() - started
+        print(f"İlk çekim: {first.summary()} ({elapsed * 1000:.0f} ms)")
+        sequential = len(CITIES) * 2 * RESPONSE_DELAY
+        check(state["max_in_flight"] <= CONCURRENCY, f"Eşzamanlı istek sınırı aşılmadı (en fazla {state['max_in_flight']})", failures)
+        check(state["max_in_flight"] > 1 and elapsed < sequential, f"İstekler paralel yapıldı ({elapsed:.2f}s < sıralı {sequential:.2f}s)", failures)
+        check(len(first.events) == len(CITIES) * 2, f"Her şehirden 2 tekil etkinlik ({len(first.events)})", failures)
+        check(first.duplicates == len(CITIES), f"Kaynaklar arası tekrarlar elendi ({first.duplicates})", failures)
+        scraper.mark_processed(first.pages)
+
+        # 2. İkinci çekim: içerik aynı
+        second = await scraper.scrape(CITIES)
+        statuses = second.summary()["pages"]
+        print(f"İkinci çekim: {second.summary()}")
+        check(statuses.get("not_modified") == len(CITIES), "ETag'li kaynak koşullu GET ile 304 döndü", failures)
+        check(statuses.get("unchanged") == len(CITIES), "ETag'siz kaynak gövde özetiyle değişmemiş sayıldı", failures)
+        check(len(second.events) == 0, "Değişmeyen sayfalardan etkinlik üretilmedi", failures)
+        scraper.mark_processed(second.pages)
+
+        # 3. İçerik değişti: yeni etkinlik eklendi
+        state["version"] = 2
+        third = await scraper.scrape(CITIES)
+        print(f"Üçüncü çekim: {third.summary()}")
+        first_hashes = {source_hash for _, source_hash in first.events}
+        new_hashes = {source_hash for _, source_hash in third.events} - first_hashes
+        check(len(new_hashes) == len(CITIES), f"Sadece yeni eklenen etkinlikler yeni parmak izi üretti ({len(new_hashes)})", failures)
+        check(state["conditional"] >= len(CITIES) * 2, "Önbellekli sayfalar için If-None-Match gönderildi", failures)
+    finally:
+        await scraper.aclose()
+    return failures
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            failures = asyncio.run(run(base_url, cache_dir))
+    finally:
+        server.shutdown()
+    if failures:
+        print(f"\n{len(failures)} kontrol başarısız.")
+        sys.exit(1)
+    print("\nTüm kontroller başarılı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import math
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Yakındaki etkinlik aramaları için sabit boyutlu enlem/boylam ızgarası.
+# Her hücrenin tamsayı kimliği: satır * GRID_COLS + sütun. Aynı satırdaki hücreler ardışık
+# sayılar olduğundan bir satırın kapsanan kısmı tek bir "geo_cell BETWEEN a AND b" ile indeksten okunur.
+# Hücre boyutu değişirse mevcut kayıtlar için: python sync_db.py (geo_cell yeniden hesaplanır)
+GEO_CELL_DEG = float(os.getenv("GEO_CELL_DEG", 0.1))  # ~11 km enlem
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+# Yakındaki etkinlik aramalarında izin verilen en büyük yarıçap: kapsanan hücre satırı sayısını
+# (SQL'deki BETWEEN koşulları ve bellek içi indeksin taradığı hücreler) sınırlı tutar
+MAX_RADIUS_KM = 200.0
+
+GRID_COLS = int(math.ceil(360 / GEO_CELL_DEG))
+GRID_ROWS = int(math.ceil(180 / GEO_CELL_DEG))
+
+
+def _row(lat: float) -> int:
+    return min(int((lat + 90.0) // GEO_CELL_DEG), GRID_ROWS - 1)
+
+
+def _col(lon: float) -> int:
+    return int(((lon + 180.0) % 360.0) // GEO_CELL_DEG) % GRID_COLS
+
+
+def cell_id(lat, lon):
+    """Koordinatın ızgara hücresi (koordinat yoksa None)."""
+    if lat is None or lon is None:
+        return None
+    return _row(float(lat)) * GRID_COLS + _col(float(lon))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cell_ranges(lat: float, lon: float, radius_km: float):
+    """
+    Merkez + yarıçap dairesini kapsayan hücreleri satır başına (başlangıç, bitiş) aralıkları olarak döner.
+    Aralıklar kapalıdır; tarih çizgisini aşan satırlar iki aralığa bölünür.
+    """
+    delta_lat = radius_km / KM_PER_DEG_LAT
+    min_lat = max(-90.0, lat - delta_lat)
+    max_lat = min(90.0, lat + delta_lat)
+
+    # Boylam genişliği enlemin kosinüsüyle daralır; kutba en yakın kenara göre hesapla
+    widest_lat = min(89.9, max(abs(min_lat), abs(max_lat)))
+    delta_lon = radius_km / (KM_PER_DEG_LAT * math.cos(math.radians(widest_lat)))
+
+    if delta_lon >= 180.0:
+        col_spans = [(0, GRID_COLS - 1)]
+    else:
+        first_col = _col(lon - delta_lon)
+        last_col = _col(lon + delta_lon)
+        if first_col <= last_col:
+            col_spans = [(first_col, last_col)]
+        else:
+            col_spans = [(first_col, GRID_COLS - 1), (0, last_col)]
+
+    ranges = []
+    for row in range(_row(min_lat), _row(max_lat) + 1):
+        base = row * GRID_COLS
+        for first_col, last_col in col_spans:
+            ranges.append((base + first_col, base + last_col))
+    return ranges
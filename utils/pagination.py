@@ -0,0 +1,69 @@
+import json
+import base64
+import datetime
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Keyset (cursor) sayfalama yardımcıları.
+# OFFSET derin sayfalarda atlanan satırları yine okur ve araya yeni kayıt girince
+# satırlar kayar/tekrarlanır. Keyset ise son görülen (sıralama kolonu, id) çiftinden devam eder.
+# Cursor istemci için opak bir stringdir (base64 JSON), yapısına güvenilmemelidir.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    if isinstance(sort_value, datetime.datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column, id_column) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, raw_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_column.type.python_type is datetime.datetime:
+            sort_value = datetime.datetime.fromisoformat(sort_value)
+        return sort_value, id_column.type.python_type(raw_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfalama imleci (cursor).")
+
+
+def paginate_keyset(query, sort_column, id_column, cursor: Optional[str], limit: int, descending: bool = False):
+    """
+    Sorguyu (sort_column, id_column) sırasına göre keyset ile sayfalar.
+    (items, next_cursor) döner; son sayfada next_cursor None'dır.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column, id_column)
+        # Satır karşılaştırması (a, b) > (x, y): PostgreSQL ve SQLite (3.15+) bileşik indeksi kullanabilir
+        if descending:
+            query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+        else:
+            query = query.filter(tuple_(sort_column, id_column) > tuple_(sort_value, row_id))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Bir fazla satır çekerek sonraki sayfa olup olmadığını ek COUNT sorgusu atmadan anlarız
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return items, next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """
+    Liste response şemasını bozmamak için sonraki sayfa imleci header ile döner.
+    response yerine header sözlüğü de verilebilir (response_cache producer'ları için).
+    """
+    if next_cursor:
+        headers = getattr(response, "headers", response)
+        headers[NEXT_CURSOR_HEADER] = next_cursor
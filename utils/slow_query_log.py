@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from utils import sql_profiler
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Yavaş sorgu kaydı (opt-in). Eşik 0 ise kapalıdır.
+SLOW_QUERY_LOG_MS = float(os.getenv("SLOW_QUERY_LOG_MS", 0))
+# Yavaş SELECT'ler için EXPLAIN planı da kaydedilsin mi? (Sorguya ek gecikme ekler)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", os.path.join("logs", "slow_queries.log"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 3))
+# Bellekte tutulan farklı sorgu kalıbı sayısı (top offenders listesi için)
+SLOW_QUERY_MAX_SHAPES = 500
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN "
+}
+
+_file_logger = None
+_shapes = {}
+_lock = threading.Lock()
+
+
+def _get_file_logger():
+    global _file_logger
+    if _file_logger is None:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG_FILE) or ".", exist_ok=True)
+        file_logger = logging.getLogger("artibir.slow_queries")
+        file_logger.setLevel(logging.INFO)
+        file_logger.propagate = False
+        # Her worker kendi dosyasına yazar (RotatingFileHandler process'ler arası güvenli değil)
+        base, ext = os.path.splitext(SLOW_QUERY_LOG_FILE)
+        handler = RotatingFileHandler(
+            f"{base}.{os.getpid()}{ext}",
+            maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8"
+        )
+        file_logger.addHandler(handler)
+        _file_logger = file_logger
+    return _file_logger
+
+
+def _param_shape(parameters):
+    """Parametre değerlerini değil, sadece tiplerini kaydederiz (kişisel veri loga düşmesin)."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _explain(conn, statement, parameters):
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    is_postgres = conn.dialect.name == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        # PostgreSQL'de hata transaction'ı bozmasın diye savepoint içinde çalıştır
+        if is_postgres:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [str(row[-1] if not is_postgres else row[0]) for row in cursor.fetchall()]
+            if is_postgres:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except Exception as e:
+            if is_postgres:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return [f"EXPLAIN hatası: {e}"]
+    finally:
+        cursor.close()
+
+
+def _record(conn, statement, parameters, elapsed_ms, executemany):
+    stats = sql_profiler.current_stats()
+    route = stats.route if stats is not None else "background"
+    shape = " ".join(statement.split())
+
+    plan = None
+    if SLOW_QUERY_EXPLAIN and not executemany:
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            plan = [f"EXPLAIN hatası: {e}"]
+
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "route": route,
+        "sql": shape,
+        "params": _param_shape(parameters),
+        "executemany": executemany,
+        "plan": plan
+    }
+    _get_file_logger().info(json.dumps(entry, ensure_ascii=False))
+
+    with _lock:
+        aggregate = _shapes.get(shape)
+        if aggregate is None:
+            if len(_shapes) >= SLOW_QUERY_MAX_SHAPES:
+                # En az toplam süreye sahip kalıbı at
+                del _shapes[min(_shapes, key=lambda k: _shapes[k]["total_ms"])]
+            aggregate = {"sql": shape, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set(), "last_plan": None}
+            _shapes[shape] = aggregate
+        aggregate["count"] += 1
+        aggregate["total_ms"] += elapsed_ms
+        aggregate["max_ms"] = max(aggregate["max_ms"], elapsed_ms)
+        aggregate["last_seen"] = entry["timestamp"]
+        if len(aggregate["routes"]) < 20:
+            aggregate["routes"].add(route)
+        if plan is not None:
+            aggregate["last_plan"] = plan
+
+
+def install(engine):
+    """Engine'e yavaş sorgu dinleyicilerini ekler (SLOW_QUERY_LOG_MS > 0 ise)."""
+    if SLOW_QUERY_LOG_MS <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["slow_query_start"].pop()) * 1000
+        if elapsed_ms >= SLOW_QUERY_LOG_MS:
+            try:
+                _record(conn, statement, parameters, elapsed_ms, executemany)
+            except Exception as e:
+                logger.warning(f"Yavaş sorgu kaydedilemedi: {e}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
+
+
+def top_offenders(limit: int = 20) -> dict:
+    """Toplam süreye göre en pahalı sorgu kalıpları (bu worker için)."""
+    with _lock:
+        items = sorted(_shapes.values(), key=lambda a: a["total_ms"], reverse=True)[:limit]
+        return {
+            "enabled": SLOW_QUERY_LOG_MS > 0,
+            "threshold_ms": SLOW_QUERY_LOG_MS,
+            "explain": SLOW_QUERY_EXPLAIN,
+            "queries": [
+                {
+                    "sql": a["sql"],
+                    "count": a["count"],
+                    "total_ms": round(a["total_ms"], 2),
+                    "avg_ms": round(a["total_ms"] / a["count"], 2),
+                    "max_ms": round(a["max_ms"], 2),
+                    "routes": sorted(a["routes"]),
+                    "last_seen": a.get("last_seen"),
+                    "last_plan": a["last_plan"]
+                }
+                for a in items
+            ]
+        }
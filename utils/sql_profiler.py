@@ -0,0 +1,83 @@
+import os
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# İstek başına SQL sayacı ve N+1 dedektörü.
+# Aynı SQL kalıbı bir istekte bu sayıdan fazla çalışırsa uyarı loglanır (döngü içinde lazy load şüphesi).
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 10))
+# Geliştirme ortamında sorgu sayısı/süresi response header olarak döner
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "false").lower() in ("1", "true", "yes")
+
+
+class RequestQueryStats:
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        # SQL kalıbı (parametreler yer tutucu olarak kalır) -> çalışma sayısı
+        self.shapes = {}
+        self.warned = set()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        repeat = self.shapes.get(statement, 0) + 1
+        self.shapes[statement] = repeat
+        if repeat > SQL_N_PLUS_ONE_THRESHOLD and statement not in self.warned:
+            self.warned.add(statement)
+            logger.warning(
+                f"N+1 şüphesi: {self.route} isteğinde aynı sorgu {repeat}+ kez çalıştı: "
+                f"{' '.join(statement.split())[:300]}"
+            )
+
+
+# Thread havuzunda çalışan sync endpointler de context kopyasını aldığı için
+# aynı (mutable) stats nesnesini görür.
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_profiler_stats", default=None)
+
+
+def start_request(route: str) -> RequestQueryStats:
+    stats = RequestQueryStats(route)
+    _current.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+
+def add_debug_headers(response, stats: RequestQueryStats):
+    if not SQL_DEBUG_HEADERS:
+        return
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.2f}"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_profiler_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Hata alan sorguda after_cursor_execute çalışmaz, başlangıç zamanını temizle
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_profiler_start"):
+        conn.info["sql_profiler_start"].pop()
@@ -0,0 +1,33 @@
+import re
+import unicodedata
+
+# Türkçe duyarlı metin normalizasyonu (arama indeksi ve öneriler için).
+# str.lower() "İ" harfini "i̇" (i + birleşik nokta) yapar ve "I" harfini "i"ye çevirir;
+# Türkçede doğrusu İ -> i, I -> ı'dır. Arama tarafında ayrıca aksanlar katlanır
+# (ı -> i, ş -> s, ğ -> g, ü -> u, ö -> o, ç -> c) ki "kadikoy" yazan "Kadıköy"ü bulsun.
+
+_UPPER_MAP = str.maketrans({"İ": "i", "I": "ı"})
+_FOLD_MAP = str.maketrans({"ı": "i", "ş": "s", "ğ": "g", "ü": "u", "ö": "o", "ç": "c", "â": "a", "î": "i", "û": "u"})
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def turkish_lower(text: str) -> str:
+    return text.translate(_UPPER_MAP).lower()
+
+
+def fold(text: str) -> str:
+    """Küçük harfe çevirir ve Türkçe karakterleri ASCII karşılıklarına katlar."""
+    folded = turkish_lower(unicodedata.normalize("NFC", text)).translate(_FOLD_MAP)
+    # Kalan birleşik işaretleri (örn. ayrı yazılmış nokta/şapka) temizle
+    return "".join(ch for ch in unicodedata.normalize("NFD", folded) if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> list:
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(fold(text))
+
+
+def normalize(*parts) -> str:
+    """İndekslenecek alanları tek bir normalize metinde birleştirir (boş alanlar atlanır)."""
+    return " ".join(token for part in parts if part for token in tokenize(str(part)))
@@ -0,0 +1,29 @@
+import os
+import time
+from typing import Optional
+
+# ULID: 48 bit milisaniye zaman damgası + 80 bit rastgelelik, Crockford base32 ile 26 karakter.
+# Zamana göre sıralanabilir; istemci mesajı sunucuya ulaşmadan kimliğini bilir (tekrar gönderimde aynı kimlik).
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_VALID = frozenset(_ALPHABET)
+ULID_LENGTH = 26
+
+
+def new_ulid() -> str:
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(ULID_LENGTH):
+        value, index = divmod(value, 32)
+        chars.append(_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def normalize_ulid(value) -> Optional[str]:
+    """Geçerli bir ULID ise büyük harfli halini, değilse None döner."""
+    if not isinstance(value, str) or len(value) != ULID_LENGTH:
+        return None
+    value = value.upper()
+    # İlk karakter 7'den büyükse 128 biti aşar
+    if value[0] > "7" or not _VALID.issuperset(value):
+        return None
+    return value
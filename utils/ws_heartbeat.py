@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from dotenv import load_dotenv
+
+from utils import ws_outbox
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# WebSocket endpoint'leri için uygulama seviyesi heartbeat + boşta kalan bağlantı temizleyici.
+# Mobil istemciler ağ değiştirince (WiFi -> 4G) bağlantı yarı açık kalır: sunucu kopmayı görmez,
+# soket yöneticide kalır ve her yayında ona da yazılır. Endpoint başına tek bir task:
+#   - Her bağlantıya WS_PING_INTERVAL saniyede bir {"type": "ping"} gönderir (bağlantının kuyruğu üzerinden)
+#   - İstemci {"type": "pong"} (veya herhangi bir mesaj) ile yanıt verir; son gelen mesaj zamanı tutulur
+#   - WS_IDLE_TIMEOUT saniye hiçbir şey gelmeyen bağlantı 1001 ile kapatılır ve yöneticiden çıkarılır
+# İstemci de {"type": "ping"} gönderirse {"type": "pong"} yanıtı alır.
+# Varsayılan olarak kapalıdır (0): yalnızca dinleyen istemciler (canlı takip izleyicileri) veya pong
+# göndermeyen istemciler boşta sayılıp kapatılırdı. Protokol seviyesinde canlılık için uvicorn'un
+# --ws-ping-interval / --ws-ping-timeout ayarları kullanılır (Procfile); bu katman ancak bütün istemciler
+# pong yanıtlıyorsa açılmalıdır.
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 0))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", 0))
+# Temizleyicinin kontrol aralığı ve mesaj/bayt hızları için ölçüm penceresi (sn)
+REAPER_TICK = 5.0
+RATE_WINDOW = 60.0
+# Bu boyuttan uzun gelen mesajlar kontrol mesajı sayılmaz (her sohbet mesajı JSON olarak çözülmesin)
+CONTROL_MESSAGE_MAX = 64
+
+CLOSE_CODE_IDLE = 1001
+PONG_MESSAGE = json.dumps({"type": "pong"})
+
+
+class Heartbeat:
+    """Bir endpoint'in canlı bağlantıları: ping, boşta kalanları kapatma ve trafik sayaçları."""
+
+    def __init__(self, endpoint: str, ping_interval: float = WS_PING_INTERVAL, idle_timeout: float = WS_IDLE_TIMEOUT):
+        self.endpoint = endpoint
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        # outbox -> [son gelen mesaj zamanı, son ping zamanı] (monotonic)
+        self._connections = {}
+        self._task = None
+        self.opened = 0
+        self.reaped = 0
+        self.messages_in = 0
+        self.bytes_in = 0
+        # Kapanan bağlantıların giden trafik toplamları
+        self._closed_messages_out = 0
+        self._closed_bytes_out = 0
+        self._samples = deque()
+
+    def register(self, outbox: ws_outbox.Outbox):
+        now = time.monotonic()
+        self._connections[outbox] = [now, now]
+        self.opened += 1
+        if self._task is None and (self.ping_interval > 0 or self.idle_timeout > 0):
+            self._task = asyncio.create_task(self._run())
+
+    def unregister(self, outbox: ws_outbox.Outbox):
+        if self._connections.pop(outbox, None) is not None:
+            self._closed_messages_out += outbox.sent
+            self._closed_bytes_out += outbox.bytes_sent
+
+    def received(self, outbox: ws_outbox.Outbox, text: str) -> bool:
+        """
+        İstemciden gelen her mesajda çağrılır. Mesaj heartbeat kontrol mesajıysa (ping/pong) True döner,
+        endpoint onu işlemeden atlar.
+        """
+        self.messages_in += 1
+        self.bytes_in += len(text.encode("utf-8"))
+        entry = self._connections.get(outbox)
+        if entry is not None:
+            entry[0] = time.monotonic()
+        if len(text) > CONTROL_MESSAGE_MAX:
+            return False
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return False
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind == "ping":
+            outbox.put(PONG_MESSAGE)
+        return kind in ("ping", "pong")
+
+    def _traffic(self) -> tuple:
+        live = list(self._connections)
+        messages_out = self._closed_messages_out + sum(outbox.sent for outbox in live)
+        bytes_out = self._closed_bytes_out + sum(outbox.bytes_sent for outbox in live)
+        return self.messages_in, messages_out, self.bytes_in, bytes_out
+
+    def _record_sample(self, now: float):
+        self._samples.append((now, *self._traffic()))
+        while self._samples and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+
+    async def _run(self):
+        ping_message = json.dumps({"type": "ping"})
+        while True:
+            await asyncio.sleep(REAPER_TICK)
+            try:
+                now = time.monotonic()
+                self._record_sample(now)
+                for outbox, entry in list(self._connections.items()):
+                    last_seen, last_ping = entry
+                    if self.idle_timeout > 0 and now - last_seen > self.idle_timeout:
+                        # Kuyruğun yazıcı task'ı soketi kapatır, yönetici on_dead ile kaydı siler
+                        self.reaped += 1
+                        self.unregister(outbox)
+                        outbox.kill(CLOSE_CODE_IDLE)
+                    elif self.ping_interval > 0 and now - last_ping >= self.ping_interval:
+                        entry[1] = now
+                        outbox.put(ping_message)
+            except Exception as e:
+                logger.warning(f"WebSocket heartbeat hatası ({self.endpoint}): {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        messages_in, messages_out, bytes_in, bytes_out = self._traffic()
+        rates = {"messages_in": 0.0, "messages_out": 0.0, "bytes_in": 0.0, "bytes_out": 0.0}
+        if self._samples:
+            oldest = self._samples[0]
+            elapsed = time.monotonic() - oldest[0]
+            if elapsed > 0:
+                current = (messages_in, messages_out, bytes_in, bytes_out)
+                for index, name in enumerate(rates):
+                    rates[name] = round((current[index] - oldest[index + 1]) / elapsed, 2)
+        return {
+            "endpoint": self.endpoint,
+            "live_sockets": len(self._connections),
+            "opened": self.opened,
+            "reaped_idle": self.reaped,
+            "messages_in": messages_in,
+            "messages_out": messages_out,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "per_second": rates,
+            "ping_interval_seconds": self.ping_interval,
+            "idle_timeout_seconds": self.idle_timeout
+        }
+
+
+_heartbeats = []
+
+
+def create_heartbeat(endpoint: str, **kwargs) -> Heartbeat:
+    heartbeat = Heartbeat(endpoint, **kwargs)
+    _heartbeats.append(heartbeat)
+    return heartbeat
+
+
+async def shutdown():
+    for heartbeat in _heartbeats:
+        await heartbeat.stop()
+
+
+def get_stats() -> dict:
+    return {"pid": os.getpid(), "endpoints": [heartbeat.stats() for heartbeat in _heartbeats]}
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# WebSocket bağlantısı başına sınırlı giden kuyruk + yazıcı task.
+# Gönderen taraf (mesaj/konum yayını) sadece kuyruğa ekler ve beklemez; sokete yazma işini
+# her bağlantının kendi task'ı yapar. Böylece 3G'deki yavaş bir istemci göndereni veya
+# aynı odadaki diğer dinleyicileri bekletmez, yayın maliyeti en yavaş istemciye bağlı olmaz.
+# Kuyruk dolunca:
+#   drop_oldest: en eski bekleyen mesaj atılır
+#   coalesce   : aynı anahtarlı bekleyen mesajın yerine yenisi yazılır (örn. kullanıcının son konumu),
+#                anahtarsız mesajlarda drop_oldest gibi davranır
+# Başarılı bir yazma olmadan disconnect_after mesaj atılırsa istemci kopuk sayılır ve bağlantı kapatılır
+# (istemci yeniden bağlanıp eksikleri HTTP ile tamamlar).
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+# Yavaş tüketici nedeniyle kapatma: "Try Again Later"
+CLOSE_CODE_SLOW_CONSUMER = 1013
+CLOSE_CODE_SEND_FAILED = 1011
+
+
+class Outbox:
+    def __init__(self, websocket, max_size: int, policy: str, disconnect_after: int, send_timeout: float, on_dead=None):
+        self.websocket = websocket
+        self.max_size = max_size
+        self.policy = policy
+        self.disconnect_after = disconnect_after
+        self.send_timeout = send_timeout
+        # on_dead(outbox): bağlantı kapatıldığında yöneticinin kaydı silmesi için (async)
+        self._on_dead = on_dead
+        # (anahtar, mesaj); anahtarlı girişlerin güncel mesajı _pending'de tutulur
+        self._queue = deque()
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.dead = False
+        self.close_code = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.bytes_sent = 0
+        self._dropped_since_send = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+        return self
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, message: str, key=None) -> bool:
+        """Mesajı beklemeden kuyruğa ekler. Bağlantı kapatıldıysa False döner."""
+        if self.dead:
+            return False
+        if key is not None and self.policy == COALESCE and key in self._pending:
+            self._pending[key] = message
+            self.coalesced += 1
+            return True
+
+        if len(self._queue) >= self.max_size:
+            old_key, _ = self._queue.popleft()
+            if old_key is not None:
+                self._pending.pop(old_key, None)
+            self.dropped += 1
+            self._dropped_since_send += 1
+            if self._dropped_since_send >= self.disconnect_after:
+                self.kill(CLOSE_CODE_SLOW_CONSUMER)
+                return False
+
+        if key is not None and self.policy == COALESCE:
+            self._pending[key] = message
+            self._queue.append((key, None))
+        else:
+            self._queue.append((None, message))
+        self._wakeup.set()
+        return True
+
+    def kill(self, close_code: int):
+        if self.dead:
+            return
+        self.dead = True
+        self.close_code = close_code
+        self._queue.clear()
+        self._pending.clear()
+        # Yazıcı task uyanıp bağlantıyı kapatır
+        self._wakeup.set()
+
+    async def _writer(self):
+        try:
+            while True:
+                if not self._queue and not self.dead:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self.dead:
+                    break
+                key, message = self._queue.popleft()
+                if key is not None:
+                    message = self._pending.pop(key)
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(message), timeout=self.send_timeout)
+                except Exception:
+                    self.kill(CLOSE_CODE_SEND_FAILED)
+                    break
+                self.sent += 1
+                self.bytes_sent += len(message.encode("utf-8"))
+                self._dropped_since_send = 0
+        except asyncio.CancelledError:
+            return
+        await self._shutdown()
+
+    async def _shutdown(self):
+        try:
+            await self.websocket.close(code=self.close_code or CLOSE_CODE_SEND_FAILED)
+        except Exception:
+            pass
+        if self._on_dead is not None:
+            try:
+                await self._on_dead(self)
+            except Exception as e:
+                logger.warning(f"WebSocket kuyruğu kapatılırken hata: {e}")
+
+    async def close(self):
+        """Normal kopmada çağrılır: yazıcı task durdurulur, bekleyen mesajlar atılır."""
+        self.dead = True
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+
+class OutboxStats:
+    """Yönetici başına toplam sayaçlar (kapanan bağlantıların sayıları da korunur)."""
+
+    def __init__(self):
+        self.closed_sent = 0
+        self.closed_dropped = 0
+        self.closed_coalesced = 0
+        self.slow_consumer_disconnects = 0
+        self.send_failures = 0
+
+    def absorb(self, outbox: Outbox):
+        self.closed_sent += outbox.sent
+        self.closed_dropped += outbox.dropped
+        self.closed_coalesced += outbox.coalesced
+        if outbox.close_code == CLOSE_CODE_SLOW_CONSUMER:
+            self.slow_consumer_disconnects += 1
+        elif outbox.close_code == CLOSE_CODE_SEND_FAILED:
+            self.send_failures += 1
+
+    def snapshot(self, live_outboxes) -> dict:
+        live = list(live_outboxes)
+        return {
+            "queued": sum(len(outbox) for outbox in live),
+            "max_queue_depth": max((len(outbox) for outbox in live), default=0),
+            "sent": self.closed_sent + sum(outbox.sent for outbox in live),
+            "dropped": self.closed_dropped + sum(outbox.dropped for outbox in live),
+            "coalesced": self.closed_coalesced + sum(outbox.coalesced for outbox in live),
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "send_failures": self.send_failures
+        }